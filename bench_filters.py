@@ -0,0 +1,75 @@
+# bench_filters.py
+#
+# 합성 필터(eeg_filters)와 기존 순차 필터(raw.filter 후 주파수마다 raw.notch_filter)를 비교합니다.
+#
+# 사용 예:
+#   python bench_filters.py --channels 64 --duration 600 --notch 50 60
+
+import argparse
+import time
+import numpy as np
+import mne
+from eeg_filters import design_fir, apply_fir
+
+
+def sequential_filter(data, sfreq, l_freq, h_freq, notch_freqs):
+    """기존 경로: 대역 통과 한 번, 노치 주파수마다 한 번씩 전체 데이터를 순회."""
+    raw = mne.io.RawArray(data, mne.create_info(data.shape[0], sfreq, 'eeg'), verbose=False)
+    raw.filter(l_freq, h_freq, verbose=False)
+    for freq in notch_freqs:
+        raw.notch_filter(freqs=freq, verbose=False)
+    return raw.get_data()
+
+
+def fused_filter(data, sfreq, l_freq, h_freq, notch_freqs):
+    kernel = design_fir(sfreq, l_freq, h_freq, list(notch_freqs) or None)
+    return apply_fir(data, kernel)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='합성 FIR 필터 벤치마크')
+    parser.add_argument('--channels', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=600.0, help='녹화 길이 (초)')
+    parser.add_argument('--sfreq', type=float, default=256.0)
+    parser.add_argument('--l-freq', type=float, default=1.0)
+    parser.add_argument('--h-freq', type=float, default=40.0)
+    parser.add_argument('--notch', type=float, nargs='*', default=[50.0, 60.0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    n_samples = int(args.duration * args.sfreq)
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.channels, n_samples)) * 10e-6
+    print(f'데이터: {args.channels}채널 x {n_samples}샘플 '
+          f'({data.nbytes / 1024 ** 2:.0f} MB), 노치 {args.notch} Hz')
+
+    t_seq, out_seq = timed(lambda: sequential_filter(data.copy(), args.sfreq, args.l_freq,
+                                                     args.h_freq, args.notch), args.repeat)
+    start = time.perf_counter()
+    kernel = design_fir(args.sfreq, args.l_freq, args.h_freq, args.notch or None)
+    t_design = time.perf_counter() - start
+    t_fused, out_fused = timed(lambda: fused_filter(data.copy(), args.sfreq, args.l_freq,
+                                                    args.h_freq, args.notch), args.repeat)
+
+    # 가장자리 처리 방식이 달라 커널 길이만큼의 양 끝은 비교에서 제외
+    edge = len(kernel)
+    diff = np.abs(out_seq - out_fused)[:, edge:-edge].max() if n_samples > 2 * edge else float('nan')
+    scale = np.abs(out_seq).max()
+    print(f'순차 경로 (패스 {1 + len(args.notch)}회): {t_seq:.3f}초')
+    print(f'합성 경로 (패스 1회, 커널 {len(kernel)}탭): {t_fused:.3f}초 '
+          f'(첫 설계 {t_design * 1000:.1f} ms, 이후 캐시)')
+    print(f'속도 향상: {t_seq / t_fused:.2f}배')
+    print(f'내부 최대 차이: {diff:.3e} (신호 최대값 {scale:.3e})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+# bench_pipeline.py
+#
+# 녹화 길이/채널 수/샘플링 주파수별로 전체 처리 단계의 시간과 메모리를 측정합니다.
+#
+# generate_test_eeg_data로 녹화와 이벤트 CSV를 만들고 (--data-dir에 보관해 재사용),
+# 경우마다 새 프로세스에서 GUI와 같은 순서로 단계를 실행합니다:
+#   load(CSV 파싱) → convert_to_raw → first_plot(피라미드 + 캔버스 그리기) → filter →
+#   detect_bads → interpolate → reference → ica → epochs → average
+# 단계 시간과 메모리는 eeg_profiling으로 기록하며, 경우마다 새 프로세스이므로 최대 RSS는
+# 그 경우만의 값입니다.
+#
+# 결과는 경우마다 한 줄씩 JSONL 이력(--history)에 추가됩니다. 각 줄에는 코드 버전(git
+# 커밋), 환경, 단계별 시간/메모리가 들어 있고, 실행이 끝나면 같은 환경과 설정의 직전
+# 기록과 비교해 느려진 단계를 표시합니다.
+#
+# 사용 예:
+#   python bench_pipeline.py --preset quick
+#   python bench_pipeline.py --durations 600 3600 --channels 64 256 --sfreqs 1000 2000
+#   python bench_pipeline.py --report
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from eeg_parallel import cpu_count
+from eeg_profiling import PROFILER, stage, current_rss, peak_rss, format_bytes
+from generate_test_eeg_data import channel_names, montage_for, write_eeg_csv, generate_sample_events
+
+
+# 측정 범위 묶음 (길이는 초)
+PRESETS = {
+    'quick': {'durations': [60], 'channels': [4, 32], 'sfreqs': [256]},
+    'standard': {'durations': [60, 600], 'channels': [4, 32, 64], 'sfreqs': [256, 1000]},
+    'full': {'durations': [60, 600, 3600], 'channels': [4, 32, 64, 128, 256],
+             'sfreqs': [256, 1000, 2000]},
+}
+STAGES = ['load', 'convert_to_raw', 'first_plot', 'filter', 'detect_bads', 'interpolate',
+          'reference', 'ica', 'epochs', 'average']
+DEFAULT_HISTORY = 'bench_history.jsonl'
+# 이보다 크게 느려지고 차이가 NOISE_SEC 이상이면 회귀로 표시
+REGRESSION_RATIO = 1.2
+NOISE_SEC = 0.05
+# 첫 화면의 캔버스 크기 (GUI 기본 창의 그래프 영역)와 표시 구간 (초)
+PLOT_WIDTH = 1200
+PLOT_SECONDS = 5.0
+
+
+def case_key(case):
+    return f"{case['duration']:g}s_{case['n_channels']}ch_{case['sfreq']:g}hz"
+
+
+def bad_channel_indices(n_channels):
+    """노이즈를 키워 생성할 불량 채널 (약 3%, 최소 1개, 다른 채널이 남도록)."""
+    n_bads = min(max(1, round(n_channels * 0.03)), n_channels - 2)
+    if n_bads <= 0:
+        return []
+    return list(range(1, n_channels, n_channels // n_bads))[:n_bads]
+
+
+def prepare_case(data_dir, case, seed=0):
+    """경우의 녹화/이벤트 CSV를 만들고 (이미 있으면 재사용) 경로를 반환합니다."""
+    os.makedirs(data_dir, exist_ok=True)
+    stem = os.path.join(data_dir, f'bench_{case_key(case)}')
+    eeg_file, events_file = stem + '.csv', stem + '_events.csv'
+    if not os.path.exists(eeg_file):
+        tmp = eeg_file + '.tmp'
+        write_eeg_csv(tmp, case['duration'], case['sfreq'], case['n_channels'],
+                      bad_channels=bad_channel_indices(case['n_channels']), seed=seed,
+                      phase_spread=True)
+        os.replace(tmp, eeg_file)
+    if not os.path.exists(events_file):
+        # 약 1초마다 이벤트 (조건 2개)
+        n_events = max(2, int(case['duration']) - 2)
+        generate_sample_events(n_events, case['sfreq'], case['duration'], events_file, seed=seed)
+    return eeg_file, events_file
+
+
+def first_plot(raw):
+    """GUI의 첫 화면과 같은 경로: 피라미드 생성, 표시 구간 축소, 캔버스 그리기."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from eeg_pyramid import MinMaxPyramid
+    from eeg_viewer import StackedTraceCanvas, ROW_HEIGHT
+    app = QApplication.instance() or QApplication([])
+    pyramid = MinMaxPyramid.from_raw(raw)
+    n_samples = min(int(PLOT_SECONDS * raw.info['sfreq']), raw.n_times)
+    times, data = pyramid.window(0, n_samples, 2 * max(200, PLOT_WIDTH - 110),
+                                 lambda a, b: raw.get_data(start=a, stop=b))
+    canvas = StackedTraceCanvas()
+    canvas.resize(PLOT_WIDTH, ROW_HEIGHT * len(raw.ch_names))
+    canvas.set_channels(raw.ch_names)
+    canvas.set_traces(times, data)
+    canvas.set_x_range(0, times[-1])
+    canvas.grab()  # 화면 밖에서 실제로 그림
+    app.processEvents()
+    canvas.deleteLater()
+
+
+def run_case(eeg_file, events_file, case, options):
+    """
+    경우 하나의 단계를 순서대로 실행합니다 (새 워커 프로세스에서 실행).
+
+    Returns:
+    --------
+    dict
+        'status', 'stages' ({단계: 시간/메모리}), 'detail' (단계 안쪽 함수별 시간),
+        'baseline_rss', 'peak_rss', 'n_bads_detected', 'n_epochs' 등을 가진 결과
+    """
+    import mne
+    import eeg_pipeline as pipeline
+    from eeg_ica import IcaFitOptions
+    mne.set_log_level('ERROR')
+    n_jobs = options['n_jobs']
+    result = {'baseline_rss': current_rss()}
+    PROFILER.reset()
+    PROFILER.enable(trace_allocations=options['trace_allocations'])
+    try:
+        with stage('load', 'benchmark'):
+            data, ch_names = pipeline.load_recording(eeg_file, use_cache=False)
+        with stage('convert_to_raw', 'benchmark'):
+            raw = pipeline.make_raw(data, ch_names, case['sfreq'], montage_for(ch_names))
+        if 'first_plot' in options['stages']:
+            with stage('first_plot', 'benchmark'):
+                first_plot(raw)
+        with stage('filter', 'benchmark'):
+            raw = pipeline.filter_raw(raw, 1.0, 40.0, n_jobs=n_jobs)
+        with stage('detect_bads', 'benchmark'):
+            detected = pipeline.detect_bad_channels(raw, options['bad_method'])
+        result['n_bads_detected'] = len(detected)
+        # 결과가 데이터에 따라 달라지지 않도록 생성할 때 정한 불량 채널을 보간
+        bads = [ch_names[i] for i in bad_channel_indices(len(ch_names))]
+        with stage('interpolate', 'benchmark'):
+            pipeline.interpolate_bad_channels(raw, bads, n_jobs=n_jobs)
+        with stage('reference', 'benchmark'):
+            pipeline.set_reference(raw, 'average')
+        if 'ica' in options['stages']:
+            # 보간 채널과 평균 참조만큼 랭크가 줄어듦
+            n_components = min(options['ica_components'], len(ch_names) - len(bads) - 1)
+            with stage('ica', 'benchmark'):
+                pipeline.fit_ica(raw, max(1, n_components),
+                                 options=IcaFitOptions(fast=options['ica_fast']), n_jobs=n_jobs)
+        with stage('epochs', 'benchmark'):
+            events, event_id = pipeline.load_events(events_file)
+            epochs = pipeline.make_epochs(raw, events, event_id, -0.2, 0.8, (-0.2, 0.0))
+        result['n_epochs'] = len(epochs)
+        with stage('average', 'benchmark'):
+            pipeline.compute_erp(epochs)
+        result['status'] = 'ok'
+    except Exception as e:
+        result.update(status='error', error=f'{type(e).__name__}: {e}')
+    finally:
+        PROFILER.disable()
+    records = PROFILER.records()
+    result['stages'] = {
+        r.name: {'wall': round(r.wall, 4), 'cpu': round(r.cpu, 4), 'rss_delta': r.rss_delta,
+                 'peak_rss': r.peak_rss, 'alloc_peak': r.alloc_peak}
+        for r in records if r.category == 'benchmark'}
+    result['detail'] = {f"{row['category']}:{row['name']}": round(row['wall'], 4)
+                        for row in PROFILER.summary([r for r in records
+                                                     if r.category != 'benchmark'])}
+    result['peak_rss'] = peak_rss()
+    return result
+
+
+def code_version():
+    """저장소의 git 커밋 (수정 중이면 '+dirty'). git이 없으면 None."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=root, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return (commit + ('+dirty' if dirty else '')) or None
+
+
+def environment():
+    import scipy
+    import pandas
+    import mne
+    return {'host': platform.node(), 'platform': platform.platform(),
+            'python': platform.python_version(), 'cpu_count': cpu_count(),
+            'numpy': np.__version__, 'scipy': scipy.__version__, 'pandas': pandas.__version__,
+            'mne': mne.__version__}
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def comparable(entry, other):
+    """같은 환경(호스트, 코어 수)과 같은 경우/설정의 기록인지."""
+    return (entry['case'] == other['case'] and entry['options'] == other['options']
+            and entry['env']['host'] == other['env']['host']
+            and entry['env']['cpu_count'] == other['env']['cpu_count'])
+
+
+def previous_entry(history, entry):
+    """history에서 entry와 비교할 수 있는 가장 최근의 다른 실행 기록 (성공한 것만)."""
+    for other in reversed(history):
+        if (other.get('run_id') != entry['run_id'] and other.get('status') == 'ok'
+                and comparable(entry, other)):
+            return other
+    return None
+
+
+def regressions(entry, previous, ratio=REGRESSION_RATIO, noise=NOISE_SEC):
+    """previous보다 ratio배 이상, noise초 이상 느려진 단계 {단계: (이전, 현재)}."""
+    out = {}
+    for name, now in entry['stages'].items():
+        before = previous['stages'].get(name)
+        if before is None:
+            continue
+        if now['wall'] > before['wall'] * ratio and now['wall'] - before['wall'] > noise:
+            out[name] = (before['wall'], now['wall'])
+    return out
+
+
+def print_entry(entry, previous=None, ratio=REGRESSION_RATIO):
+    print(f"\n[{entry['status']}] {case_key(entry['case'])}"
+          f" (데이터 {format_bytes(entry['data_bytes'])}, 최대 RSS {format_bytes(entry.get('peak_rss'))})")
+    if entry['status'] != 'ok':
+        print(f"  {entry.get('error', '')}")
+        if not entry['stages']:
+            return
+    slow = regressions(entry, previous, ratio) if previous else {}
+    print('  ' + '단계'.ljust(16) + '시간'.rjust(10) + 'CPU'.rjust(10) + 'RSS 변화'.rjust(12)
+          + '최대 RSS'.rjust(12) + ('이전'.rjust(10) if previous else ''))
+    for name, s in entry['stages'].items():
+        line = (f"  {name.ljust(16)}{s['wall']:>9.3f}s{s['cpu']:>9.3f}s"
+                f"{format_bytes(s['rss_delta']):>12}{format_bytes(s['peak_rss']):>12}")
+        if previous and name in previous['stages']:
+            before = previous['stages'][name]['wall']
+            line += f'{before:>9.3f}s'
+            if name in slow:
+                line += f'  ! 느려짐 {s["wall"] / before:.2f}x'
+        print(line)
+    if previous:
+        print(f"  (이전: {previous.get('version')} {previous.get('timestamp')})")
+
+
+def report(history, last=5):
+    """경우별로 최근 last번 실행의 단계 합계 시간과 최대 RSS를 출력합니다."""
+    cases = {}
+    for entry in history:
+        cases.setdefault(case_key(entry['case']), []).append(entry)
+    for key, entries in cases.items():
+        print(f'\n{key}')
+        for entry in entries[-last:]:
+            total = sum(s['wall'] for s in entry['stages'].values())
+            print(f"  {entry.get('timestamp', '')[:19]}  {str(entry.get('version')):<16}"
+                  f"{entry['status']:<6}{total:>9.2f}s  최대 RSS {format_bytes(entry.get('peak_rss'))}"
+                  f"  [{entry['env']['host']}, {entry['env']['cpu_count']}코어]")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='처리 단계별 시간/메모리 확장성 벤치마크')
+    parser.add_argument('--preset', choices=list(PRESETS), default='quick')
+    parser.add_argument('--durations', type=float, nargs='+', default=None, help='녹화 길이 (초)')
+    parser.add_argument('--channels', type=int, nargs='+', default=None, help='채널 수')
+    parser.add_argument('--sfreqs', type=float, nargs='+', default=None,
+                        help='샘플링 주파수 (Hz)')
+    parser.add_argument('--data-dir', default='bench_data',
+                        help='생성한 녹화를 보관하는 폴더 (같은 경우는 재사용)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='결과를 추가할 JSONL 파일')
+    parser.add_argument('--label', default=None, help='이 실행의 이름 (예: 릴리스 태그)')
+    parser.add_argument('--threads', type=int, default=1, help='단계별 병렬 스레드 수')
+    parser.add_argument('--skip', nargs='*', default=[], choices=['first_plot', 'ica'],
+                        help='건너뛸 단계')
+    parser.add_argument('--ica-components', type=int, default=20)
+    parser.add_argument('--ica-fast', action='store_true', help='ICA 빠른 모드')
+    parser.add_argument('--bad-method', default='robust', help='불량 채널 탐지 기준')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='tracemalloc으로 단계별 할당량도 기록 (Python 코드가 느려짐)')
+    parser.add_argument('--max-gb', type=float, default=4.0,
+                        help='float64 데이터가 이보다 큰 경우는 건너뜀 (GB)')
+    parser.add_argument('--regression-ratio', type=float, default=REGRESSION_RATIO)
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='느려진 단계가 있으면 종료 코드 1')
+    parser.add_argument('--report', action='store_true', help='측정하지 않고 이력만 요약')
+    args = parser.parse_args(argv)
+
+    history = read_history(args.history)
+    if args.report:
+        report(history)
+        return 0
+
+    preset = PRESETS[args.preset]
+    cases = [{'duration': d, 'n_channels': c, 'sfreq': s}
+             for d in args.durations or preset['durations']
+             for c in args.channels or preset['channels']
+             for s in args.sfreqs or preset['sfreqs']]
+    options = {'n_jobs': args.threads, 'stages': [s for s in STAGES if s not in args.skip],
+               'ica_components': args.ica_components, 'ica_fast': args.ica_fast,
+               'bad_method': args.bad_method, 'trace_allocations': args.trace_allocations}
+    run = {'run_id': datetime.datetime.now().strftime('%Y%m%d-%H%M%S-') + str(os.getpid()),
+           'version': code_version(), 'label': args.label, 'env': environment()}
+    print(f"버전 {run['version']}, 코어 {run['env']['cpu_count']}개, 경우 {len(cases)}개")
+
+    n_regressed = 0
+    for case in cases:
+        channel_names(case['n_channels'])  # 채널 수 범위 확인
+        n_samples = int(round(case['duration'] * case['sfreq']))
+        entry = dict(run, timestamp=datetime.datetime.now().isoformat(timespec='seconds'),
+                     case=case, options=options, data_bytes=n_samples * case['n_channels'] * 8,
+                     stages={})
+        if entry['data_bytes'] > args.max_gb * 1024 ** 3:
+            entry.update(status='skipped', error=f'데이터가 --max-gb {args.max_gb:g}보다 큼')
+        else:
+            start = time.perf_counter()
+            eeg_file, events_file = prepare_case(args.data_dir, case)
+            print(f'{case_key(case)}: 데이터 준비 {time.perf_counter() - start:.1f}초')
+            # 경우마다 새 프로세스 (이전 경우의 메모리와 캐시가 섞이지 않도록)
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                try:
+                    entry.update(pool.submit(run_case, eeg_file, events_file, case, options).result())
+                except Exception as e:  # 워커 프로세스가 죽은 경우 (메모리 부족 등)
+                    entry.update(status='error', error=f'{type(e).__name__}: {e}')
+        previous = previous_entry(history, entry)
+        print_entry(entry, previous, args.regression_ratio)
+        if previous and regressions(entry, previous, args.regression_ratio):
+            n_regressed += 1
+        history.append(entry)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+    print(f'\n결과 추가: {args.history}' + (f' (느려진 경우 {n_regressed}개)' if n_regressed else ''))
+    return 1 if args.fail_on_regression and n_regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,11 +4,16 @@ import pandas as pd
 import mne
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                           QComboBox, QSpinBox, QDoubleSpinBox, QMessageBox)
+                           QComboBox, QSpinBox, QDoubleSpinBox, QMessageBox, QCheckBox)
 from PyQt5.QtCore import Qt
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from eeg_cache import load_csv_cached
+from eeg_parallel import cpu_count
+from eeg_ica import IcaFitOptions
+from eeg_epochs import EpochIndex
+from eeg_chain import ProcessingChain, ProcessingStep, steps_with
 
 class EEGAnalysisGUI(QMainWindow):
     def __init__(self):
@@ -17,7 +22,8 @@ class EEGAnalysisGUI(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         
         # 데이터 저장 변수
-        self.raw_data = None
+        self.raw_data = None  # 처리 체인의 현재 출력
+        self.chain = None  # 로드한 원본 위의 비파괴 처리 단계
         self.events = None
         self.epochs = None
         
@@ -125,6 +131,17 @@ class EEGAnalysisGUI(QMainWindow):
         self.apply_filter_btn.clicked.connect(self.apply_filter)
         filter_layout.addWidget(self.apply_filter_btn)
         
+        # 실행 취소/다시 실행 (캐시된 단계 출력으로 전환)
+        history_layout = QHBoxLayout()
+        self.undo_btn = QPushButton('실행 취소')
+        self.undo_btn.clicked.connect(self.undo_processing)
+        history_layout.addWidget(self.undo_btn)
+        self.redo_btn = QPushButton('다시 실행')
+        self.redo_btn.clicked.connect(self.redo_processing)
+        history_layout.addWidget(self.redo_btn)
+        filter_layout.addLayout(history_layout)
+        self.update_history_buttons()
+        
         # 필터 타입 변경 시 UI 업데이트
         self.filter_type_combo.currentTextChanged.connect(self.update_filter_ui)
         self.update_filter_ui(self.filter_type_combo.currentText())
@@ -142,6 +159,11 @@ class EEGAnalysisGUI(QMainWindow):
         ica_layout.addWidget(QLabel('컴포넌트 수:'))
         ica_layout.addWidget(self.n_components)
         
+        # 리샘플링/고역 통과한 복사본의 일부로 피팅하고 원본에 적용
+        self.fast_ica_check = QCheckBox('빠른 피팅')
+        self.fast_ica_check.setChecked(True)
+        ica_layout.addWidget(self.fast_ica_check)
+        
         self.apply_ica_btn = QPushButton('ICA 적용')
         self.apply_ica_btn.clicked.connect(self.apply_ica)
         ica_layout.addWidget(self.apply_ica_btn)
@@ -201,13 +223,15 @@ class EEGAnalysisGUI(QMainWindow):
         file_name, _ = QFileDialog.getOpenFileName(self, 'EEG 데이터 파일 선택', '', 'CSV Files (*.csv)')
         if file_name:
             try:
-                data = pd.read_csv(file_name)
-                ch_names = data.columns.tolist()
+                # 바이너리 캐시에서 매핑 (없으면 CSV를 파싱하여 캐시에 저장)
+                data, ch_names = load_csv_cached(file_name)
                 sfreq = 256  # 샘플링 주파수
                 
                 # MNE Raw 객체 생성
                 info = mne.create_info(ch_names=ch_names, sfreq=sfreq, ch_types=['eeg']*len(ch_names))
-                self.raw_data = mne.io.RawArray(data.T.values, info)
+                self.raw_data = mne.io.RawArray(data, info)
+                self.chain = ProcessingChain(self.raw_data, n_jobs=cpu_count())
+                self.update_history_buttons()
                 
                 # 데이터 시각화
                 self.plot_raw_data()
@@ -250,12 +274,12 @@ class EEGAnalysisGUI(QMainWindow):
         try:
             filter_type = self.filter_type_combo.currentText()
             
+            # 필터는 원본 위의 처리 단계로 적용: 같은 종류는 겹쳐 쌓지 않고 파라미터만 바꿈
             if filter_type == 'Band-pass':
-                self.raw_data.filter(
-                    l_freq=self.low_freq.value(),
-                    h_freq=self.high_freq.value(),
-                    method='fir'
-                )
+                step = ProcessingStep('bandpass', {
+                    'l_freq': self.low_freq.value(),
+                    'h_freq': self.high_freq.value()
+                })
             
             elif filter_type == 'Notch':
                 freqs = {
@@ -263,39 +287,27 @@ class EEGAnalysisGUI(QMainWindow):
                     '60 Hz': [60],
                     '50/60 Hz': [50, 60]
                 }[self.notch_freq.currentText()]
-                
-                for freq in freqs:
-                    self.raw_data.notch_filter(
-                        freqs=freq,
-                        picks='eeg',
-                        method='fir'
-                    )
+                step = ProcessingStep('notch', {'freqs': freqs})
             
             elif filter_type == 'High-pass':
-                self.raw_data.filter(
-                    l_freq=self.low_freq.value(),
-                    h_freq=None,
-                    method='fir'
-                )
+                step = ProcessingStep('highpass', {'l_freq': self.low_freq.value()})
             
             elif filter_type == 'FIR':
-                self.raw_data.filter(
-                    l_freq=self.low_freq.value(),
-                    h_freq=self.high_freq.value(),
-                    method='fir',
-                    phase='zero'
-                )
+                step = ProcessingStep('bandpass', {
+                    'l_freq': self.low_freq.value(),
+                    'h_freq': self.high_freq.value(),
+                    'phase': 'zero'
+                })
             
             elif filter_type == 'Zero-phase':
-                self.raw_data.filter(
-                    l_freq=self.low_freq.value(),
-                    h_freq=self.high_freq.value(),
-                    method='fir',
-                    phase='zero',
-                    fir_window='hamming'
-                )
+                step = ProcessingStep('bandpass', {
+                    'l_freq': self.low_freq.value(),
+                    'h_freq': self.high_freq.value(),
+                    'phase': 'zero',
+                    'fir_window': 'hamming'
+                })
             
-            self.plot_raw_data()
+            self.apply_steps(steps_with(self.chain.steps, step))
             
             msg = f'{filter_type} 필터가 성공적으로 적용되었습니다.'
             if filter_type in ['Band-pass', 'High-pass', 'FIR', 'Zero-phase']:
@@ -308,18 +320,55 @@ class EEGAnalysisGUI(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, '오류', f'필터 적용 중 오류 발생: {str(e)}')
     
+    def apply_steps(self, steps):
+        # 캐시에 있는 단계는 건너뛰고 바뀐 단계부터 아래만 다시 계산
+        self.raw_data = self.chain.compute(steps)
+        self.chain.set_steps(steps)
+        self.update_history_buttons()
+        self.plot_raw_data()
+    
+    def update_history_buttons(self):
+        self.undo_btn.setEnabled(self.chain is not None and self.chain.can_undo())
+        self.redo_btn.setEnabled(self.chain is not None and self.chain.can_redo())
+    
+    def undo_processing(self):
+        if self.chain is None or not self.chain.can_undo():
+            return
+        try:
+            self.raw_data = self.chain.compute(self.chain.undo_steps())
+            self.chain.undo()
+            self.update_history_buttons()
+            self.plot_raw_data()
+        except Exception as e:
+            QMessageBox.critical(self, '오류', f'실행 취소 중 오류 발생: {str(e)}')
+    
+    def redo_processing(self):
+        if self.chain is None or not self.chain.can_redo():
+            return
+        try:
+            self.raw_data = self.chain.compute(self.chain.redo_steps())
+            self.chain.redo()
+            self.update_history_buttons()
+            self.plot_raw_data()
+        except Exception as e:
+            QMessageBox.critical(self, '오류', f'다시 실행 중 오류 발생: {str(e)}')
+
     def apply_ica(self):
         if self.raw_data is None:
             QMessageBox.warning(self, '경고', '먼저 EEG 데이터를 로드해주세요.')
             return
         
         try:
-            # ICA 적용
-            ica = mne.preprocessing.ICA(n_components=self.n_components.value())
-            ica.fit(self.raw_data)
-            self.raw_data = ica.apply(self.raw_data)
-            self.plot_raw_data()
-            QMessageBox.information(self, '성공', 'ICA가 성공적으로 적용되었습니다.')
+            n_components = self.n_components.value()
+            options = IcaFitOptions(fast=self.fast_ica_check.isChecked())
+            # 같은 입력/옵션의 피팅은 체인에서 재사용되므로 다시 눌러도 재피팅하지 않음
+            _, summary = self.chain.fit_ica(n_components, options=options)
+            # ICA 적용 (처리 단계로 추가하여 원본과 이전 단계 출력은 유지)
+            self.apply_steps(steps_with(self.chain.steps, ProcessingStep('ica', {
+                'n_components': n_components, 'components': [], 'fit': options.to_dict()
+            })))
+            QMessageBox.information(self, '성공', 'ICA가 성공적으로 적용되었습니다.\n'
+                                    f'피팅: {summary.describe()}')
         except Exception as e:
             QMessageBox.critical(self, '오류', f'ICA 적용 중 오류 발생: {str(e)}')
     
@@ -329,10 +378,10 @@ class EEGAnalysisGUI(QMainWindow):
             return
         
         try:
-            # 에포킹 적용
-            self.epochs = mne.Epochs(self.raw_data, self.events, 
-                                   tmin=self.tmin.value(), tmax=self.tmax.value(),
-                                   baseline=(None, 0), preload=True)
+            # 에포킹 적용 (이벤트 위치만 저장하고 데이터는 raw 버퍼를 공유)
+            self.epochs = EpochIndex(self.raw_data, self.events,
+                                     tmin=self.tmin.value(), tmax=self.tmax.value(),
+                                     baseline=(None, 0))
             self.plot_epochs()
             QMessageBox.information(self, '성공', '에포킹이 성공적으로 적용되었습니다.')
         except Exception as e:
@@ -419,17 +468,13 @@ class EEGAnalysisGUI(QMainWindow):
         self.eeg_figure.clear()
         ax = self.eeg_figure.add_subplot(111)
         
-        # 에포크 데이터 가져오기
-        data = self.epochs.get_data()
         times = self.epochs.times
         
-        # 각 조건별 평균 계산
-        unique_events = np.unique(self.epochs.events[:, 2])
-        
-        for event_id in unique_events:
-            # 해당 이벤트의 에포크 선택
-            event_mask = self.epochs.events[:, 2] == event_id
-            event_data = data[event_mask].mean(axis=0)  # 조건별 평균
+        # 조건별 평균은 누적값(합/개수)에서 바로 계산 (에포크 데이터를 복사하지 않음)
+        for event_id in self.epochs.conditions:
+            event_data = self.epochs.mean(event_id)
+            if event_data is None:
+                continue
             
             # 각 채널 데이터 플로팅
             for i, ch_name in enumerate(self.epochs.ch_names):
@@ -2,31 +2,107 @@
 
 import sys
 import os
+import time
 import numpy as np
 import pandas as pd
 import mne
+import pyqtgraph as pg
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
                             QComboBox, QSpinBox, QTextEdit, QMessageBox,
-                            QDoubleSpinBox, QGroupBox, QCheckBox, QTableWidget,
-                            QTableWidgetItem, QHeaderView, QStackedWidget, QAbstractScrollArea,
+                            QDoubleSpinBox, QGroupBox, QCheckBox, QTableView,
+                            QHeaderView, QStackedWidget,
                             QListWidget, QLineEdit, QListWidgetItem, QRadioButton, QButtonGroup,
-                            QScrollArea)
-from PyQt5.QtCore import Qt
-import pyqtgraph as pg
-from functools import partial  # 꼭 추가하세요
-from PyQt5.QtCore import QTimer
+                            QScrollArea, QProgressBar)
+from PyQt5.QtCore import Qt, QTimer
+from eeg_cache import get_default_cache
+from eeg_jobs import JobQueue
+import eeg_pipeline as pipeline
+from eeg_pyramid import MinMaxPyramid, decimate_window
+from eeg_viewer import StackedTraceCanvas, channel_pen
+from eeg_models import BadChannelModel, ArrayTableModel
+from eeg_quality import DEFAULT_THRESHOLDS
+from eeg_psd import SPECTRAL_THRESHOLDS, SPECTRAL_METHODS
+from eeg_parallel import cpu_count
+from eeg_ica import IcaFitOptions, available_methods as available_ica_methods
+from eeg_chain import ProcessingChain, ProcessingStep, steps_with, describe_steps
+from eeg_stream import CausalFilter, StreamReceiver, open_source
+from eeg_tfr import tfr_epochs, apply_baseline
+from eeg_reject import reject_epochs
+from eeg_profiling import PROFILER, profiled, format_bytes
+
+# 미리보기 그래프에 사용할 앞부분 샘플 수
+PREVIEW_SAMPLES = 1000
+# 자동 탐지 기준 (콤보박스 표시 이름 -> 파이프라인 기준)
+BAD_CHANNEL_METHODS = {'평균 제곱': 'mean_square', '편평성': 'flat', '이상치': 'outlier',
+                       '사분위 범위': 'robust', '고주파 비율': 'high_freq',
+                       '전원 잡음 비율': 'line_noise'}
+AUTO_THRESHOLDS = {**DEFAULT_THRESHOLDS, **SPECTRAL_THRESHOLDS}
+ICA_METHOD_LABELS = {'fastica': 'FastICA', 'infomax': '확장 Infomax', 'picard': 'Picard'}
+# 실시간 스트림 입력/필터 (콤보박스 표시 이름 -> eeg_stream 이름)
+STREAM_PROTOCOL_LABELS = {'UDP': 'udp', 'TCP': 'tcp', '파일 추적': 'file'}
+STREAM_FILTER_LABELS = {'IIR (버터워스)': 'iir', 'FIR (선형 위상)': 'fir', '없음': 'none'}
+# 스트림 화면 갱신 간격 (ms)과 상태 표시 갱신 간격 (초)
+STREAM_REFRESH_MS = 40
+STREAM_STATUS_INTERVAL = 0.5
+# 에포크 거부 방식 (콤보박스 표시 이름 -> 최대 진폭 기준)
+REJECT_MODE_LABELS = {'사용 안 함': None, '고정 임계값': 'fixed', '자동 (교차 검증)': 'auto'}
+# 시간-주파수 분석 (콤보박스 표시 이름 -> eeg_tfr 이름)
+TFR_METHOD_LABELS = {'Morlet 웨이블릿': 'morlet', '멀티테이퍼': 'multitaper'}
+TFR_MEASURE_LABELS = {'유도 파워': 'induced', '총 파워': 'total', 'ITC (위상 일치도)': 'itc'}
+TFR_BASELINE_LABELS = {'log10 비': 'logratio', '백분율': 'percent', 'z 점수': 'zscore', '없음': None}
+# 진단 표의 열과 갱신 간격 (ms)
+PROFILE_COLUMNS = ['분류', '횟수', '시간 합계', '최대', 'CPU', '할당 최대', 'RSS 변화', '최대 RSS']
+PROFILE_REFRESH_MS = 1000
+
 
+def format_sample(value):
+    # 데이터 테이블 셀 표시 형식 (보이는 셀만 호출됨)
+    return f'{value:.6g}'
 
 
 class EEGAnalyzerGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.raw = None
+        self.chain = None  # 원본 Raw 위의 비파괴 처리 단계 (raw는 항상 체인의 출력)
         self.ica = None
+        self._ica_fit_params = None  # (컴포넌트 수, 제외 채널, 피팅 옵션)
+        # 보간 전 신호와 보간된 채널 (체인의 보간 단계 입력을 그대로 참조)
+        self._pre_interpolate_data = None
+        self._pre_interpolate_bads = []
         self.epochs = None
+        self.tfr = None  # 현재 에포크의 조건별 시간-주파수 결과
         self.events = None
         self.event_id = {}
+        self.csv_data = None  # (채널, 샘플) memmap 버퍼
+        self.csv_file = None
+        self.df = None  # 미리보기용 앞부분 DataFrame
+        self.pyramid = None  # 표시용 최소/최대 피라미드 (raw가 바뀔 때마다 다시 생성)
+        # 처리 단계를 GUI 스레드 밖에서 순서대로 실행하는 작업 큐
+        self.job_queue = JobQueue(self)
+        self.job_queue.started.connect(self.on_job_started)
+        self.job_queue.progress.connect(self.on_job_progress)
+        self.job_queue.finished.connect(self.on_job_finished)
+        self.job_queue.cancelled.connect(self.on_job_cancelled)
+        self.job_queue.idle.connect(self.on_jobs_idle)
+        self._job_log_step = -1
+        # 불량 채널 상태 (목록, 그래프, raw.info['bads']가 모두 이 모델을 따름)
+        self.bad_channels = BadChannelModel(self)
+        self.bad_channels.changed.connect(self.on_bad_channels_changed)
+        # raw 데이터가 바뀔 때마다 증가하는 번호와 그 상태에서 계산한 채널 통계
+        self._raw_version = 0
+        self._quality_stats = None  # (버전, ChannelStats)
+        self._spectrum = None  # (버전, eeg_psd.Spectrum)
+        self._auto_detect_live = False
+        # 캔버스에 현재 표시 중인 내용 ('preview', 'raw', 'psd', 'erp', 'tfr', 'stream')
+        self._canvas_mode = None
+        # 실시간 스트림 수신기와 화면 갱신 타이머
+        self.stream = None
+        self._stream_status_time = 0.0
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setInterval(STREAM_REFRESH_MS)
+        self.stream_timer.timeout.connect(self.on_stream_timer)
         self.initUI()
         
     def initUI(self):
@@ -45,7 +121,8 @@ class EEGAnalyzerGUI(QMainWindow):
         menu_panel.setLayout(menu_layout)
         menu_panel.setFixedWidth(150)
         self.menu_buttons = []
-        menu_names = ['데이터 로드', '채널 품질 검사', '필터링', '참조 설정', 'ICA', 'ERP 추출']
+        menu_names = ['데이터 로드', '채널 품질 검사', '필터링', '참조 설정', 'ICA', 'ERP 추출',
+                      '실시간 스트림']
         for idx, name in enumerate(menu_names):
             btn = QPushButton(name)
             btn.setCheckable(True)
@@ -64,12 +141,14 @@ class EEGAnalyzerGUI(QMainWindow):
         self.reference_widget = self.create_reference_widget()
         self.ica_widget = self.create_ica_widget()
         self.erp_widget = self.create_erp_widget()
+        self.stream_widget = self.create_stream_widget()
         self.stacked_widget.addWidget(self.data_load_widget)
         self.stacked_widget.addWidget(self.quality_widget)
         self.stacked_widget.addWidget(self.filter_widget)
         self.stacked_widget.addWidget(self.reference_widget)
         self.stacked_widget.addWidget(self.ica_widget)
         self.stacked_widget.addWidget(self.erp_widget)
+        self.stacked_widget.addWidget(self.stream_widget)
 
         # 3. 우측 결과 그래프 + DataFrame 패널
         plot_panel = QWidget()
@@ -94,30 +173,60 @@ class EEGAnalyzerGUI(QMainWindow):
         self.scroll.setWidgetResizable(True)
         self.scroll_content = QWidget()
         self.plot_layout = QVBoxLayout(self.scroll_content)
+        # 모든 채널을 하나의 캔버스에 그림 (곡선은 한 번 만들고 setData로 갱신)
+        self.canvas = StackedTraceCanvas()
+        self.canvas.channelClicked.connect(self.toggle_bad_channel_by_curve)
+        self.plot_layout.addWidget(self.canvas)
         self.scroll.setWidget(self.scroll_content)
         plot_panel_layout.addWidget(self.scroll, stretch=1)
-        # DataFrame 테이블 (결과용)
-        self.result_df_table = QTableWidget()
-        self.result_df_table.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
-        self.result_df_table.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
-        self.result_df_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.result_df_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.result_df_table.setSelectionMode(QTableWidget.SingleSelection)
-        self.result_df_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # 데이터 테이블 (결과용). 녹화 버퍼를 직접 참조하며 보이는 셀만 그때그때 표시
+        self.result_df_model = ArrayTableModel(fmt=format_sample, parent=self)
+        self.result_df_table = QTableView()
+        self.result_df_table.setModel(self.result_df_model)
+        self.result_df_table.setHorizontalScrollMode(QTableView.ScrollPerPixel)
+        self.result_df_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.result_df_table.setSelectionBehavior(QTableView.SelectRows)
+        self.result_df_table.setSelectionMode(QTableView.SingleSelection)
+        # 열이 수백만 개일 수 있으므로 내용 기준 크기 계산 없이 고정 폭 사용
+        self.result_df_table.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.result_df_table.horizontalHeader().setDefaultSectionSize(110)
+        self.result_df_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.result_df_table.setMinimumHeight(100)
         self.result_df_table.setMaximumHeight(self.height() // 3)
         plot_panel_layout.addWidget(self.result_df_table, stretch=0)
         # 플롯 컨트롤
         plot_control_layout = QHBoxLayout()
         self.plot_duration_spin = QDoubleSpinBox()
-        self.plot_duration_spin.setRange(1, 60)
+        # 피라미드로 그리므로 긴 구간도 화면 폭만큼의 점만 그림
+        self.plot_duration_spin.setRange(1, 24 * 3600)
         self.plot_duration_spin.setValue(5)
         plot_control_layout.addWidget(QLabel('표시 구간 (초):'))
         plot_control_layout.addWidget(self.plot_duration_spin)
         self.update_plot_btn = QPushButton('플롯 업데이트')
-        self.update_plot_btn.clicked.connect(self.plot_data)
+        self.update_plot_btn.clicked.connect(lambda: self.plot_data())
         plot_control_layout.addWidget(self.update_plot_btn)
+        # 처리 단계 실행 취소/다시 실행 (캐시된 단계 출력으로 전환)
+        self.undo_btn = QPushButton('실행 취소')
+        self.undo_btn.clicked.connect(self.undo_processing)
+        self.undo_btn.setEnabled(False)
+        plot_control_layout.addWidget(self.undo_btn)
+        self.redo_btn = QPushButton('다시 실행')
+        self.redo_btn.clicked.connect(self.redo_processing)
+        self.redo_btn.setEnabled(False)
+        plot_control_layout.addWidget(self.redo_btn)
         plot_panel_layout.addLayout(plot_control_layout)
+        # 백그라운드 작업 진행률 및 취소
+        job_layout = QHBoxLayout()
+        self.job_label = QLabel('대기 중')
+        job_layout.addWidget(self.job_label)
+        self.job_progress = QProgressBar()
+        self.job_progress.setRange(0, 100)
+        job_layout.addWidget(self.job_progress, stretch=1)
+        self.cancel_job_btn = QPushButton('작업 취소')
+        self.cancel_job_btn.clicked.connect(self.cancel_jobs)
+        self.cancel_job_btn.setEnabled(False)
+        job_layout.addWidget(self.cancel_job_btn)
+        plot_panel_layout.addLayout(job_layout)
 
         # 전체 레이아웃 배치
         main_layout.addWidget(menu_panel)
@@ -133,27 +242,107 @@ class EEGAnalyzerGUI(QMainWindow):
         if hasattr(self, 'result_df_table'):
             self.result_df_table.setMaximumHeight(self.height() // 3)
 
+    def closeEvent(self, event):
+        # 종료 시 스트림 수신과 실행 중인 작업을 멈추고 워커 스레드가 끝날 때까지 대기
+        self.stop_stream()
+        self.job_queue.cancel_all()
+        self.job_queue.wait_for_done()
+        super().closeEvent(event)
+
+    def run_job(self, name, work, done, error_context):
+        """
+        work(ctx)를 워커 스레드에서 실행하고, 결과를 done(result)으로 GUI 스레드에서 처리합니다.
+        이미 실행 중인 작업이 있으면 그 뒤에 대기합니다.
+        """
+        def on_error(e):
+            self.info_text.append(f'[{name}] 실패')
+            QMessageBox.critical(self, '오류', f'{error_context} 중 오류 발생: {str(e)}')
+        if self.job_queue.is_busy():
+            self.info_text.append(f'[{name}] 대기열에 추가됨')
+        self.job_queue.submit(name, work, done, on_error)
+
+    def on_job_started(self, name):
+        self._job_log_step = -1
+        self.job_label.setText(name)
+        self.job_progress.setValue(0)
+        self.cancel_job_btn.setEnabled(True)
+        self.info_text.append(f'\n[{name}] 시작')
+
+    def on_job_progress(self, name, percent, message):
+        self.job_progress.setValue(percent)
+        # info_text에는 10% 단위로만 기록
+        step = percent // 10
+        if message or step != self._job_log_step:
+            self._job_log_step = step
+            self.info_text.append(f'[{name}] {percent}% {message}'.rstrip())
+
+    def on_job_finished(self, name):
+        self.job_progress.setValue(100)
+
+    def on_job_cancelled(self, name):
+        self.info_text.append(f'[{name}] 취소됨')
+
+    def on_jobs_idle(self):
+        self.job_label.setText('대기 중')
+        self.cancel_job_btn.setEnabled(False)
+
+    def cancel_jobs(self):
+        # 실행 중인 단계는 다음 청크 경계에서 중단되고, 대기 중인 단계는 실행되지 않음
+        for name in self.job_queue.cancel_all():
+            self.info_text.append(f'[{name}] 취소됨')
+
+    def on_profiling_toggled(self):
+        if self.profile_check.isChecked():
+            PROFILER.enable(trace_allocations=self.profile_alloc_check.isChecked())
+            self.profile_timer.start()
+        else:
+            PROFILER.disable()
+            self.profile_timer.stop()
+            self.update_profile_table()
+
+    def update_profile_table(self):
+        """(분류, 이름)별 합계를 시간 합계가 큰 순서로 표시합니다."""
+        if PROFILER.version == self._profile_version:
+            return
+        self._profile_version = PROFILER.version
+        rows = PROFILER.summary()
+        table = np.array([[row['category'], row['count'], f"{row['wall'] * 1e3:.1f} ms",
+                           f"{row['wall_max'] * 1e3:.1f} ms", f"{row['cpu'] * 1e3:.1f} ms",
+                           format_bytes(row['alloc_peak']), format_bytes(row['rss_delta']),
+                           format_bytes(row['peak_rss'])] for row in rows],
+                         dtype=object).reshape(-1, len(PROFILE_COLUMNS))
+        self.profile_model.set_array(table, row_labels=[row['name'] for row in rows],
+                                     col_labels=PROFILE_COLUMNS)
+
+    def reset_profile(self):
+        PROFILER.reset()
+        self.update_profile_table()
+
+    def export_profile(self, kind):
+        if not PROFILER.records():
+            QMessageBox.warning(self, '경고', '저장할 계측 기록이 없습니다. 먼저 계측을 켜세요.')
+            return
+        if kind == 'trace':
+            file_name, _ = QFileDialog.getSaveFileName(
+                self, 'Chrome trace 저장', 'eeg_trace.json', 'JSON files (*.json)')
+        else:
+            file_name, _ = QFileDialog.getSaveFileName(
+                self, '계측 기록 저장', 'eeg_profile.json', 'JSON files (*.json)')
+        if not file_name:
+            return
+        try:
+            if kind == 'trace':
+                PROFILER.save_chrome_trace(file_name)
+            else:
+                PROFILER.save_json(file_name)
+            self.info_text.append(f'계측 기록 저장: {file_name} ({len(PROFILER.records())}개 단계)')
+        except OSError as e:
+            QMessageBox.critical(self, '오류', f'계측 기록 저장 중 오류 발생: {str(e)}')
+
     def switch_panel(self, idx):
         for i, btn in enumerate(self.menu_buttons):
             btn.setChecked(i == idx)
         self.stacked_widget.setCurrentIndex(idx)
-        # 채널 품질 검사 패널로 전환 시 bad_channel_list를 채널명+bad 상태로 초기화
-        if hasattr(self, 'bad_channel_list') and idx == 1:
-            self.bad_channel_list.clear()
-            ch_names = []
-            bads = []
-            if hasattr(self, 'raw') and self.raw is not None:
-                ch_names = self.raw.ch_names
-                bads = self.raw.info['bads']
-            elif hasattr(self, 'df') and self.df is not None:
-                ch_names = list(self.df.columns)
-            for ch in ch_names:
-                item = QListWidgetItem(ch)
-                if ch in bads:
-                    item.setCheckState(2)
-                else:
-                    item.setCheckState(0)
-                self.bad_channel_list.addItem(item)
 
     def create_data_load_widget(self):
         widget = QWidget()
@@ -165,6 +354,11 @@ class EEGAnalyzerGUI(QMainWindow):
         self.load_btn = QPushButton('CSV 파일 로드')
         self.load_btn.clicked.connect(self.load_csv)
         control_layout.addWidget(self.load_btn)
+        # 바이너리 캐시 무효화 버튼
+        self.invalidate_cache_btn = QPushButton('캐시 무효화')
+        self.invalidate_cache_btn.clicked.connect(self.invalidate_cache)
+        self.invalidate_cache_btn.setEnabled(False)
+        control_layout.addWidget(self.invalidate_cache_btn)
         # 채널 설정
         control_layout.addWidget(QLabel('채널 이름:'))
         self.channel_text = QTextEdit()
@@ -178,6 +372,15 @@ class EEGAnalyzerGUI(QMainWindow):
         self.sfreq_spin.setValue(256)
         sfreq_layout.addWidget(self.sfreq_spin)
         control_layout.addLayout(sfreq_layout)
+        # 필터/보간을 채널 블록 단위로 나눠 실행할 스레드 수
+        n_jobs_layout = QHBoxLayout()
+        n_jobs_layout.addWidget(QLabel('병렬 스레드 수:'))
+        self.n_jobs_spin = QSpinBox()
+        self.n_jobs_spin.setRange(1, cpu_count())
+        self.n_jobs_spin.setValue(cpu_count())
+        self.n_jobs_spin.valueChanged.connect(self.on_n_jobs_changed)
+        n_jobs_layout.addWidget(self.n_jobs_spin)
+        control_layout.addLayout(n_jobs_layout)
         # 데이터 변환 버튼
         self.convert_btn = QPushButton('MNE Raw 객체로 변환')
         self.convert_btn.clicked.connect(self.convert_to_raw)
@@ -187,10 +390,51 @@ class EEGAnalyzerGUI(QMainWindow):
         self.info_text = QTextEdit()
         self.info_text.setReadOnly(True)
         control_layout.addWidget(self.info_text)
+        control_layout.addWidget(self.create_diagnostics_group())
         control_layout.addStretch(1)
         layout.addLayout(control_layout)
         return widget
 
+    def create_diagnostics_group(self):
+        """처리 단계/화면 갱신별 시간과 메모리 계측 표 (eeg_profiling)."""
+        group = QGroupBox('진단 (단계별 시간/메모리)')
+        layout = QVBoxLayout()
+        group.setLayout(layout)
+        option_layout = QHBoxLayout()
+        self.profile_check = QCheckBox('계측')
+        self.profile_check.toggled.connect(self.on_profiling_toggled)
+        option_layout.addWidget(self.profile_check)
+        # tracemalloc은 Python 할당을 느리게 하므로 따로 끌 수 있음
+        self.profile_alloc_check = QCheckBox('할당량 계측')
+        self.profile_alloc_check.setChecked(True)
+        self.profile_alloc_check.toggled.connect(self.on_profiling_toggled)
+        option_layout.addWidget(self.profile_alloc_check)
+        layout.addLayout(option_layout)
+        self.profile_model = ArrayTableModel(np.empty((0, len(PROFILE_COLUMNS)), dtype=object),
+                                             col_labels=PROFILE_COLUMNS, parent=self)
+        self.profile_table = QTableView()
+        self.profile_table.setModel(self.profile_model)
+        self.profile_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.profile_table.setMinimumHeight(150)
+        layout.addWidget(self.profile_table)
+        button_layout = QHBoxLayout()
+        reset_btn = QPushButton('초기화')
+        reset_btn.clicked.connect(self.reset_profile)
+        button_layout.addWidget(reset_btn)
+        json_btn = QPushButton('JSON 저장')
+        json_btn.clicked.connect(lambda: self.export_profile('json'))
+        button_layout.addWidget(json_btn)
+        trace_btn = QPushButton('Chrome trace 저장')
+        trace_btn.clicked.connect(lambda: self.export_profile('trace'))
+        button_layout.addWidget(trace_btn)
+        layout.addLayout(button_layout)
+        # 켜져 있는 동안 새 기록이 있을 때만 표를 갱신
+        self._profile_version = -1
+        self.profile_timer = QTimer(self)
+        self.profile_timer.setInterval(PROFILE_REFRESH_MS)
+        self.profile_timer.timeout.connect(self.update_profile_table)
+        return group
+
     def create_quality_widget(self):
         widget = QWidget()
         layout = QVBoxLayout()
@@ -199,12 +443,26 @@ class EEGAnalyzerGUI(QMainWindow):
         auto_layout = QHBoxLayout()
         auto_layout.addWidget(QLabel('자동 탐지 기준:'))
         self.auto_method_combo = QComboBox()
-        self.auto_method_combo.addItems(['평균 제곱', '편평성', '이상치'])
+        self.auto_method_combo.addItems(list(BAD_CHANNEL_METHODS))
         auto_layout.addWidget(self.auto_method_combo)
+        auto_layout.addWidget(QLabel('임계값:'))
+        self.auto_threshold_spin = QDoubleSpinBox()
+        self.auto_threshold_spin.setDecimals(3)
+        self.auto_threshold_spin.setRange(0, 100)
+        self.auto_threshold_spin.setSingleStep(0.05)
+        self.auto_threshold_spin.setValue(AUTO_THRESHOLDS[BAD_CHANNEL_METHODS[self.auto_method_combo.currentText()]])
+        auto_layout.addWidget(self.auto_threshold_spin)
+        # 기준/임계값을 바꾸면 저장된 통계로 즉시 다시 탐지
+        self.auto_method_combo.currentTextChanged.connect(self.on_auto_method_changed)
+        self.auto_threshold_spin.valueChanged.connect(self.on_auto_threshold_changed)
         self.auto_detect_btn = QPushButton('자동 탐지')
         self.auto_detect_btn.clicked.connect(self.auto_detect_bad_channels)
         auto_layout.addWidget(self.auto_detect_btn)
         layout.addLayout(auto_layout)
+        # 채널별 파워 스펙트럼 (처리 상태별로 캐시되어 필터/실행 취소 후에도 바로 다시 그림)
+        self.psd_btn = QPushButton('파워 스펙트럼 (PSD) 보기')
+        self.psd_btn.clicked.connect(self.plot_psd)
+        layout.addWidget(self.psd_btn)
         # bad 채널 리스트
         layout.addWidget(QLabel('불량 채널 목록:'))
         self.bad_channel_list = QListWidget()
@@ -293,7 +551,7 @@ class EEGAnalyzerGUI(QMainWindow):
         layout.addWidget(self.apply_ref_btn)
         # ERP 파형 비교 버튼
         self.compare_erp_btn = QPushButton('ERP 파형 비교')
-        self.compare_erp_btn.clicked.connect(self.compare_erp)
+        self.compare_erp_btn.clicked.connect(lambda: self.compare_erp())
         layout.addWidget(self.compare_erp_btn)
         layout.addStretch(1)
         return widget
@@ -310,13 +568,43 @@ class EEGAnalyzerGUI(QMainWindow):
         self.ica_n_components.setValue(20)
         ica_comp_layout.addWidget(self.ica_n_components)
         layout.addLayout(ica_comp_layout)
+        # 피팅 방법과 수렴 허용 오차 (0이면 방법의 기본값)
+        ica_method_layout = QHBoxLayout()
+        ica_method_layout.addWidget(QLabel('피팅 방법:'))
+        self.ica_method_combo = QComboBox()
+        for method in available_ica_methods():
+            self.ica_method_combo.addItem(ICA_METHOD_LABELS[method], method)
+        ica_method_layout.addWidget(self.ica_method_combo)
+        ica_method_layout.addWidget(QLabel('허용 오차:'))
+        self.ica_tol_spin = QDoubleSpinBox()
+        self.ica_tol_spin.setDecimals(8)
+        self.ica_tol_spin.setRange(0.0, 0.1)
+        self.ica_tol_spin.setSingleStep(0.0001)
+        self.ica_tol_spin.setSpecialValueText('기본값')
+        ica_method_layout.addWidget(self.ica_tol_spin)
+        layout.addLayout(ica_method_layout)
+        # 빠른 모드: 리샘플링/고역 통과한 복사본의 아티팩트 없는 구간 일부로 피팅
+        ica_fast_layout = QHBoxLayout()
+        self.ica_fast_check = QCheckBox('빠른 피팅')
+        self.ica_fast_check.setChecked(True)
+        ica_fast_layout.addWidget(self.ica_fast_check)
+        ica_fast_layout.addWidget(QLabel('최대 샘플 수:'))
+        self.ica_samples_spin = QSpinBox()
+        self.ica_samples_spin.setRange(0, 10000000)
+        self.ica_samples_spin.setSingleStep(1000)
+        self.ica_samples_spin.setSpecialValueText('자동')
+        self.ica_fast_check.toggled.connect(self.ica_samples_spin.setEnabled)
+        ica_fast_layout.addWidget(self.ica_samples_spin)
+        layout.addLayout(ica_fast_layout)
         # ICA 버튼들
         self.fit_ica_btn = QPushButton('ICA 적용')
         self.fit_ica_btn.clicked.connect(self.fit_ica)
         self.fit_ica_btn.setEnabled(False)
         layout.addWidget(self.fit_ica_btn)
+        self.ica_time_label = QLabel('')
+        layout.addWidget(self.ica_time_label)
         self.plot_components_btn = QPushButton('ICA 컴포넌트 시각화')
-        self.plot_components_btn.clicked.connect(self.plot_ica_components)
+        self.plot_components_btn.clicked.connect(lambda: self.plot_ica_components())
         self.plot_components_btn.setEnabled(False)
         layout.addWidget(self.plot_components_btn)
         # ICA 컴포넌트 제거 설정
@@ -346,10 +634,13 @@ class EEGAnalyzerGUI(QMainWindow):
         event_layout.addWidget(self.load_events_btn)
         layout.addLayout(event_layout)
         # 이벤트 테이블
-        self.event_table = QTableWidget()
-        self.event_table.setColumnCount(3)
-        self.event_table.setHorizontalHeaderLabels(['샘플', '이전 값', '이벤트 ID'])
+        self.event_model = ArrayTableModel(np.empty((0, 3), dtype=int),
+                                           col_labels=['샘플', '이전 값', '이벤트 ID'], parent=self)
+        self.event_table = QTableView()
+        self.event_table.setModel(self.event_model)
+        self.event_table.setEditTriggers(QTableView.NoEditTriggers)
         self.event_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.event_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         layout.addWidget(self.event_table)
         # 에포크 설정
         epoch_settings_layout = QVBoxLayout()
@@ -383,7 +674,33 @@ class EEGAnalyzerGUI(QMainWindow):
         baseline_layout.addWidget(QLabel('-'))
         baseline_layout.addWidget(self.baseline_end_spin)
         epoch_settings_layout.addLayout(baseline_layout)
+        # 에포크 인덱스는 창 범위만 바꾸면 되므로 값이 바뀔 때 바로 반영
+        for spin in (self.tmin_spin, self.tmax_spin, self.baseline_start_spin,
+                     self.baseline_end_spin):
+            spin.valueChanged.connect(self.on_epoch_window_changed)
         layout.addLayout(epoch_settings_layout)
+        # 에포크 거부 (ERP 추출 때 peak-to-peak 진폭 기준으로 적용)
+        reject_group = QGroupBox('에포크 거부')
+        reject_layout = QVBoxLayout()
+        reject_group.setLayout(reject_layout)
+        self.reject_mode_combo = QComboBox()
+        self.reject_mode_combo.addItems(list(REJECT_MODE_LABELS))
+        self.reject_mode_combo.currentTextChanged.connect(self.on_reject_mode_changed)
+        reject_layout.addWidget(self.reject_mode_combo)
+        reject_value_layout = QHBoxLayout()
+        reject_value_layout.addWidget(QLabel('최대 (uV):'))
+        self.reject_spin = QDoubleSpinBox()
+        self.reject_spin.setRange(1.0, 10000.0)
+        self.reject_spin.setValue(150.0)
+        self.reject_spin.setEnabled(False)
+        reject_value_layout.addWidget(self.reject_spin)
+        reject_value_layout.addWidget(QLabel('최소 (uV, 0이면 없음):'))
+        self.flat_spin = QDoubleSpinBox()
+        self.flat_spin.setRange(0.0, 1000.0)
+        self.flat_spin.setValue(0.0)
+        reject_value_layout.addWidget(self.flat_spin)
+        reject_layout.addLayout(reject_value_layout)
+        layout.addWidget(reject_group)
         # ERP 추출 버튼
         self.extract_erp_btn = QPushButton('ERP 추출')
         self.extract_erp_btn.clicked.connect(self.extract_erp)
@@ -391,45 +708,204 @@ class EEGAnalyzerGUI(QMainWindow):
         layout.addWidget(self.extract_erp_btn)
         # ERP 플롯 버튼
         self.plot_erp_btn = QPushButton('ERP 플롯')
-        self.plot_erp_btn.clicked.connect(self.plot_erp)
+        self.plot_erp_btn.clicked.connect(lambda: self.plot_erp())
         self.plot_erp_btn.setEnabled(False)
         layout.addWidget(self.plot_erp_btn)
+        # 조건 선택과 신뢰 구간 표시 (조건별 누적값으로 바로 다시 그림)
+        erp_view_layout = QHBoxLayout()
+        erp_view_layout.addWidget(QLabel('조건:'))
+        self.erp_condition_combo = QComboBox()
+        self.erp_condition_combo.currentIndexChanged.connect(self.on_erp_view_changed)
+        erp_view_layout.addWidget(self.erp_condition_combo)
+        self.erp_ci_check = QCheckBox('95% 신뢰 구간')
+        self.erp_ci_check.toggled.connect(self.on_erp_view_changed)
+        erp_view_layout.addWidget(self.erp_ci_check)
+        layout.addLayout(erp_view_layout)
+        # 시간-주파수 분석 (조건 선택은 ERP와 공유)
+        tfr_group = QGroupBox('시간-주파수 분석')
+        tfr_layout = QVBoxLayout()
+        tfr_group.setLayout(tfr_layout)
+        self.tfr_method_combo = QComboBox()
+        self.tfr_method_combo.addItems(list(TFR_METHOD_LABELS))
+        tfr_layout.addWidget(self.tfr_method_combo)
+        tfr_freq_layout = QHBoxLayout()
+        tfr_freq_layout.addWidget(QLabel('주파수 (Hz):'))
+        self.tfr_fmin_spin = QDoubleSpinBox()
+        self.tfr_fmin_spin.setRange(0.5, 500)
+        self.tfr_fmin_spin.setValue(4.0)
+        tfr_freq_layout.addWidget(self.tfr_fmin_spin)
+        tfr_freq_layout.addWidget(QLabel('-'))
+        self.tfr_fmax_spin = QDoubleSpinBox()
+        self.tfr_fmax_spin.setRange(0.5, 500)
+        self.tfr_fmax_spin.setValue(40.0)
+        tfr_freq_layout.addWidget(self.tfr_fmax_spin)
+        tfr_freq_layout.addWidget(QLabel('간격:'))
+        self.tfr_step_spin = QDoubleSpinBox()
+        self.tfr_step_spin.setRange(0.1, 50)
+        self.tfr_step_spin.setValue(2.0)
+        tfr_freq_layout.addWidget(self.tfr_step_spin)
+        tfr_layout.addLayout(tfr_freq_layout)
+        tfr_cycles_layout = QHBoxLayout()
+        tfr_cycles_layout.addWidget(QLabel('주기 수 (주파수 x):'))
+        self.tfr_cycles_spin = QDoubleSpinBox()
+        self.tfr_cycles_spin.setRange(0.05, 5.0)
+        self.tfr_cycles_spin.setSingleStep(0.05)
+        self.tfr_cycles_spin.setValue(0.5)
+        tfr_cycles_layout.addWidget(self.tfr_cycles_spin)
+        tfr_layout.addLayout(tfr_cycles_layout)
+        self.tfr_btn = QPushButton('시간-주파수 계산')
+        self.tfr_btn.clicked.connect(self.compute_tfr)
+        self.tfr_btn.setEnabled(False)
+        tfr_layout.addWidget(self.tfr_btn)
+        # 표시 값과 baseline 정규화 (계산 결과로 바로 다시 그림)
+        tfr_view_layout = QHBoxLayout()
+        self.tfr_measure_combo = QComboBox()
+        self.tfr_measure_combo.addItems(list(TFR_MEASURE_LABELS))
+        self.tfr_measure_combo.currentIndexChanged.connect(self.on_erp_view_changed)
+        tfr_view_layout.addWidget(self.tfr_measure_combo)
+        tfr_view_layout.addWidget(QLabel('Baseline:'))
+        self.tfr_baseline_combo = QComboBox()
+        self.tfr_baseline_combo.addItems(list(TFR_BASELINE_LABELS))
+        self.tfr_baseline_combo.currentIndexChanged.connect(self.on_erp_view_changed)
+        tfr_view_layout.addWidget(self.tfr_baseline_combo)
+        tfr_layout.addLayout(tfr_view_layout)
+        layout.addWidget(tfr_group)
         layout.addStretch(1)
         return widget
 
+    def create_stream_widget(self):
+        widget = QWidget()
+        layout = QVBoxLayout()
+        widget.setLayout(layout)
+        # 입력 설정
+        input_group = QGroupBox('입력')
+        input_layout = QVBoxLayout()
+        input_group.setLayout(input_layout)
+        protocol_layout = QHBoxLayout()
+        protocol_layout.addWidget(QLabel('방식:'))
+        self.stream_protocol_combo = QComboBox()
+        self.stream_protocol_combo.addItems(list(STREAM_PROTOCOL_LABELS))
+        self.stream_protocol_combo.currentTextChanged.connect(self.on_stream_protocol_changed)
+        protocol_layout.addWidget(self.stream_protocol_combo)
+        input_layout.addLayout(protocol_layout)
+        address_layout = QHBoxLayout()
+        address_layout.addWidget(QLabel('주소:'))
+        self.stream_host_edit = QLineEdit('127.0.0.1')
+        address_layout.addWidget(self.stream_host_edit)
+        address_layout.addWidget(QLabel('포트:'))
+        self.stream_port_spin = QSpinBox()
+        self.stream_port_spin.setRange(1, 65535)
+        self.stream_port_spin.setValue(5555)
+        address_layout.addWidget(self.stream_port_spin)
+        input_layout.addLayout(address_layout)
+        path_layout = QHBoxLayout()
+        self.stream_path_edit = QLineEdit()
+        self.stream_path_edit.setPlaceholderText('계속 기록되는 CSV 파일')
+        path_layout.addWidget(self.stream_path_edit)
+        self.stream_path_btn = QPushButton('찾아보기')
+        self.stream_path_btn.clicked.connect(self.choose_stream_file)
+        path_layout.addWidget(self.stream_path_btn)
+        input_layout.addLayout(path_layout)
+        format_layout = QHBoxLayout()
+        format_layout.addWidget(QLabel('채널 수:'))
+        self.stream_channels_spin = QSpinBox()
+        self.stream_channels_spin.setRange(1, 512)
+        self.stream_channels_spin.setValue(64)
+        format_layout.addWidget(self.stream_channels_spin)
+        format_layout.addWidget(QLabel('샘플링 주파수 (Hz):'))
+        self.stream_sfreq_spin = QSpinBox()
+        self.stream_sfreq_spin.setRange(1, 20000)
+        self.stream_sfreq_spin.setValue(1000)
+        format_layout.addWidget(self.stream_sfreq_spin)
+        input_layout.addLayout(format_layout)
+        layout.addWidget(input_group)
+        # 인과 필터 (수신 스레드에서 블록마다 상태를 이어서 적용)
+        filter_group = QGroupBox('실시간 필터')
+        filter_layout = QVBoxLayout()
+        filter_group.setLayout(filter_layout)
+        self.stream_filter_combo = QComboBox()
+        self.stream_filter_combo.addItems(list(STREAM_FILTER_LABELS))
+        filter_layout.addWidget(self.stream_filter_combo)
+        band_layout = QHBoxLayout()
+        band_layout.addWidget(QLabel('대역 (Hz):'))
+        self.stream_l_freq_spin = QDoubleSpinBox()
+        self.stream_l_freq_spin.setRange(0, 1000)
+        self.stream_l_freq_spin.setValue(1.0)
+        band_layout.addWidget(self.stream_l_freq_spin)
+        band_layout.addWidget(QLabel('-'))
+        self.stream_h_freq_spin = QDoubleSpinBox()
+        self.stream_h_freq_spin.setRange(0, 5000)
+        self.stream_h_freq_spin.setValue(40.0)
+        band_layout.addWidget(self.stream_h_freq_spin)
+        filter_layout.addLayout(band_layout)
+        notch_layout = QHBoxLayout()
+        notch_layout.addWidget(QLabel('노치 (Hz, 0이면 없음):'))
+        self.stream_notch_spin = QDoubleSpinBox()
+        self.stream_notch_spin.setRange(0, 1000)
+        self.stream_notch_spin.setValue(50.0)
+        notch_layout.addWidget(self.stream_notch_spin)
+        filter_layout.addLayout(notch_layout)
+        layout.addWidget(filter_group)
+        # 시작/정지 (표시 구간은 플롯 컨트롤의 '표시 구간'을 따름)
+        self.stream_btn = QPushButton('스트림 시작')
+        self.stream_btn.clicked.connect(self.toggle_stream)
+        layout.addWidget(self.stream_btn)
+        self.stream_status_label = QLabel('정지됨')
+        self.stream_status_label.setWordWrap(True)
+        layout.addWidget(self.stream_status_label)
+        self.stream_latency_label = QLabel('')
+        self.stream_latency_label.setWordWrap(True)
+        layout.addWidget(self.stream_latency_label)
+        layout.addStretch(1)
+        self.on_stream_protocol_changed(self.stream_protocol_combo.currentText())
+        return widget
+
     def load_csv(self):
         file_name, _ = QFileDialog.getOpenFileName(
             self, 'CSV 파일 선택', '', 'CSV files (*.csv)')
         if file_name:
-            try:
-                self.df = pd.read_csv(file_name)
+            def work(ctx):
+                # 바이너리 캐시가 있으면 바로 매핑하고, 없으면 청크 단위로 파싱하여 캐시에 저장
+                return pipeline.load_recording(file_name, progress=ctx.progress)
+
+            def done(result):
+                self.csv_data, ch_names = result
+                self.csv_file = file_name
+                self.invalidate_cache_btn.setEnabled(True)
+                self.df = pd.DataFrame(self.csv_data[:, :PREVIEW_SAMPLES].T, columns=ch_names)
                 self.info_text.append(f'파일 로드 완료: {file_name}')
-                self.info_text.append(f'데이터 형태: {self.df.shape}')
+                self.info_text.append(f'데이터 형태: {self.csv_data.shape[::-1]}')
                 # 채널 이름을 자동으로 채널 입력란에 표시
                 channel_names = ','.join(self.df.columns)
                 self.channel_text.setText(channel_names)
+                self.bad_channels.set_channels(ch_names)
                 self.convert_btn.setEnabled(True)
                 # 결과창에 DataFrame과 그래프 표시
-                self.show_result_df_in_table(self.df)
+                self.show_data_in_table(self.csv_data, ch_names)
                 self.plot_data_preview()
-            except Exception as e:
-                QMessageBox.critical(self, '오류', f'파일 로드 중 오류 발생: {str(e)}')
+
+            self.run_job('파일 로드', work, done, '파일 로드')
+
+    def invalidate_cache(self):
+        if not self.csv_file:
+            return
+        removed = get_default_cache().invalidate(self.csv_file)
+        self.info_text.append(f'캐시 항목 {removed}개 삭제: {self.csv_file}')
 
     def convert_to_raw(self):
-        try:
-            ch_names = list(self.df.columns)
-            if not ch_names:
-                raise ValueError("CSV 파일에 채널 이름이 없습니다.")
-            data = self.df.values.T
-            if len(ch_names) != data.shape[0]:
-                raise ValueError(f"채널 수({len(ch_names)})가 데이터 채널 수({data.shape[0]})와 일치하지 않습니다.")
-            info = mne.create_info(ch_names=ch_names, 
-                                 sfreq=self.sfreq_spin.value(), 
-                                 ch_types='eeg')
-            self.raw = mne.io.RawArray(data, info)
-            # 표준 10-20 몽타주 적용 (채널명이 표준과 맞는 경우)
-            montage = mne.channels.make_standard_montage('standard_1020')
-            self.raw.set_montage(montage, match_case=False)
+        sfreq = self.sfreq_spin.value()
+
+        def work(ctx):
+            # memmap 버퍼를 그대로 사용 (RawArray는 float64 배열을 복사하지 않음)
+            return pipeline.make_raw(self.csv_data, list(self.df.columns), sfreq)
+
+        def done(raw):
+            self.raw = raw
+            self.chain = ProcessingChain(raw, n_jobs=self.n_jobs_spin.value())
+            self.ica = None
+            self._pre_interpolate_data = None
+            self._pre_interpolate_bads = []
+            self.update_history_buttons()
             self.info_text.append('\nMNE Raw 객체 생성 완료')
             self.info_text.append(f'채널 수: {len(self.raw.ch_names)}')
             self.info_text.append(f'데이터 길이: {self.raw.times[-1]:.2f}초')
@@ -438,65 +914,154 @@ class EEGAnalyzerGUI(QMainWindow):
             self.load_events_btn.setEnabled(True)
             # MNE 변환 후 버튼 활성화
             self.mne_radio.setEnabled(True)
+            self.bad_channels.set_channels(self.raw.ch_names, self.raw.info['bads'])
+            self.on_raw_changed()
             # 데이터 플롯
             self.update_plot_by_radio()
-            self.show_result_df_in_table(self.df)
-        except Exception as e:
-            QMessageBox.critical(self, '오류', f'변환 중 오류 발생: {str(e)}')
-    
+
+        self.run_job('Raw 변환', work, done, '변환')
+
     def apply_filters(self):
         if self.raw is None:
             return
-            
-        try:
-            # 대역 통과 필터 적용
-            self.raw.filter(
-                l_freq=self.low_freq_spin.value(),
-                h_freq=self.high_freq_spin.value(),
-                picks='eeg'
-            )
-            
-            # 노치 필터 적용
-            if self.notch_check.isChecked():
-                self.raw.notch_filter(
-                    freqs=self.notch_freq_spin.value(),
-                    picks='eeg'
-                )
-            
+
+        l_freq = self.low_freq_spin.value()
+        h_freq = self.high_freq_spin.value()
+        notch_freq = self.notch_freq_spin.value() if self.notch_check.isChecked() else None
+        # 같은 종류의 필터 단계는 겹쳐 쌓지 않고 파라미터만 바꿈 (아래 단계만 다시 계산).
+        # 노치는 대역 통과와 한 커널로 합성되어 데이터를 한 번만 순회
+        steps = steps_with(self.chain.steps, ProcessingStep('bandpass', {
+            'l_freq': l_freq, 'h_freq': h_freq, 'notch': notch_freq}))
+
+        def done():
             self.info_text.append('\n필터 적용 완료')
-            self.info_text.append(f'대역 통과: {self.low_freq_spin.value()}-{self.high_freq_spin.value()} Hz')
-            if self.notch_check.isChecked():
-                self.info_text.append(f'노치 필터: {self.notch_freq_spin.value()} Hz')
-            
-            # 데이터 플롯 업데이트
+            self.info_text.append(f'대역 통과: {l_freq}-{h_freq} Hz')
+            if notch_freq is not None:
+                self.info_text.append(f'노치 필터: {notch_freq} Hz')
+
+        self.run_chain('필터', steps, done, '필터 적용')
+
+    def on_n_jobs_changed(self, n_jobs):
+        if self.chain is not None:
+            self.chain.n_jobs = n_jobs
+
+    def run_chain(self, name, steps, done=None, error_context='처리', commit=None):
+        """
+        체인의 단계 목록을 steps로 바꿔 출력을 계산합니다.
+
+        캐시에 있는 단계는 건너뛰며, 실패하거나 취소되면 체인은 바뀌지 않습니다.
+        commit은 출력을 적용하기 직전에 체인의 단계 목록을 바꾸는 함수입니다
+        (기본: 실행 취소 기록을 남기는 chain.set_steps(steps), 실행 취소/다시 실행은
+        chain.undo/chain.redo).
+        """
+        chain = self.chain
+        if commit is None:
+            commit = lambda: chain.set_steps(steps)
+
+        def finish(raw):
+            if chain is not self.chain:
+                return
+            commit()
+            self.set_chain_output(raw)
+            if done is not None:
+                done()
+
+        if chain.is_cached(steps):
+            finish(chain.compute(steps))
+            return
+
+        def work(ctx):
+            return chain.compute(steps, progress=ctx.progress)
+
+        self.run_job(name, work, finish, error_context)
+
+    def set_chain_output(self, raw):
+        """체인 출력으로 raw를 교체하고 표시/상태를 갱신합니다."""
+        self.raw = raw
+        # 불량 채널 표시는 체인 출력과 별개로 모델을 따름
+        self.raw.info['bads'] = self.bad_channels.bads()
+        step = self.chain.find('interpolate')
+        # 보간으로 바뀌는 불량 채널의 원래 신호만 보관 (bads 순서). 보간 입력이 합성된
+        # 선형 단계의 중간 출력이면 누적 연산의 해당 행만 계산
+        pre = None if step is None else self.chain.input_rows('interpolate', step.params['bads'])
+        if pre is not None:
+            self._pre_interpolate_bads = list(step.params['bads'])
+            self._pre_interpolate_data = pre
+        else:
+            self._pre_interpolate_data = None
+            self._pre_interpolate_bads = []
+        self.update_history_buttons()
+        self.info_text.append(f'처리 단계: {describe_steps(self.chain.steps)} '
+                              f'(이력 메모리 {self.chain.cache_bytes() / 1024 ** 2:.1f} MB)')
+        self.on_raw_changed()
+        # 데이터 플롯 업데이트 (스펙트럼을 보고 있었으면 새 상태의 스펙트럼으로)
+        if self._canvas_mode == 'psd':
+            self.plot_psd()
+        else:
             self.update_plot_by_radio()
-            
-        except Exception as e:
-            QMessageBox.critical(self, '오류', f'필터 적용 중 오류 발생: {str(e)}')
-    
+
+    def update_history_buttons(self):
+        self.undo_btn.setEnabled(self.chain is not None and self.chain.can_undo())
+        self.redo_btn.setEnabled(self.chain is not None and self.chain.can_redo())
+
+    def undo_processing(self):
+        if self.chain is None or not self.chain.can_undo():
+            return
+        chain = self.chain
+
+        def done():
+            self.info_text.append('\n실행 취소 완료')
+
+        self.run_chain('실행 취소', chain.undo_steps(), done, '실행 취소', commit=chain.undo)
+
+    def redo_processing(self):
+        if self.chain is None or not self.chain.can_redo():
+            return
+        chain = self.chain
+
+        def done():
+            self.info_text.append('\n다시 실행 완료')
+
+        self.run_chain('다시 실행', chain.redo_steps(), done, '다시 실행', commit=chain.redo)
+
     def fit_ica(self):
         if self.raw is None:
             return
-            
-        try:
-            # ICA 객체 생성 및 피팅
-            self.ica = mne.preprocessing.ICA(
-                n_components=self.ica_n_components.value(),
-                random_state=42
-            )
-            
-            self.ica.fit(self.raw)
-            
+
+        n_components = self.ica_n_components.value()
+        bads = self.bad_channels.bads()
+        options = self.ica_fit_options()
+        chain = self.chain
+        steps = chain.steps
+
+        def work(ctx):
+            # ICA 객체 생성 및 피팅 (같은 입력/파라미터의 피팅은 체인에서 재사용)
+            fitted = chain.fit_ica(n_components, bads=bads, steps=steps, progress=ctx.progress,
+                                   options=options)
+            ctx.check_cancelled()
+            return fitted
+
+        def done(fitted):
+            ica, summary = fitted
+            self.ica = ica
+            self._ica_fit_params = (n_components, bads, options)
+            self.ica_time_label.setText(f'피팅 시간: {summary.total_sec:.2f}초')
             self.info_text.append('\nICA 피팅 완료')
-            self.info_text.append(f'컴포넌트 수: {self.ica_n_components.value()}')
-            
+            self.info_text.append(f'컴포넌트 수: {n_components}')
+            self.info_text.append(f'피팅: {summary.describe()}')
             # ICA 관련 버튼 활성화
             self.plot_components_btn.setEnabled(True)
             self.apply_ica_btn.setEnabled(True)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '오류', f'ICA 피팅 중 오류 발생: {str(e)}')
-    
+
+        self.run_job('ICA 피팅', work, done, 'ICA 피팅')
+
+    def ica_fit_options(self):
+        tol = self.ica_tol_spin.value()
+        samples = self.ica_samples_spin.value()
+        return IcaFitOptions(method=self.ica_method_combo.currentData(), tol=tol or None,
+                             fast=self.ica_fast_check.isChecked(), max_samples=samples or None)
+
+    @profiled(category='redraw')
     def plot_ica_components(self):
         if self.ica is None:
             return
@@ -510,28 +1075,29 @@ class EEGAnalyzerGUI(QMainWindow):
         if self.ica is None or self.raw is None:
             return
             
+        # 제거할 컴포넌트 파싱
+        exclude_str = self.ica_exclude_text.toPlainText().strip()
+        if not exclude_str:
+            QMessageBox.warning(self, '경고', '제거할 컴포넌트를 선택해주세요.')
+            return
         try:
-            # 제거할 컴포넌트 파싱
-            exclude_str = self.ica_exclude_text.toPlainText().strip()
-            if not exclude_str:
-                QMessageBox.warning(self, '경고', '제거할 컴포넌트를 선택해주세요.')
-                return
-                
             exclude_components = [int(x.strip()) for x in exclude_str.split(',')]
-            
-            # ICA 적용
-            self.ica.exclude = exclude_components
-            self.raw = self.ica.apply(self.raw.copy())
-            
+        except ValueError as e:
+            QMessageBox.critical(self, '오류', f'ICA 적용 중 오류 발생: {str(e)}')
+            return
+
+        n_components, bads, options = self._ica_fit_params
+        # 피팅과 같은 파라미터이므로 체인이 피팅 결과를 재사용 (컴포넌트만 바꾸면 재피팅 없음)
+        steps = steps_with(self.chain.steps, ProcessingStep('ica', {
+            'n_components': n_components, 'components': exclude_components,
+            'bads': bads, 'random_state': 42, 'fit': options.to_dict()}))
+
+        def done():
             self.info_text.append('\nICA 컴포넌트 제거 완료')
             self.info_text.append(f'제거된 컴포넌트: {exclude_components}')
-            
-            # 데이터 플롯 업데이트
-            self.update_plot_by_radio()
-            
-        except Exception as e:
-            QMessageBox.critical(self, '오류', f'ICA 적용 중 오류 발생: {str(e)}')
-    
+
+        self.run_chain('ICA 제거', steps, done, 'ICA 적용')
+
     def load_events(self):
         if self.raw is None:
             return
@@ -542,21 +1108,10 @@ class EEGAnalyzerGUI(QMainWindow):
             
             if file_name:
                 # 이벤트 데이터 로드
-                events_df = pd.read_csv(file_name)
-                if len(events_df.columns) != 3:
-                    raise ValueError("이벤트 파일은 3개의 열(샘플, 이전 값, 이벤트 ID)을 가져야 합니다.")
-                
-                self.events = events_df.values
+                self.events, self.event_id = pipeline.load_events(file_name)
                 
-                # 이벤트 테이블 업데이트
-                self.event_table.setRowCount(len(self.events))
-                for i, event in enumerate(self.events):
-                    for j, value in enumerate(event):
-                        self.event_table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-                # 고유한 이벤트 ID 수집
-                unique_ids = np.unique(self.events[:, 2])
-                self.event_id = {f'Event_{id}': int(id) for id in unique_ids}
+                # 이벤트 테이블 업데이트 (배열을 그대로 모델에 연결)
+                self.event_model.set_array(self.events, col_labels=['샘플', '이전 값', '이벤트 ID'])
                 
                 self.info_text.append('\n이벤트 로드 완료')
                 self.info_text.append(f'이벤트 수: {len(self.events)}')
@@ -571,61 +1126,184 @@ class EEGAnalyzerGUI(QMainWindow):
     def extract_erp(self):
         if self.raw is None or self.events is None:
             return
-            
+
+        tmin = self.tmin_spin.value()
+        tmax = self.tmax_spin.value()
+        baseline = (self.baseline_start_spin.value(), self.baseline_end_spin.value())
+
         try:
-            # 에포크 생성
-            self.epochs = mne.Epochs(
-                self.raw,
-                self.events,
-                event_id=self.event_id,
-                tmin=self.tmin_spin.value(),
-                tmax=self.tmax_spin.value(),
-                baseline=(self.baseline_start_spin.value(), self.baseline_end_spin.value()),
-                preload=True
-            )
-            
-            self.info_text.append('\nERP 추출 완료')
-            self.info_text.append(f'에포크 수: {len(self.epochs)}')
-            self.info_text.append(f'시간 범위: {self.tmin_spin.value()}-{self.tmax_spin.value()}초')
-            self.info_text.append(f'Baseline: {self.baseline_start_spin.value()}-{self.baseline_end_spin.value()}초')
-            
-            # ERP 플롯 버튼 활성화
-            self.plot_erp_btn.setEnabled(True)
-            
+            # 에포크 인덱스 생성 (이벤트 위치만 저장하므로 데이터를 읽지 않음)
+            epochs = pipeline.make_epochs(self.raw, self.events, self.event_id,
+                                          tmin, tmax, baseline)
         except Exception as e:
             QMessageBox.critical(self, '오류', f'ERP 추출 중 오류 발생: {str(e)}')
-    
+            return
+        mode = REJECT_MODE_LABELS[self.reject_mode_combo.currentText()]
+        flat = self.flat_spin.value() * 1e-6 or None
+        if mode is None and flat is None:
+            self.set_epochs(epochs)
+            return
+        reject = 'auto' if mode == 'auto' else (
+            self.reject_spin.value() * 1e-6 if mode == 'fixed' else None)
+        n_jobs = self.n_jobs_spin.value()
+
+        def work(ctx):
+            # 모든 에포크 x 채널의 peak-to-peak를 한 번 계산하고 (자동이면 채널별 교차 검증)
+            # 기준을 넘는 에포크를 뺌. 불량 채널은 검사하지 않음
+            return reject_epochs(epochs, reject, flat, n_jobs=n_jobs, progress=ctx.progress)
+
+        def done(result):
+            kept, report = result
+            self.set_epochs(kept)
+            self.info_text.append(f'에포크 거부: {report.describe()}')
+            if len(kept) == 0:
+                QMessageBox.warning(self, '경고', '모든 에포크가 거부되었습니다. 임계값을 확인하세요.')
+
+        self.run_job('에포크 거부', work, done, '에포크 거부')
+
+    def on_reject_mode_changed(self, label):
+        self.reject_spin.setEnabled(REJECT_MODE_LABELS[label] == 'fixed')
+
+    def set_epochs(self, epochs):
+        """추출한 에포크 인덱스를 현재 에포크로 설정하고 조건 목록/버튼을 갱신합니다."""
+        self.epochs = epochs
+        tmin, tmax, baseline = epochs.tmin, epochs.tmax, epochs.baseline
+        self.info_text.append('\nERP 추출 완료')
+        self.info_text.append(f'에포크 수: {len(self.epochs)}')
+        self.info_text.append(f'시간 범위: {tmin}-{tmax}초')
+        self.info_text.append(f'Baseline: {baseline[0]}-{baseline[1]}초')
+        self.tfr = None
+        self.update_erp_conditions()
+        # ERP 플롯 버튼 활성화
+        self.plot_erp_btn.setEnabled(True)
+        self.tfr_btn.setEnabled(True)
+
+    def update_erp_conditions(self):
+        current = self.erp_condition_combo.currentData()
+        self.erp_condition_combo.blockSignals(True)
+        self.erp_condition_combo.clear()
+        self.erp_condition_combo.addItem(f'전체 ({len(self.epochs)})', None)
+        for name in self.epochs.conditions:
+            self.erp_condition_combo.addItem(f'{name} ({self.epochs.count(name)})', name)
+        index = self.erp_condition_combo.findData(current)
+        self.erp_condition_combo.setCurrentIndex(max(index, 0))
+        self.erp_condition_combo.blockSignals(False)
+
+    def on_erp_view_changed(self):
+        if self.epochs is not None and self._canvas_mode == 'erp':
+            self.plot_erp()
+        elif self.tfr is not None and self._canvas_mode == 'tfr':
+            self.plot_tfr()
+
+    def on_epoch_window_changed(self):
+        if self.epochs is None:
+            return
+        baseline = (self.baseline_start_spin.value(), self.baseline_end_spin.value())
+        try:
+            self.epochs = self.epochs.rewindow(self.tmin_spin.value(), self.tmax_spin.value(),
+                                               baseline)
+        except ValueError:
+            # baseline이 창 밖에 있는 중간 입력 상태는 무시
+            return
+        # 창이 바뀌면 시간-주파수 결과는 다시 계산해야 함
+        self.tfr = None
+        self.update_erp_conditions()
+        if self._canvas_mode in ('erp', 'tfr'):
+            self.plot_erp()
+
+    @profiled(category='redraw')
     def plot_erp(self):
         if self.epochs is None:
             return
             
         try:
             self.clear_plot_layout()
-            erp = self.epochs.average()
-            colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-            for i, ch_name in enumerate(erp.ch_names):
-                row_layout = QHBoxLayout()
-                label = QLabel(ch_name)
-                label.setFixedWidth(60)
-                pw = pg.PlotWidget()
-                pw.setBackground(None)
-                scale = np.std(erp.data[i]) * 2
-                pw.plot(erp.times, erp.data[i] / scale, pen=pg.mkPen(color=colors[i % len(colors)], width=2))
-                pw.setXRange(0, erp.times[-1])
-                pw.setMouseEnabled(x=True, y=False)
-                pw.setLimits(xMin=0, xMax=erp.times[-1])
-                pw.plotItem.showAxis('left', True)
-                pw.plotItem.showAxis('bottom', True)
-                pw.getAxis('left').setStyle(showValues=True)
-                pw.getAxis('bottom').setStyle(showValues=True)
-                pw.getAxis('left').setPen(None)
-                pw.getAxis('bottom').setPen(None)
-                row_layout.addWidget(label)
-                row_layout.addWidget(pw)
-                self.plot_layout.addLayout(row_layout)
+            # 조건별 누적값에서 평균/표준오차를 바로 계산 (에포크를 다시 읽지 않음)
+            condition = self.erp_condition_combo.currentData()
+            mean = self.epochs.mean(condition)
+            if mean is None:
+                QMessageBox.warning(self, '경고', '선택한 조건의 에포크가 없습니다.')
+                return
+            sem = self.epochs.sem(condition) if self.erp_ci_check.isChecked() else None
+            times = self.epochs.times
+            self._canvas_mode = 'erp'
+            self.canvas.set_channels(self.epochs.ch_names)
+            for i in range(len(self.epochs.ch_names)):
+                self.canvas.set_style(i, channel_pen(i, width=2))
+                if sem is None:
+                    self.canvas.set_trace(i, times, mean[i])
+                    continue
+                lower = mean[i] - 1.96 * sem[i]
+                upper = mean[i] + 1.96 * sem[i]
+                self.canvas.set_trace(i, times, mean[i], norm_y=np.concatenate([lower, upper]))
+                self.canvas.set_band(i, times, lower, upper, channel_pen(i, alpha=60).color())
+            self.canvas.set_x_range(0, times[-1])
         except Exception as e:
             QMessageBox.critical(self, '오류', f'ERP 플롯 중 오류 발생: {str(e)}')
-    
+
+    def compute_tfr(self):
+        if self.epochs is None:
+            return
+        fmin, fmax = self.tfr_fmin_spin.value(), self.tfr_fmax_spin.value()
+        if fmin >= fmax:
+            QMessageBox.warning(self, '경고', '최저 주파수가 최고 주파수보다 작아야 합니다.')
+            return
+        epochs = self.epochs
+        method = TFR_METHOD_LABELS[self.tfr_method_combo.currentText()]
+        step = self.tfr_step_spin.value()
+        cycles = self.tfr_cycles_spin.value()
+        n_jobs = self.n_jobs_spin.value()
+
+        def work(ctx):
+            # 에포크를 배치로 읽어 조건별 파워/위상 합만 누적 (커널 FFT는 설정별로 캐시)
+            return tfr_epochs(epochs, fmin, fmax, step, cycles, method, n_jobs=n_jobs,
+                              progress=ctx.progress)
+
+        def done(result):
+            if epochs is not self.epochs:
+                # 계산 중에 에포크 창이 바뀐 결과는 버림
+                return
+            self.tfr = result
+            self.info_text.append(f'시간-주파수 계산 완료: {len(result.freqs)}개 주파수 '
+                                  f'({result.freqs[0]:g}-{result.freqs[-1]:g} Hz), '
+                                  f'에포크 {result.n()}개')
+            self.plot_tfr()
+
+        self.run_job('시간-주파수 분석', work, done, '시간-주파수 분석')
+
+    @profiled(category='redraw')
+    def plot_tfr(self):
+        if self.tfr is None:
+            return
+        try:
+            self.clear_plot_layout()
+            condition = self.erp_condition_combo.currentData()
+            measure = TFR_MEASURE_LABELS[self.tfr_measure_combo.currentText()]
+            data = self.tfr.data(measure, condition)
+            if data is None:
+                QMessageBox.warning(self, '경고', '선택한 조건의 에포크가 없습니다.')
+                return
+            mode = TFR_BASELINE_LABELS[self.tfr_baseline_combo.currentText()]
+            times = self.tfr.times
+            if measure != 'itc' and mode is not None and self.tfr.baseline is not None:
+                data = apply_baseline(data, times, self.tfr.baseline, mode)
+                # 0(또는 비율 1) 중심의 발산형 색 표
+                center = 1.0 if mode == 'ratio' else 0.0
+                half = float(np.nanmax(np.abs(data - center))) or 1.0
+                levels = (center - half, center + half)
+                lut = pg.colormap.get('CET-D1').getLookupTable(nPts=256)
+            else:
+                levels = (float(np.nanmin(data)), float(np.nanmax(data)) or 1.0)
+                lut = pg.colormap.get('viridis').getLookupTable(nPts=256)
+            self._canvas_mode = 'tfr'
+            self.canvas.set_channels(self.tfr.ch_names)
+            # 채널 줄마다 (주파수, 시간) 이미지 (아래가 낮은 주파수), 모든 채널이 같은 색 범위
+            for i in range(len(self.tfr.ch_names)):
+                self.canvas.set_image(i, data[i], times[0], times[-1], levels, lut)
+            self.canvas.set_x_range(times[0], times[-1])
+        except Exception as e:
+            QMessageBox.critical(self, '오류', f'시간-주파수 플롯 중 오류 발생: {str(e)}')
+
     def update_plot_by_radio(self):
         self.clear_plot_layout()
         if self.raw_radio.isChecked():
@@ -633,243 +1311,283 @@ class EEGAnalyzerGUI(QMainWindow):
         elif self.mne_radio.isChecked():
             self.plot_data()
 
+    def on_raw_changed(self):
+        """raw 데이터가 바뀐 뒤 호출: 표시용 피라미드를 백그라운드에서 다시 만듭니다."""
+        self.pyramid = None
+        # 이전 상태의 채널 통계는 더 이상 유효하지 않음
+        self._raw_version += 1
+        self._quality_stats = None
+        self._spectrum = None
+        self._auto_detect_live = False
+        raw = self.raw
+
+        def work(ctx):
+            return MinMaxPyramid.from_raw(raw, progress=ctx.progress)
+
+        def done(pyramid):
+            # 그 사이 raw가 다시 바뀌었다면 버림
+            if raw is self.raw:
+                self.pyramid = pyramid
+
+        def on_error(e):
+            self.info_text.append(f'표시 피라미드 생성 중 오류 발생: {str(e)}')
+
+        # 내부 작업이므로 대기열 안내 없이 추가 (실패해도 대기 중인 처리 단계는 유지)
+        self.job_queue.submit('표시 피라미드', work, done, on_error, internal=True)
+
+    def plot_width_points(self):
+        """채널당 그릴 최대 점 수 (화면 폭 픽셀당 최소/최대 2점)"""
+        width = self.scroll.viewport().width() - 110
+        return 2 * max(200, width)
+
+    def display_window(self, start, stop):
+        """[start, stop) 구간을 화면 폭에 맞게 줄인 (times, data)를 반환합니다."""
+        max_points = self.plot_width_points()
+        read_raw = lambda a, b: self.raw.get_data(start=a, stop=b)
+        if self.pyramid is not None:
+            return self.pyramid.window(start, stop, max_points, read_raw)
+        # 피라미드가 준비되기 전에는 표시 구간만 읽어서 줄임
+        return decimate_window(read_raw(start, stop), start, self.raw.info['sfreq'], max_points)
+
+    @profiled(category='redraw')
     def plot_data(self):
         if self.raw is None:
             return
         try:
             self.clear_plot_layout()
-            self.plot_lines = []  # 그래프 라인 저장 (매번 초기화)
             duration = self.plot_duration_spin.value()
-            n_samples = int(duration * self.raw.info['sfreq'])
-            times = self.raw.times[:n_samples]
-            data = self.raw.get_data()[:, :n_samples]
-
-            colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
-                    '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-
-            # bad_channel_list에서 체크된 채널을 bad로 간주
-            bads = []
-            if hasattr(self, 'bad_channel_list'):
-                for i in range(self.bad_channel_list.count()):
-                    item = self.bad_channel_list.item(i)
-                    if item.checkState() == 2:
-                        bads.append(item.text())
+            sfreq = self.raw.info['sfreq']
+            n_samples = min(int(duration * sfreq), self.raw.n_times)
+            # 전체 데이터를 복사하지 않고, 화면 폭에 맞는 피라미드 단계에서 읽음
+            times, data = self.display_window(0, n_samples)
 
+            if self.canvas.ch_names != self.raw.ch_names:
+                self.canvas.set_channels(self.raw.ch_names)
+            self._canvas_mode = 'raw'
+            self.canvas.set_traces(times, data)
             for i, ch_name in enumerate(self.raw.ch_names):
-                row_container = QWidget()
-                row_layout = QHBoxLayout(row_container)
-                row_layout.setContentsMargins(5, 5, 5, 5)
-                row_layout.setSpacing(5)
-
-                label = QLabel(ch_name)
-                label.setFixedWidth(100)
-
-                pw = pg.PlotWidget()
-                pw.setMinimumWidth(400)
-                pw.setBackground(None)  # 배경 투명
-
-                # bad_channel_list에서 체크된 채널을 흐릿하게 표시
-                is_bad = ch_name in bads
-                alpha = 80 if is_bad else 255
-                color = pg.mkColor(colors[i % len(colors)])
-                color.setAlpha(alpha)
-                pen = pg.mkPen(color=color, width=1)
-
-                # 보간된 bad 채널이면: 보간 전 신호 흐릿하게, 보간 후 신호 진하게 두 번 그림
-                if hasattr(self, '_pre_interpolate_data') and hasattr(self, '_pre_interpolate_bads') and ch_name in self._pre_interpolate_bads:
-                    # 1. 보간 전 신호(흐릿하게)
-                    pre_data = self._pre_interpolate_data[i][:n_samples]
-                    faded_color = pg.mkColor(colors[i % len(colors)])
-                    faded_color.setAlpha(80)
-                    faded_pen = pg.mkPen(color=faded_color, width=1, style=Qt.DashLine)
-                    pre_curve = pw.plot(times, pre_data, pen=faded_pen)
-                    pre_curve.curve.setClickable(True)
-                    pre_curve.curve.mouseClickEvent = partial(self.on_curve_clicked, idx=i)
-                    self.plot_lines.append(pre_curve.curve)
-                    # 2. 보간 후 신호(진하게)
-                    strong_color = pg.mkColor(colors[i % len(colors)])
-                    strong_color.setAlpha(255)
-                    strong_pen = pg.mkPen(color=strong_color, width=1)
-                    post_curve = pw.plot(times, data[i], pen=strong_pen)
-                    post_curve.curve.setClickable(True)
-                    post_curve.curve.mouseClickEvent = partial(self.on_curve_clicked, idx=i)
-                    self.plot_lines.append(post_curve.curve)
-                else:
-                    # 일반 채널(혹은 bad가 아닌 경우) 기존 방식
-                    plot_item = pw.plot(times, data[i], pen=pen)
-                    plot_item.curve.setClickable(True)
-                    plot_item.curve.mouseClickEvent = partial(self.on_curve_clicked, idx=i)
-                    self.plot_lines.append(plot_item.curve)
-
-                pw.setXRange(0, times[-1])
-                pw.setMouseEnabled(x=True, y=False)
-                pw.setLimits(xMin=0, xMax=times[-1])
-                pw.plotItem.showAxis('left', True)
-                pw.plotItem.showAxis('bottom', True)
-                pw.getAxis('left').setStyle(showValues=True)
-                pw.getAxis('bottom').setStyle(showValues=True)
-                pw.getAxis('left').setPen(None)
-                pw.getAxis('bottom').setPen(None)
-
-                row_layout.addWidget(label, stretch=0)
-                row_layout.addWidget(pw, stretch=1)
-                self.plot_layout.addWidget(row_container)
+                self.canvas.set_style(i, self.raw_channel_pen(i, ch_name))
+                # 보간된 bad 채널이면: 보간 전 신호 흐릿하게(점선), 보간 후 신호 진하게 겹쳐 그림
+                if self.is_interpolated(ch_name):
+                    row = self._pre_interpolate_bads.index(ch_name)
+                    pre_times, pre_data = decimate_window(
+                        self._pre_interpolate_data[row:row + 1, :n_samples], 0, sfreq,
+                        self.plot_width_points())
+                    self.canvas.set_overlay(i, pre_times, pre_data[0],
+                                            channel_pen(i, alpha=80, style=Qt.DashLine))
+            self.canvas.set_x_range(0, times[-1])
         except Exception as e:
             print(f"[DEBUG] Exception in plot_data: {e}")
             QMessageBox.critical(self, '오류', f'데이터 플롯 중 오류 발생: {str(e)}')
 
-    def _make_mouse_click_handler(self, idx):
-        def handler(ev):
-            self.toggle_bad_channel_by_curve(idx)
-        return handler
+    def is_interpolated(self, ch_name):
+        return self._pre_interpolate_data is not None and ch_name in self._pre_interpolate_bads
 
-    def on_curve_clicked(self, event, idx):
-        """그래프 선 클릭 시 호출되는 함수"""
-        self.toggle_bad_channel_by_curve(idx)
+    def raw_channel_pen(self, idx, ch_name):
+        # 불량 채널은 흐릿하게, 보간된 채널은 보간 후 신호를 진하게 표시
+        if self.bad_channels.is_bad(ch_name) and not self.is_interpolated(ch_name):
+            return channel_pen(idx, alpha=80)
+        return channel_pen(idx)
 
-    
     def toggle_bad_channel_by_curve(self, idx):
-        ch_name = self.raw.ch_names[idx]
-        if ch_name in self.raw.info['bads']:
-            self.raw.info['bads'].remove(ch_name)
-            print(f"[DEBUG] {ch_name} removed from bads (via graph)")
-        else:
-            self.raw.info['bads'].append(ch_name)
-            print(f"[DEBUG] {ch_name} added to bads (via graph)")
-
-        # ✅ bad_channel_list 동기화
-        if hasattr(self, 'bad_channel_list'):
-            self.bad_channel_list.clear()
-            for ch in self.raw.ch_names:
-                item = QListWidgetItem(ch)
-                if ch in self.raw.info['bads']:
-                    item.setCheckState(2)
-                else:
+        if self.raw is None or self._canvas_mode not in ('raw', 'psd'):
+            return
+        self.bad_channels.toggle(self.raw.ch_names[idx])
+
+    def on_bad_channels_changed(self, ch_names):
+        """불량 상태가 바뀐 채널만 목록 체크 상태와 곡선 스타일을 갱신합니다."""
+        if self.raw is not None:
+            self.raw.info['bads'] = self.bad_channels.bads()
+        all_channels = self.bad_channels.channels()
+        self.bad_channel_list.blockSignals(True)
+        try:
+            if self.bad_channel_list.count() != len(all_channels):
+                self.bad_channel_list.clear()
+                for ch in all_channels:
+                    item = QListWidgetItem(ch)
                     item.setCheckState(0)
-                self.bad_channel_list.addItem(item)
+                    self.bad_channel_list.addItem(item)
+                ch_names = all_channels
+            for ch in ch_names:
+                row = self.bad_channels.index(ch)
+                if row < 0:
+                    continue
+                item = self.bad_channel_list.item(row)
+                if item.text() != ch:
+                    item.setText(ch)
+                item.setCheckState(2 if self.bad_channels.is_bad(ch) else 0)
+        finally:
+            self.bad_channel_list.blockSignals(False)
+        # 데이터를 다시 읽거나 위젯을 다시 만들지 않고 펜만 교체
+        if self._canvas_mode in ('raw', 'psd') and self.canvas.ch_names == self.raw.ch_names:
+            for ch in ch_names:
+                idx = self.bad_channels.index(ch)
+                if 0 <= idx < len(self.canvas.ch_names):
+                    self.canvas.set_style(idx, self.raw_channel_pen(idx, ch))
 
-        # ✅ 이벤트 루프가 끝난 후에 plot_data 실행
-        QTimer.singleShot(0, self.plot_data)
-        
-    def show_result_df_in_table(self, df):
-        df_t = df.T  # transpose: 채널이 행, 샘플이 열
-        self.result_df_table.clear()
-        n_rows = len(df_t)
-        n_cols = min(100, len(df_t.columns))  # 최대 100개 샘플만 표시
-        self.result_df_table.setRowCount(n_rows)
-        self.result_df_table.setColumnCount(n_cols)
-        self.result_df_table.setHorizontalHeaderLabels([str(df_t.columns[i]) for i in range(n_cols)])
-        self.result_df_table.setVerticalHeaderLabels([str(idx) for idx in df_t.index])
-        for i in range(n_rows):
-            for j in range(n_cols):
-                self.result_df_table.setItem(i, j, QTableWidgetItem(str(df_t.iloc[i, j])))
-        self.result_df_table.resizeColumnsToContents()
+    def show_data_in_table(self, data, ch_names):
+        # 채널이 행, 샘플이 열. (채널, 샘플) 버퍼를 복사 없이 모델에 연결
+        self.result_df_model.set_array(data, row_labels=ch_names)
 
+    @profiled(category='redraw')
     def plot_data_preview(self):
         if hasattr(self, 'df') and self.df is not None:
             self.clear_plot_layout()
-            n_plot = min(1000, len(self.df))
+            n_plot = min(PREVIEW_SAMPLES, len(self.df))
             t = np.arange(n_plot)
-            colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-            for i, col in enumerate(self.df.columns):
-                row_layout = QHBoxLayout()
-                label = QLabel(col)
-                label.setFixedWidth(60)
-                pw = pg.PlotWidget()
-                pw.setBackground(None)
-                pw.plot(t, self.df[col].values[:n_plot], pen=pg.mkPen(color=colors[i % len(colors)], width=1))
-                pw.setXRange(0, t[-1])
-                pw.setMouseEnabled(x=True, y=False)
-                pw.setLimits(xMin=0, xMax=t[-1])
-                pw.plotItem.showAxis('left', True)
-                pw.plotItem.showAxis('bottom', True)
-                pw.getAxis('left').setStyle(showValues=True)
-                pw.getAxis('bottom').setStyle(showValues=True)
-                pw.getAxis('left').setPen(None)
-                pw.getAxis('bottom').setPen(None)
-                row_layout.addWidget(label)
-                row_layout.addWidget(pw)
-                self.plot_layout.addLayout(row_layout)
+            self._canvas_mode = 'preview'
+            self.canvas.set_channels(self.df.columns)
+            for i in range(len(self.df.columns)):
+                self.canvas.set_style(i, channel_pen(i))
+            self.canvas.set_traces(t, self.df.values[:n_plot].T)
+            self.canvas.set_x_range(0, t[-1])
 
     def auto_detect_bad_channels(self):
         if self.raw is None:
             QMessageBox.warning(self, '경고', '먼저 EEG 데이터를 로드하세요.')
             return
-        method = self.auto_method_combo.currentText()
-        bads = []
-        data = self.raw.get_data()
-        ch_names = self.raw.ch_names
-        if method == '평균 제곱':
-            # 평균 제곱이 전체 평균의 2배 이상인 채널
-            ms = (data ** 2).mean(axis=1)
-            threshold = ms.mean() + 2 * ms.std()
-            bads = [ch for ch, v in zip(ch_names, ms) if v > threshold]
-        elif method == '편평성':
-            # 표준편차가 매우 작은 채널(편평)
-            stds = data.std(axis=1)
-            threshold = stds.mean() * 0.1
-            bads = [ch for ch, v in zip(ch_names, stds) if v < threshold]
-        elif method == '이상치':
-            # 3시그마 이상 이상치가 많은 채널
-            z = (data - data.mean(axis=1, keepdims=True)) / data.std(axis=1, keepdims=True)
-            outlier_ratio = (np.abs(z) > 3).mean(axis=1)
-            bads = [ch for ch, v in zip(ch_names, outlier_ratio) if v > 0.1]
-        # bad_channel_list를 모든 채널로 채우고, bads만 체크
-        self.bad_channel_list.clear()
-        for ch in ch_names:
-            item = QListWidgetItem(ch)
-            if ch in bads:
-                item.setCheckState(2)  # 체크
-            else:
-                item.setCheckState(0)  # 체크 해제
-            self.bad_channel_list.addItem(item)
+        if BAD_CHANNEL_METHODS[self.auto_method_combo.currentText()] in SPECTRAL_METHODS:
+            self.request_spectrum(self.apply_auto_detection)
+            return
+        version = self._raw_version
+        if self._quality_stats is not None and self._quality_stats[0] == version:
+            self.apply_auto_detection()
+            return
+        raw = self.raw
+
+        def work(ctx):
+            # 모든 기준의 통계를 한 번의 청크 순회로 계산
+            return pipeline.compute_channel_stats(raw, progress=ctx.progress)
+
+        def done(stats):
+            if version != self._raw_version:
+                return
+            self._quality_stats = (version, stats)
+            self.apply_auto_detection()
+
+        self.run_job('채널 통계', work, done, '불량 채널 탐지')
+
+    def apply_auto_detection(self):
+        """저장된 채널 통계/스펙트럼으로 현재 기준/임계값의 불량 채널을 고릅니다 (데이터를 읽지 않음)."""
+        name = self.auto_method_combo.currentText()
+        threshold = self.auto_threshold_spin.value()
+        if BAD_CHANNEL_METHODS[name] in SPECTRAL_METHODS:
+            bads = pipeline.detect_bad_channels(self.raw, BAD_CHANNEL_METHODS[name], threshold,
+                                                spectrum=self._spectrum[1])
+        else:
+            bads = pipeline.detect_bad_channels(self.raw, BAD_CHANNEL_METHODS[name], threshold,
+                                                stats=self._quality_stats[1])
+        # 탐지 결과로 불량 채널 집합을 교체 (바뀐 채널만 한 번에 알림)
+        self.bad_channels.set_bads(bads)
+        self._auto_detect_live = True
+        self.info_text.append(f'자동 탐지 ({name}, 임계값 {threshold:g}): '
+                              f'{", ".join(bads) if bads else "없음"}')
+
+    def on_auto_method_changed(self, name):
+        # 기준마다 임계값의 의미가 다르므로 기본값으로 바꿈 (valueChanged로 다시 탐지)
+        threshold = AUTO_THRESHOLDS[BAD_CHANNEL_METHODS[name]]
+        if self.auto_threshold_spin.value() != threshold:
+            self.auto_threshold_spin.setValue(threshold)
+        else:
+            self.on_auto_threshold_changed(threshold)
+
+    def on_auto_threshold_changed(self, value):
+        spectral = BAD_CHANNEL_METHODS[self.auto_method_combo.currentText()] in SPECTRAL_METHODS
+        cached = self._spectrum if spectral else self._quality_stats
+        if self._auto_detect_live and cached is not None and cached[0] == self._raw_version:
+            self.apply_auto_detection()
+
+    def request_spectrum(self, on_ready):
+        """현재 처리 상태의 파워 스펙트럼을 준비한 뒤 on_ready()를 호출합니다 (체인에 캐시)."""
+        version = self._raw_version
+        if self._spectrum is not None and self._spectrum[0] == version:
+            on_ready()
+            return
+        chain = self.chain
+
+        def work(ctx):
+            # 녹화를 청크 단위로 한 번 읽어 Welch 스펙트럼 계산 (이미 계산한 상태면 바로 반환)
+            return chain.psd(progress=ctx.progress)
+
+        def done(spectrum):
+            if version != self._raw_version:
+                return
+            self._spectrum = (version, spectrum)
+            on_ready()
+
+        self.run_job('파워 스펙트럼', work, done, '파워 스펙트럼 계산')
+
+    def plot_psd(self):
+        if self.raw is None:
+            QMessageBox.warning(self, '경고', '먼저 EEG 데이터를 로드하세요.')
+            return
+        self.request_spectrum(self.show_psd)
+
+    @profiled(category='redraw')
+    def show_psd(self):
+        spectrum = self._spectrum[1]
+        try:
+            self.clear_plot_layout()
+            self._canvas_mode = 'psd'
+            self.canvas.set_channels(spectrum.ch_names)
+            # 모든 채널을 겹쳐 그림 (DC 제외, V^2/Hz -> uV^2/Hz의 dB)
+            freqs = spectrum.freqs[1:]
+            self.canvas.set_overlaid(freqs, spectrum.log_power()[:, 1:] + 120.0)
+            for i, ch in enumerate(spectrum.ch_names):
+                self.canvas.set_style(i, self.raw_channel_pen(i, ch))
+            self.canvas.set_x_range(freqs[0], freqs[-1])
+            self.info_text.append(f'파워 스펙트럼: dB (uV^2/Hz), 주파수 해상도 {freqs[0]:g} Hz, '
+                                  f'세그먼트 {spectrum.n_segments}개')
+        except Exception as e:
+            QMessageBox.critical(self, '오류', f'파워 스펙트럼 플롯 중 오류 발생: {str(e)}')
 
     def add_bad_channel(self):
         ch = self.manual_bad_input.text().strip()
-        if ch and (ch not in [self.bad_channel_list.item(i).text() for i in range(self.bad_channel_list.count())]):
-            self.bad_channel_list.addItem(ch)
+        if ch:
+            if self.bad_channels.has_channel(ch):
+                self.bad_channels.set_bad(ch, True)
+            else:
+                QMessageBox.warning(self, '경고', f'존재하지 않는 채널: {ch}')
         self.manual_bad_input.clear()
 
     def remove_bad_channel(self):
         selected = self.bad_channel_list.currentRow()
         if selected >= 0:
-            self.bad_channel_list.takeItem(selected)
+            self.bad_channels.set_bad(self.bad_channel_list.item(selected).text(), False)
 
     def run_interpolate(self):
         if self.raw is None:
             QMessageBox.warning(self, '경고', '먼저 EEG 데이터를 로드하세요.')
             return
-        bads = []
-        for i in range(self.bad_channel_list.count()):
-            item = self.bad_channel_list.item(i)
-            if item.checkState() == 2:  # 체크된 항목만 bad로
-                bads.append(item.text())
+        bads = self.bad_channels.bads()
         if not bads:
             QMessageBox.information(self, '안내', '불량 채널을 먼저 선택하세요.')
             return
         # 이미 보간된 bad 채널에 대해 중복 보간 시도 시 경고
-        if hasattr(self, '_pre_interpolate_bads'):
-            overlap = set(bads) & set(self._pre_interpolate_bads)
-            if overlap:
-                overlap_str = ', '.join(overlap)
-                QMessageBox.warning(self, '경고', f'이미 보간된 채널({overlap_str})에 대해 중복 보간을 실행할 수 없습니다.')
-                return
-        # 보간 전 데이터 저장
-        self._pre_interpolate_data = self.raw.get_data().copy()
-        self._pre_interpolate_bads = list(bads)
-        self.raw.info['bads'] = bads
+        overlap = set(bads) & set(self._pre_interpolate_bads)
+        if overlap:
+            overlap_str = ', '.join(overlap)
+            QMessageBox.warning(self, '경고', f'이미 보간된 채널({overlap_str})에 대해 중복 보간을 실행할 수 없습니다.')
+            return
         interp_mode = self.interpolate_method_combo.currentText()
-        self.raw.interpolate_bads(reset_bads=True, mode=interp_mode)
-        self.raw.info['bads'] = []
-        QMessageBox.information(self, '완료', '보간이 완료되었습니다.')
+        # 보간 단계는 하나만 두고, 이미 보간한 채널과 합쳐 같은 입력에서 다시 보간
+        steps = steps_with(self.chain.steps, ProcessingStep('interpolate', {
+            'bads': self._pre_interpolate_bads + bads, 'mode': interp_mode}))
+
+        def done():
+            # 보간된 채널은 더 이상 불량이 아님
+            self.bad_channels.set_bads([])
+            QMessageBox.information(self, '완료', '보간이 완료되었습니다.')
+
+        self.run_chain('보간', steps, done, '보간')
 
     def apply_reference(self):
         if self.raw is None:
             QMessageBox.warning(self, '경고', '먼저 EEG 데이터를 로드하세요.')
             return
         if self.radio_avg.isChecked():
-            self.raw.set_eeg_reference('average')
-            QMessageBox.information(self, '완료', '공통 평균 참조가 적용되었습니다.')
+            ref = 'average'
+            message = '공통 평균 참조가 적용되었습니다.'
         elif self.radio_custom.isChecked():
             ch_text = self.ref_channel_input.text().strip()
             if not ch_text:
@@ -881,9 +1599,22 @@ class EEGAnalyzerGUI(QMainWindow):
             if not_found:
                 QMessageBox.warning(self, '경고', f'존재하지 않는 채널: {", ".join(not_found)}')
                 return
-            self.raw.set_eeg_reference(ch_list)
-            QMessageBox.information(self, '완료', f'채널 {", ".join(ch_list)} 참조가 적용되었습니다.')
+            ref = ch_list
+            message = f'채널 {", ".join(ch_list)} 참조가 적용되었습니다.'
+        else:
+            return
+
+        def done():
+            QMessageBox.information(self, '완료', message)
+
+        self.run_chain('재참조', self.reference_steps(ref), done, '재참조')
+
+    def reference_steps(self, ref):
+        # 현재 불량 채널은 평균 참조 계산에서 제외
+        return steps_with(self.chain.steps, ProcessingStep('reference', {
+            'ref': ref, 'bads': self.bad_channels.bads()}))
 
+    @profiled(category='redraw')
     def compare_erp(self):
         # ERP가 없는 경우 경고
         if not hasattr(self, 'epochs') or self.epochs is None:
@@ -893,12 +1624,18 @@ class EEGAnalyzerGUI(QMainWindow):
         # 1. 참조 전 ERP 복사
         erp_before = self.epochs.average().copy()
         # 2. 참조 적용 (현재 raw 기준)
-        # epochs를 새로 생성하여 참조 후 ERP 계산
-        epochs_after = mne.Epochs(self.raw, self.events, event_id=self.event_id,
-                                 tmin=self.tmin_spin.value(), tmax=self.tmax_spin.value(),
-                                 baseline=(self.baseline_start_spin.value(), self.baseline_end_spin.value()),
-                                 preload=True)
-        erp_after = epochs_after.average()
+        # 그 사이 단계가 모두 채널 공간 선형 연산이면 같은 연산을 ERP에 바로 적용
+        # (평균과 baseline 보정은 선형이므로 에포크를 다시 읽지 않아도 같은 결과)
+        operator = self.chain.operator_between(self.epochs.raw) if self.chain else None
+        if operator is not None:
+            erp_after = mne.EvokedArray(operator.apply(erp_before.data), self.raw.info.copy(),
+                                        tmin=erp_before.times[0], comment=erp_before.comment,
+                                        nave=erp_before.nave, verbose=False)
+            if self.epochs.baseline is not None:
+                erp_after.apply_baseline(self.epochs.baseline, verbose=False)
+        else:
+            # 같은 이벤트/창 인덱스를 현재 raw에 연결하여 참조 후 ERP 계산 (에포크 복사 없음)
+            erp_after = self.epochs.with_raw(self.raw).average()
         # 3. 두 ERP 파형을 나란히 플롯
         fig = erp_before.plot(show=False, spatial_colors=True, titles='참조 전 ERP')
         fig2 = erp_after.plot(show=False, spatial_colors=True, titles='참조 후 ERP')
@@ -906,30 +1643,125 @@ class EEGAnalyzerGUI(QMainWindow):
         fig2.show()
 
     def clear_plot_layout(self):
-        # plot_layout의 모든 아이템(위젯, 레이아웃 모두) 완전 삭제
-        while self.plot_layout.count():
-            item = self.plot_layout.takeAt(0)
-            if item is not None:
-                # 레이아웃(행)인 경우 내부 위젯도 삭제
-                layout = item.layout()
-                if layout is not None:
-                    while layout.count():
-                        sub_item = layout.takeAt(0)
-                        widget = sub_item.widget()
-                        if widget is not None:
-                            widget.setParent(None)
-                    # 레이아웃 자체도 삭제
-                    del layout
-                widget = item.widget()
-                if widget is not None:
-                    widget.setParent(None)
-                del item
-        # plot_lines도 초기화
-        self.plot_lines = []
+        # 캔버스의 곡선 객체는 재사용하고 데이터와 겹쳐 그린 신호만 비움
+        self.canvas.clear_traces()
 
     def on_bad_channel_list_changed(self, item):
-        # bad_channel_list에서 체크박스가 변경될 때마다 그래프를 즉시 업데이트
-        self.plot_data()
+        # 사용자가 체크박스를 바꾸면 모델에 반영 (그래프는 모델 알림으로 해당 채널만 갱신)
+        self.bad_channels.set_bad(item.text(), item.checkState() == 2)
+
+    def on_stream_protocol_changed(self, label):
+        is_file = STREAM_PROTOCOL_LABELS[label] == 'file'
+        self.stream_host_edit.setEnabled(not is_file)
+        self.stream_port_spin.setEnabled(not is_file)
+        self.stream_path_edit.setEnabled(is_file)
+        self.stream_path_btn.setEnabled(is_file)
+
+    def choose_stream_file(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, '추적할 CSV 파일 선택', '',
+                                                   'CSV files (*.csv);;All files (*)')
+        if file_name:
+            self.stream_path_edit.setText(file_name)
+
+    def stream_channel_names(self, n_channels):
+        # 채널 입력란의 이름 수가 맞으면 그 이름을, 아니면 번호를 사용
+        names = [ch.strip() for ch in self.channel_text.toPlainText().split(',') if ch.strip()]
+        return names if len(names) == n_channels else [f'Ch{i + 1}' for i in range(n_channels)]
+
+    def set_stream_controls_enabled(self, enabled):
+        for control in (self.stream_protocol_combo, self.stream_channels_spin,
+                        self.stream_sfreq_spin, self.stream_filter_combo,
+                        self.stream_l_freq_spin, self.stream_h_freq_spin, self.stream_notch_spin):
+            control.setEnabled(enabled)
+        if enabled:
+            self.on_stream_protocol_changed(self.stream_protocol_combo.currentText())
+        else:
+            for control in (self.stream_host_edit, self.stream_port_spin, self.stream_path_edit,
+                            self.stream_path_btn):
+                control.setEnabled(False)
+
+    def toggle_stream(self):
+        if self.stream is not None:
+            self.stop_stream()
+        else:
+            self.start_stream()
+
+    def start_stream(self):
+        n_channels = self.stream_channels_spin.value()
+        sfreq = self.stream_sfreq_spin.value()
+        method = STREAM_FILTER_LABELS[self.stream_filter_combo.currentText()]
+        try:
+            stream_filter = None
+            if method != 'none':
+                stream_filter = CausalFilter(sfreq, self.stream_l_freq_spin.value() or None,
+                                             self.stream_h_freq_spin.value() or None,
+                                             self.stream_notch_spin.value() or None, method)
+            source = open_source(STREAM_PROTOCOL_LABELS[self.stream_protocol_combo.currentText()],
+                                 self.stream_host_edit.text().strip(),
+                                 self.stream_port_spin.value(),
+                                 self.stream_path_edit.text().strip(), n_channels)
+        except Exception as e:
+            QMessageBox.critical(self, '오류', f'스트림 시작 중 오류 발생: {str(e)}')
+            return
+        self.stream = StreamReceiver(source, n_channels, sfreq, stream_filter)
+        self.stream.start()
+        self.clear_plot_layout()
+        self._canvas_mode = 'stream'
+        self.canvas.set_channels(self.stream_channel_names(n_channels))
+        for i in range(n_channels):
+            self.canvas.set_style(i, channel_pen(i))
+        self.set_stream_controls_enabled(False)
+        self.stream_btn.setText('스트림 정지')
+        self.stream_status_label.setText('수신 대기 중')
+        self.stream_timer.start()
+        self.info_text.append(f'스트림 시작: {self.stream_protocol_combo.currentText()}, '
+                              f'{n_channels}채널, {sfreq} Hz')
+
+    def stop_stream(self):
+        if self.stream is None:
+            return
+        self.stream_timer.stop()
+        stream = self.stream
+        self.stream = None
+        stream.stop()
+        stats = stream.stats()
+        self.set_stream_controls_enabled(True)
+        self.stream_btn.setText('스트림 시작')
+        self.stream_status_label.setText(f'정지됨 (수신 {stats.received}샘플, 누락 {stats.dropped}샘플)')
+        self.info_text.append(f'스트림 정지: 수신 {stats.received}샘플, 누락 {stats.dropped}샘플')
+
+    @profiled(category='redraw')
+    def on_stream_timer(self):
+        """링 버퍼의 최근 표시 구간만 복사해 화면 폭에 맞게 줄여 그리고 지연을 측정합니다."""
+        stream = self.stream
+        if stream is None or self._canvas_mode != 'stream':
+            return
+        stats = stream.stats()
+        if stats.error:
+            error = stats.error
+            self.stop_stream()
+            QMessageBox.critical(self, '오류', f'스트림 수신 중 오류 발생: {error}')
+            return
+        if not stats.packets:
+            return
+        draw_start = time.time()
+        sfreq = stream.sfreq
+        data, start = stream.ring.latest(int(self.plot_duration_spin.value() * sfreq))
+        times, data = decimate_window(data, start, sfreq, self.plot_width_points())
+        self.canvas.set_traces(times, data)
+        self.canvas.set_x_range(times[0], times[-1])
+        # set_*는 데이터만 바꾸고 그리기는 나중에 일어나므로, 여기서 바로 그려
+        # 실제 화면 그리기까지 그리기 시간에 포함
+        self.canvas.viewport().repaint()
+        draw_end = time.time()
+        if draw_end - self._stream_status_time < STREAM_STATUS_INTERVAL:
+            return
+        self._stream_status_time = draw_end
+        restarts = f', 재시작 {stats.restarts}회' if stats.restarts else ''
+        self.stream_status_label.setText(f'수신 {stats.received}샘플, 누락 {stats.dropped}샘플{restarts}, '
+                                         f'{stats.rate:.0f} 샘플/초 ({stats.packets}패킷)')
+        latency = stream.latency(draw_start, draw_end, stats)
+        self.stream_latency_label.setText(f'지연: {latency.describe()}')
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,230 @@
+# eeg_batch.py
+#
+# 폴더 안의 EEG 녹화(CSV)를 eeg_pipeline으로 병렬 처리하는 명령행 도구.
+#
+# 사용 예:
+#   python eeg_batch.py data/ results/ --l-freq 0.1 --h-freq 30 --notch 60 --jobs 8
+#
+# 녹화 'sub01.csv'의 이벤트 파일은 기본적으로 'sub01_events.csv'입니다.
+# 결과는 results/sub01/ 아래에 저장되며, summary.json이 있는 녹화는
+# 설정이 같으면 다시 실행할 때 건너뜁니다 (--force로 강제 재처리).
+# --profile이면 단계별 시간/메모리 기록을 profile.json과 trace.json(Chrome trace)으로 남깁니다.
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import mne
+from eeg_pipeline import PipelineConfig, run_pipeline, BAD_CHANNEL_METHODS
+from eeg_ica import available_methods as available_ica_methods
+from eeg_profiling import PROFILER
+
+
+SUMMARY_FILE = 'summary.json'
+LOG_FILE = 'process.log'
+PROFILE_FILE = 'profile.json'
+TRACE_FILE = 'trace.json'
+
+
+def config_hash(config):
+    # 스레드 수는 결과에 영향을 주지 않으므로 제외
+    params = {k: v for k, v in config.to_dict().items() if k != 'n_jobs'}
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def find_recordings(input_dir, pattern='*.csv', events_pattern='{stem}_events.csv'):
+    """(녹화 경로, 이벤트 경로 또는 None) 목록을 반환합니다."""
+    names = sorted(os.listdir(input_dir))
+    events_glob = events_pattern.format(stem='*')
+    recordings = []
+    for name in names:
+        if not fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(name, events_glob):
+            continue
+        stem = os.path.splitext(name)[0]
+        events_path = os.path.join(input_dir, events_pattern.format(stem=stem))
+        recordings.append((os.path.join(input_dir, name),
+                           events_path if os.path.exists(events_path) else None))
+    return recordings
+
+
+def is_done(out_dir, cfg_hash):
+    summary_path = os.path.join(out_dir, SUMMARY_FILE)
+    if not os.path.exists(summary_path):
+        return False
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return summary.get('status') == 'ok' and summary.get('config_hash') == cfg_hash
+
+
+def process_recording(file_name, events_file, output_dir, config, save_raw=False,
+                      use_cache=True, profile=False):
+    """
+    녹화 하나를 처리하고 결과를 output_dir/<이름>/ 에 저장합니다 (워커 프로세스에서 실행).
+
+    summary.json은 모든 결과를 저장한 뒤 마지막에 기록되므로
+    중간에 중단된 녹화는 다음 실행에서 다시 처리됩니다. profile이면 이 녹화의
+    단계별 계측 기록을 함께 저장하고 요약을 summary['profile']에 넣습니다.
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    out_dir = os.path.join(output_dir, stem)
+    os.makedirs(out_dir, exist_ok=True)
+    log_path = os.path.join(out_dir, LOG_FILE)
+    cfg_hash = config_hash(config)
+    summary = {'file': os.path.abspath(file_name), 'events': events_file,
+               'config': config.to_dict(), 'config_hash': cfg_hash}
+    start = time.time()
+    # MNE 로그를 녹화별 로그 파일로 보냄
+    mne.set_log_file(log_path, overwrite=True)
+    if profile:
+        # 워커 프로세스는 여러 녹화를 처리하므로 녹화마다 새로 기록
+        PROFILER.reset()
+        PROFILER.enable()
+    try:
+        mne.utils.logger.info(f'처리 시작: {file_name}')
+        result = run_pipeline(file_name, config, events_file=events_file,
+                              use_cache=use_cache)
+        if result['evokeds']:
+            mne.write_evokeds(os.path.join(out_dir, 'erp-ave.fif'), result['evokeds'],
+                              overwrite=True)
+        if result['ica'] is not None:
+            result['ica'].save(os.path.join(out_dir, 'components-ica.fif'), overwrite=True)
+            summary['ica_fit'] = result['ica_summary'].to_dict()
+        if result['rejection'] is not None:
+            summary['rejection'] = result['rejection'].to_dict()
+        if save_raw:
+            result['raw'].save(os.path.join(out_dir, 'processed_raw.fif'), overwrite=True)
+        summary.update(status='ok', bads=result['bads'],
+                       n_epochs=len(result['epochs']) if result['epochs'] is not None else 0,
+                       conditions=[ev.comment for ev in result['evokeds']])
+    except Exception as e:
+        mne.utils.logger.error(traceback.format_exc())
+        summary.update(status='error', error=str(e))
+    finally:
+        summary['elapsed_sec'] = round(time.time() - start, 3)
+        mne.set_log_file(None)
+        if profile:
+            PROFILER.disable()
+            PROFILER.save_json(os.path.join(out_dir, PROFILE_FILE))
+            PROFILER.save_chrome_trace(os.path.join(out_dir, TRACE_FILE))
+            summary['profile'] = PROFILER.summary()
+    tmp_path = os.path.join(out_dir, SUMMARY_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(out_dir, SUMMARY_FILE))
+    return stem, summary['status'], summary['elapsed_sec']
+
+
+def add_pipeline_arguments(parser):
+    """입력 폴더와 파이프라인 설정 인자 (일괄 처리와 총평균 도구가 함께 사용)."""
+    parser.add_argument('input_dir', help='CSV 녹화가 있는 폴더')
+    parser.add_argument('output_dir', help='결과를 저장할 폴더')
+    parser.add_argument('--pattern', default='*.csv', help='녹화 파일 패턴 (기본: *.csv)')
+    parser.add_argument('--events-pattern', default='{stem}_events.csv',
+                        help='이벤트 파일 이름 형식 (기본: {stem}_events.csv)')
+    parser.add_argument('--sfreq', type=float, default=256.0, help='샘플링 주파수 (Hz)')
+    parser.add_argument('--montage', default='standard_1020')
+    parser.add_argument('--l-freq', type=float, default=1.0)
+    parser.add_argument('--h-freq', type=float, default=40.0)
+    parser.add_argument('--notch', type=float, default=None, help='노치 주파수 (Hz)')
+    parser.add_argument('--resample', type=float, default=None, help='필터 후 리샘플링 주파수 (Hz)')
+    parser.add_argument('--bad-method', choices=BAD_CHANNEL_METHODS, default=None,
+                        help='자동 불량 채널 탐지 기준')
+    parser.add_argument('--bad-threshold', type=float, default=None,
+                        help='탐지 기준 임계값 (생략 시 기준별 기본값)')
+    parser.add_argument('--interpolate-method', default='spline')
+    parser.add_argument('--reference', default='average',
+                        help="'average', 'none' 또는 쉼표로 구분한 채널 목록")
+    parser.add_argument('--ica', type=int, default=None, help='ICA 컴포넌트 수 (생략 시 ICA 생략)')
+    parser.add_argument('--ica-exclude', default='', help='제거할 ICA 컴포넌트 (예: 0,1)')
+    parser.add_argument('--ica-method', choices=available_ica_methods(), default='fastica')
+    parser.add_argument('--ica-tol', type=float, default=None, help='ICA 수렴 허용 오차')
+    parser.add_argument('--ica-fast', action='store_true',
+                        help='리샘플링/고역 통과/아티팩트 없는 구간 일부로 ICA 피팅')
+    parser.add_argument('--ica-samples', type=int, default=None,
+                        help='빠른 ICA 피팅에 쓸 최대 샘플 수 (기본: 컴포넌트 수^2 x 30)')
+    parser.add_argument('--tmin', type=float, default=-0.2)
+    parser.add_argument('--tmax', type=float, default=0.8)
+    parser.add_argument('--baseline', type=float, nargs=2, default=(-0.2, 0.0))
+    parser.add_argument('--reject', default=None,
+                        help="에포크 최대 peak-to-peak (uV) 또는 'auto' (채널별 교차 검증 탐색)")
+    parser.add_argument('--flat', type=float, default=None, help='에포크 최소 peak-to-peak (uV)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='동시 처리 프로세스 수')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='녹화 하나를 처리할 때 채널 블록 병렬 스레드 수')
+    parser.add_argument('--no-cache', action='store_true', help='바이너리 캐시를 사용하지 않음')
+    return parser
+
+
+def build_parser():
+    parser = add_pipeline_arguments(argparse.ArgumentParser(description='EEG 녹화 폴더 일괄 처리'))
+    parser.add_argument('--save-raw', action='store_true', help='처리된 Raw를 FIF로 저장')
+    parser.add_argument('--force', action='store_true', help='완료된 녹화도 다시 처리')
+    parser.add_argument('--profile', action='store_true',
+                        help='단계별 시간/메모리를 profile.json, trace.json(Chrome trace)으로 저장')
+    return parser
+
+
+def config_from_args(args):
+    if args.reference == 'none':
+        reference = None
+    elif args.reference == 'average':
+        reference = 'average'
+    else:
+        reference = [ch.strip() for ch in args.reference.split(',') if ch.strip()]
+    reject = args.reject
+    if reject is not None and reject != 'auto':
+        reject = float(reject) * 1e-6
+    return PipelineConfig(
+        sfreq=args.sfreq, montage=args.montage, l_freq=args.l_freq, h_freq=args.h_freq,
+        notch_freq=args.notch, resample_sfreq=args.resample, bad_method=args.bad_method,
+        bad_threshold=args.bad_threshold,
+        interpolate_method=args.interpolate_method, reference=reference,
+        ica_n_components=args.ica,
+        ica_exclude=[int(x) for x in args.ica_exclude.split(',') if x.strip()],
+        ica_method=args.ica_method, ica_tol=args.ica_tol, ica_fast=args.ica_fast,
+        ica_max_samples=args.ica_samples,
+        tmin=args.tmin, tmax=args.tmax, baseline=tuple(args.baseline), reject=reject,
+        flat=None if args.flat is None else args.flat * 1e-6, n_jobs=args.threads)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = config_from_args(args)
+    cfg_hash = config_hash(config)
+    recordings = find_recordings(args.input_dir, args.pattern, args.events_pattern)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    todo = []
+    for file_name, events_file in recordings:
+        stem = os.path.splitext(os.path.basename(file_name))[0]
+        if not args.force and is_done(os.path.join(args.output_dir, stem), cfg_hash):
+            print(f'[건너뜀] {stem} (이미 처리됨)')
+            continue
+        todo.append((file_name, events_file))
+    print(f'녹화 {len(recordings)}개 중 {len(todo)}개 처리 (프로세스 {args.jobs}개)')
+
+    n_failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(process_recording, f, ev, args.output_dir, config, args.save_raw,
+                               not args.no_cache, args.profile)
+                   for f, ev in todo]
+        for future in as_completed(futures):
+            stem, status, elapsed = future.result()
+            if status != 'ok':
+                n_failed += 1
+            print(f'[{status}] {stem} ({elapsed:.1f}초)')
+    print(f'완료: 성공 {len(todo) - n_failed}, 실패 {n_failed}')
+    return 1 if n_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
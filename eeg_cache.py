@@ -0,0 +1,197 @@
+# eeg_cache.py
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from eeg_io import read_csv_to_memmap
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'EEG_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'eeg_analyzer'))
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# 내용 해시에 사용하는 파일 앞/뒤 블록 크기
+HASH_BLOCK = 1024 * 1024
+# 최근 이 시간(초) 안에 저장/사용된 항목은 용량을 넘어도 지우지 않음 (캐시 디렉터리를
+# 같이 쓰는 다른 프로세스가 방금 저장해 매핑하려는 항목 보호)
+EVICT_GRACE_SECONDS = 60.0
+
+
+def file_fingerprint(file_name):
+    """
+    파일의 경로, 크기, 수정 시각, 내용 해시로 캐시 키를 만듭니다.
+
+    내용 해시는 파일 앞뒤 HASH_BLOCK 바이트만 읽어서 계산하므로
+    수십 GB 파일에서도 즉시 끝납니다.
+    """
+    path = os.path.abspath(file_name)
+    st = os.stat(path)
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        h.update(f.read(HASH_BLOCK))
+        if st.st_size > HASH_BLOCK:
+            f.seek(max(HASH_BLOCK, st.st_size - HASH_BLOCK))
+            h.update(f.read(HASH_BLOCK))
+    content_hash = h.hexdigest()
+    key_src = f'{path}|{st.st_size}|{st.st_mtime_ns}|{content_hash}'
+    return {
+        'key': hashlib.sha1(key_src.encode('utf-8')).hexdigest(),
+        'source': path,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'content_hash': content_hash,
+    }
+
+
+class RecordingCache:
+    """
+    CSV 녹화 파일을 바이너리(memmap) 형태로 보관하는 캐시.
+
+    항목마다 '<key>.dat'(채널 우선 원시 블록)와 '<key>.json'(채널 이름, dtype,
+    형태, 원본 정보)을 저장합니다. json은 블록이 완성된 뒤에 기록되므로
+    json이 있는 항목만 유효합니다. 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용하지 않은 항목부터 삭제합니다 (LRU). 배치/총평균 워커처럼 여러
+    프로세스가 같은 디렉터리를 써도 되도록 임시 파일은 프로세스별로 만들고,
+    최근 EVICT_GRACE_SECONDS 안에 쓰인 항목은 삭제하지 않습니다.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.dat', base + '.json'
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-5]
+            dat_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                size = os.path.getsize(dat_path)
+                last_used = os.path.getmtime(meta_path)
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, size, key, meta))
+        return entries
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def lookup(self, file_name):
+        """캐시된 버퍼를 (data, ch_names)로 반환합니다. 없으면 None."""
+        fp = file_fingerprint(file_name)
+        dat_path, meta_path = self._paths(fp['key'])
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 'c'(copy-on-write) 모드: 이후 필터 등 제자리 연산이 캐시 파일을 바꾸지 않음
+            data = np.memmap(dat_path, dtype=meta['dtype'], mode='c',
+                             shape=tuple(meta['shape']))
+        except (OSError, ValueError, KeyError):
+            self._remove(fp['key'])
+            return None
+        # LRU 갱신
+        os.utime(meta_path, None)
+        return data, meta['ch_names']
+
+    def store(self, file_name, dtype=np.float64, progress=None):
+        """CSV를 파싱하여 캐시에 저장하고 (data, ch_names)를 반환합니다."""
+        fp = file_fingerprint(file_name)
+        dat_path, meta_path = self._paths(fp['key'])
+        # 같은 원본을 동시에 저장하는 다른 프로세스와 임시 파일이 겹치지 않도록 함
+        tmp_path = f'{dat_path}.{os.getpid()}.tmp'
+        try:
+            data, ch_names = read_csv_to_memmap(file_name, dtype=dtype, out_path=tmp_path,
+                                                progress=progress)
+            shape = data.shape
+            del data
+            os.replace(tmp_path, dat_path)
+            # json을 쓰기 전(다른 프로세스가 지울 수 없는 상태)에 방금 쓴 파일을 매핑해
+            # 반환하므로, 그 뒤에 항목이 지워져도 이 매핑은 유효함
+            data = np.memmap(dat_path, dtype=np.dtype(dtype), mode='c', shape=shape)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        meta = dict(fp, ch_names=ch_names, dtype=np.dtype(dtype).str,
+                    shape=list(shape), created=time.time())
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        # 같은 원본의 이전(수정 전) 항목은 더 이상 쓰이지 않으므로 정리
+        self.invalidate(file_name, keep=fp['key'])
+        self.evict(keep=fp['key'])
+        return data, ch_names
+
+    def load_csv(self, file_name, dtype=np.float64, progress=None):
+        """캐시에 있으면 즉시 매핑하고, 없으면 파싱 후 저장합니다."""
+        cached = self.lookup(file_name)
+        if cached is not None:
+            return cached
+        return self.store(file_name, dtype=dtype, progress=progress)
+
+    def invalidate(self, file_name, keep=None):
+        """원본 파일에 해당하는 캐시 항목을 삭제합니다. 삭제한 항목 수를 반환합니다."""
+        source = os.path.abspath(file_name)
+        removed = 0
+        for _, _, key, meta in self._entries():
+            if meta.get('source') == source and key != keep:
+                self._remove(key)
+                removed += 1
+        return removed
+
+    def evict(self, keep=None):
+        """
+        전체 크기가 max_bytes 이하가 될 때까지 오래된 항목을 삭제합니다.
+
+        최근 EVICT_GRACE_SECONDS 안에 저장/사용된 항목은 남기므로 그동안은
+        max_bytes를 넘을 수 있습니다.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _, _ in entries)
+        recent = time.time() - EVICT_GRACE_SECONDS
+        for last_used, size, key, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep or last_used > recent:
+                continue
+            self._remove(key)
+            total -= size
+        return total
+
+    def clear(self):
+        for _, _, key, _ in self._entries():
+            self._remove(key)
+
+    def total_bytes(self):
+        return sum(size for _, size, _, _ in self._entries())
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RecordingCache()
+    return _default_cache
+
+
+def load_csv_cached(file_name, cache=None, progress=None):
+    """기본 캐시를 사용하여 CSV 녹화를 (data, ch_names)로 불러옵니다."""
+    return (cache or get_default_cache()).load_csv(file_name, progress=progress)
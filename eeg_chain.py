@@ -0,0 +1,558 @@
+# eeg_chain.py
+#
+# 원본 Raw를 바꾸지 않는 처리 단계 체인.
+#
+# 처리는 (대역 통과, 노치, 고역 통과, 재참조, ICA, 보간) 단계의 순서 있는 목록으로
+# 표현됩니다. 각 단계의 출력은 '입력 키 + 단계 종류 + 파라미터'로 만든 키로 메모리에
+# 캐시되므로, 파라미터 하나를 바꾸면 그 단계부터 아래쪽만 다시 계산하고
+# 실행 취소/다시 실행은 캐시된 출력으로 바로 전환됩니다.
+#
+# 연속된 채널 공간 선형 단계(재참조, ICA 제거, 보간)는 각 단계의 연산을 탐침으로
+# 구해 하나의 (채널 x 채널) 연산으로 합친 뒤 데이터에 한 번만 적용합니다 (eeg_projection).
+# 이때 중간 단계 출력은 저장하지 않고 (기준 출력 키, 누적 연산)만 기록합니다.
+#
+# 단계 출력은 copy-on-write 버전 저장소(eeg_history)에 입력 버전과 다른 블록만
+# 기록하므로, 보간처럼 몇 채널만 바꾸는 단계의 이력은 그 채널만큼만 메모리를 씁니다.
+# Raw 객체로 유지하는 출력은 최근 몇 개뿐이고, 나머지 이력은 필요할 때 다시 조립합니다.
+#
+# 파워 스펙트럼도 출력 키별로 캐시하며, 저장된 입력 버전의 스펙트럼이 있으면
+# 그 버전과 블록을 공유하지 않는 (바뀐) 채널만 다시 계산합니다.
+
+import hashlib
+import json
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import numpy as np
+import mne
+import eeg_pipeline as pipeline
+import eeg_ica
+from eeg_history import VersionStore
+from eeg_interp import interpolate_bads
+from eeg_projection import LINEAR_KINDS, AffineOperator, apply_to_raw
+from eeg_psd import compute_psd
+from eeg_profiling import profiled, stage
+
+
+# 이력 저장소의 최대 크기 (바이트, 공유 블록은 한 번만 셈). 현재 체인과
+# 실행 취소/다시 실행 바로 앞뒤의 출력은 이 한도와 상관없이 유지
+DEFAULT_CACHE_BYTES = 2 * 1024 ** 3
+# Raw 객체로 유지하는 최근 출력 수
+MAX_LIVE_OUTPUTS = 2
+# 실행 취소 기록의 최대 길이
+MAX_HISTORY = 50
+SOURCE_KEY = 'source'
+
+STEP_LABELS = {
+    'bandpass': '대역 통과',
+    'notch': '노치',
+    'highpass': '고역 통과',
+    'reference': '재참조',
+    'ica': 'ICA',
+    'interpolate': '보간',
+}
+
+
+@dataclass(frozen=True)
+class ProcessingStep:
+    """
+    처리 단계 하나.
+
+    params의 'bads'는 단계를 실행하는 동안 raw.info['bads']로 설정됩니다
+    (재참조/ICA 피팅에서 제외할 채널, 보간할 채널). 출력의 bads는 항상 비어 있습니다.
+    """
+    kind: str
+    params: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.kind not in STEP_LABELS:
+            raise ValueError(f'알 수 없는 처리 단계: {self.kind}')
+
+    def key(self, input_key):
+        text = json.dumps([input_key, self.kind, self.params], sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def describe(self):
+        p = self.params
+        if self.kind == 'bandpass':
+            text = f"{p.get('l_freq')}-{p.get('h_freq')} Hz"
+            if p.get('notch') is not None:
+                text += f", 노치 {p['notch']} Hz"
+        elif self.kind == 'notch':
+            freqs = p.get('freqs')
+            text = ', '.join(str(f) for f in freqs) if isinstance(freqs, (list, tuple)) else str(freqs)
+            text += ' Hz'
+        elif self.kind == 'highpass':
+            text = f"{p.get('l_freq')} Hz"
+        elif self.kind == 'reference':
+            ref = p.get('ref')
+            text = '평균' if ref == 'average' else ', '.join(ref)
+        elif self.kind == 'ica':
+            text = f"{p.get('n_components')}개 중 {p.get('components')} 제거"
+        else:
+            text = f"{', '.join(p.get('bads', []))} ({p.get('mode')})"
+        return f'{STEP_LABELS[self.kind]}({text})'
+
+
+def steps_with(steps, step):
+    """같은 종류의 단계가 있으면 그 자리에서 바꾸고, 없으면 끝에 추가한 목록을 반환합니다."""
+    steps = list(steps)
+    for i, old in enumerate(steps):
+        if old.kind == step.kind:
+            steps[i] = step
+            return steps
+    steps.append(step)
+    return steps
+
+
+def steps_without(steps, kind):
+    return [step for step in steps if step.kind != kind]
+
+
+def describe_steps(steps):
+    return ' → '.join(step.describe() for step in steps) if steps else '원본'
+
+
+class ProcessingChain:
+    """
+    원본 Raw 위에 처리 단계를 쌓는 비파괴 체인.
+
+    단계 목록 변경(set_steps), 실행 취소/다시 실행은 GUI 스레드에서,
+    compute()는 작업 스레드에서 호출하는 것을 전제로 합니다.
+    compute()는 단계 목록을 인자로 받으므로 실행 중에 목록이 바뀌어도 안전합니다.
+
+    Parameters:
+    -----------
+    source : mne.io.Raw
+        원본 Raw (변경하지 않음)
+    max_bytes : int
+        이력 저장소의 최대 크기
+    n_jobs : int
+        필터/보간 병렬 스레드 수 (결과에 영향이 없으므로 캐시 키에 포함하지 않음)
+    """
+
+    def __init__(self, source, max_bytes=DEFAULT_CACHE_BYTES, n_jobs=1):
+        self.source = source
+        self.max_bytes = max_bytes
+        self.n_jobs = n_jobs
+        self._steps = ()
+        self._undo = []
+        self._redo = []
+        self._history = VersionStore(source._data, base_key=SOURCE_KEY)
+        self._infos = {}  # 저장소 버전 키 -> 출력 info
+        self._live = OrderedDict()  # 키 -> Raw (최근 출력, LRU 순서)
+        self._issued = weakref.WeakValueDictionary()  # 키 -> 아직 쓰이고 있는 출력 Raw
+        self._icas = {}  # (입력 키, 피팅 파라미터) -> (ICA, IcaFitSummary)
+        self._step_ops = {}  # 선형 단계 출력 키 -> (AffineOperator, 출력 info)
+        self._derived = {}  # 저장하지 않은 중간 출력 키 -> (기준 출력 키, 누적 AffineOperator)
+        self._spectra = {}  # (출력 키, 세그먼트 길이) -> eeg_psd.Spectrum
+
+    @property
+    def steps(self):
+        return list(self._steps)
+
+    def keys(self, steps=None):
+        """각 단계 출력의 캐시 키 목록."""
+        steps = self._steps if steps is None else steps
+        keys = []
+        key = SOURCE_KEY
+        for step in steps:
+            key = step.key(key)
+            keys.append(key)
+        return keys
+
+    def output(self, steps=None):
+        """단계 목록의 최종 출력. 이력에 없으면 None."""
+        steps = self._steps if steps is None else steps
+        if not steps:
+            return self.source
+        key = self.keys(steps)[-1]
+        raw = self._raw_of(key)
+        if raw is None and key in self._history:
+            raw = self._materialize(key)
+        if raw is not None:
+            self._keep_live(key, raw)
+        return raw
+
+    def is_cached(self, steps=None):
+        steps = self._steps if steps is None else steps
+        return not steps or self.keys(steps)[-1] in self._history
+
+    def _raw_of(self, key):
+        """이미 만들어 둔 출력 Raw (없으면 None, 저장소에서 조립하지 않음)."""
+        if key == SOURCE_KEY:
+            return self.source
+        raw = self._live.get(key)
+        return self._issued.get(key) if raw is None else raw
+
+    def _materialize(self, key):
+        data = self._history.materialize(key)
+        data.flags.writeable = False
+        raw = mne.io.RawArray(data, self._infos[key].copy(), first_samp=self.source.first_samp,
+                              verbose=False)
+        raw.set_annotations(self.source.annotations)
+        return raw
+
+    def _keep_live(self, key, raw):
+        self._live[key] = raw
+        self._live.move_to_end(key)
+        self._issued[key] = raw
+        while len(self._live) > MAX_LIVE_OUTPUTS:
+            self._live.popitem(last=False)
+
+    def input_of(self, kind, steps=None):
+        """종류가 kind인 단계의 입력 Raw (예: 보간 전 신호). 없거나 캐시에 없으면 None."""
+        steps = self._steps if steps is None else list(steps)
+        for i, step in enumerate(steps):
+            if step.kind == kind:
+                return self.output(steps[:i])
+        return None
+
+    def find(self, kind, steps=None):
+        steps = self._steps if steps is None else steps
+        for step in steps:
+            if step.kind == kind:
+                return step
+        return None
+
+    def set_steps(self, steps):
+        """단계 목록을 바꾸고 실행 취소 기록에 남깁니다."""
+        steps = tuple(steps)
+        if steps == self._steps:
+            return
+        self._undo.append(self._steps)
+        del self._undo[:-MAX_HISTORY]
+        self._redo.clear()
+        self._steps = steps
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_steps(self):
+        return list(self._undo[-1]) if self._undo else None
+
+    def redo_steps(self):
+        return list(self._redo[-1]) if self._redo else None
+
+    def undo(self):
+        if self._undo:
+            self._redo.append(self._steps)
+            self._steps = self._undo.pop()
+        return self.steps
+
+    def redo(self):
+        if self._redo:
+            self._undo.append(self._steps)
+            self._steps = self._redo.pop()
+        return self.steps
+
+    @profiled('chain.compute', category='chain')
+    def compute(self, steps=None, progress=None):
+        """
+        단계 목록의 최종 출력을 계산합니다. 캐시에 있는 단계는 건너뜁니다.
+
+        Returns:
+        --------
+        mne.io.Raw
+            최종 출력 (단계가 없으면 원본)
+        """
+        steps = list(self._steps if steps is None else steps)
+        keys = self.keys(steps)
+        # 캐시에 있는 가장 아래 단계부터 다시 계산
+        first = 0
+        for i in range(len(steps) - 1, -1, -1):
+            if keys[i] in self._history:
+                first = i + 1
+                break
+        raw = self.output(steps[:first])
+        n_todo = len(steps) - first
+        i = first
+        while i < len(steps):
+            # 탐침할 수 있는 연속 선형 단계는 하나의 연산으로 합쳐 한 번에 적용
+            j = i
+            while j < len(steps) and self._is_linear(steps[j], keys[j - 1] if j else SOURCE_KEY):
+                j += 1
+            step_progress = pipeline.scaled_progress(progress, (i - first) / n_todo,
+                                                     (max(j, i + 1) - first) / n_todo)
+            input_key = keys[i - 1] if i else SOURCE_KEY
+            if j > i:
+                with stage('+'.join(step.kind for step in steps[i:j]), 'chain', linear=True):
+                    raw = self._run_linear(steps[i:j], raw, keys, i, step_progress)
+                i = j
+            else:
+                with stage(steps[i].kind, 'chain'):
+                    raw = self._run_step(steps[i], raw, input_key, step_progress)
+                i += 1
+            with stage('store', 'chain'):
+                self._store(keys[i - 1], raw, input_key, protect=keys)
+        if progress is not None:
+            progress(1.0)
+        return raw
+
+    def _is_linear(self, step, input_key):
+        if step.kind not in LINEAR_KINDS:
+            return False
+        # ICA는 실제 입력에 피팅되어 있어야 탐침할 수 있음 (아니면 입력을 만들어 피팅)
+        return step.kind != 'ica' or self._ica_key(step, input_key) in self._icas
+
+    def _step_operator(self, step, input_key, key, info):
+        cached = self._step_ops.get(key)
+        if cached is None:
+            cached = AffineOperator.probe(
+                info, lambda probe: self._run_step(step, probe, input_key, None))
+            self._step_ops[key] = cached
+        return cached
+
+    def _run_linear(self, steps, raw, keys, first, progress):
+        base_key = keys[first - 1] if first else SOURCE_KEY
+        operator = AffineOperator.identity(len(raw.ch_names))
+        info = raw.info
+        for offset, step in enumerate(steps):
+            i = first + offset
+            input_key = keys[i - 1] if i else SOURCE_KEY
+            step_op, info = self._step_operator(step, input_key, keys[i], info)
+            operator = operator.then(step_op)
+            self._derived[keys[i]] = (base_key, operator)
+        return apply_to_raw(raw, operator, info, n_jobs=self.n_jobs, progress=progress)
+
+    def operator_between(self, raw_from, steps=None):
+        """
+        raw_from(체인의 어떤 출력)에서 steps 최종 출력까지의 아핀 연산.
+
+        raw_from이 steps의 앞부분 출력이고 그 뒤 단계가 모두 선형일 때만 구할 수 있으며,
+        아니면 None을 반환합니다. ERP처럼 평균 낸 데이터의 전/후 비교에 사용합니다.
+        """
+        steps = list(self._steps if steps is None else steps)
+        keys = self.keys(steps)
+        all_keys = [SOURCE_KEY] + keys
+        start = None
+        for n, key in enumerate(all_keys):
+            if self._raw_of(key) is raw_from:
+                start = n
+        if start is None:
+            return None
+        operator = AffineOperator.identity(len(raw_from.ch_names))
+        info = raw_from.info
+        for i in range(start, len(steps)):
+            input_key = all_keys[i]
+            if not self._is_linear(steps[i], input_key):
+                return None
+            step_op, info = self._step_operator(steps[i], input_key, keys[i], info)
+            operator = operator.then(step_op)
+        return operator
+
+    def rows_of(self, steps, names):
+        """
+        steps 출력의 일부 채널 데이터. 저장하지 않은 중간 출력이면 기준 출력에
+        누적 연산의 해당 행만 적용해 만듭니다. 구할 수 없으면 None.
+        """
+        steps = list(steps)
+        rows = [self.source.ch_names.index(ch) for ch in names]
+        key = self.keys(steps)[-1] if steps else SOURCE_KEY
+        data = self._rows(key, rows)
+        if data is not None:
+            return data
+        derived = self._derived.get(key)
+        if derived is None:
+            return None
+        base_key, operator = derived
+        # 누적 연산의 해당 행이 쓰는 입력 채널만 읽음
+        cols = np.flatnonzero(np.any(operator.matrix[rows] != 0, axis=0))
+        base = self._rows(base_key, cols)
+        if base is None:
+            return None
+        return operator.matrix[np.ix_(rows, cols)] @ base + operator.offset[rows, None]
+
+    def _rows(self, key, rows):
+        """버전 key의 일부 채널. 만들어 둔 Raw가 있으면 그 데이터, 없으면 저장소의 블록에서 읽음."""
+        raw = self._raw_of(key)
+        if raw is not None:
+            return raw._data[rows].copy()
+        if key in self._history:
+            return self._history.read(key, rows)
+        return None
+
+    def input_rows(self, kind, names, steps=None):
+        """종류가 kind인 단계 입력의 일부 채널 (예: 보간 전 불량 채널 신호)."""
+        steps = self._steps if steps is None else list(steps)
+        for i, step in enumerate(steps):
+            if step.kind == kind:
+                return self.rows_of(steps[:i], names)
+        return None
+
+    def fit_ica(self, n_components, bads=(), random_state=42, steps=None, progress=None,
+                options=None):
+        """
+        ICA 단계가 들어갈 자리의 입력에 ICA를 피팅합니다.
+
+        단계 목록에 ICA 단계가 있으면 그 앞까지의 출력, 없으면 최종 출력에 피팅하므로
+        steps_with()로 같은 피팅 옵션(params['fit'])의 ICA 단계를 넣을 때 피팅이 재사용됩니다.
+
+        Returns:
+        --------
+        ica : mne.preprocessing.ICA
+        summary : eeg_ica.IcaFitSummary
+            처음 피팅했을 때의 요약 (재사용해도 같은 값)
+        """
+        steps = list(self._steps if steps is None else steps)
+        for i, step in enumerate(steps):
+            if step.kind == 'ica':
+                steps = steps[:i]
+                break
+        raw = self.compute(steps, progress=pipeline.scaled_progress(progress, 0.0, 0.5))
+        input_key = self.keys(steps)[-1] if steps else SOURCE_KEY
+        return self._fit_ica(raw, input_key, n_components, list(bads), random_state, options,
+                             pipeline.scaled_progress(progress, 0.5, 1.0))
+
+    def psd(self, steps=None, n_per_seg=None, progress=None):
+        """
+        단계 목록 최종 출력의 Welch 파워 스펙트럼 (출력 키별로 캐시).
+
+        출력이 이력에 저장된 버전이고 그 입력 버전의 스펙트럼이 캐시에 있으면, 입력과
+        다른 채널만 다시 계산합니다 (예: 보간은 보간한 채널만).
+
+        Returns:
+        --------
+        eeg_psd.Spectrum
+        """
+        steps = list(self._steps if steps is None else steps)
+        raw = self.compute(steps, progress=pipeline.scaled_progress(progress, 0.0, 0.5))
+        key = self.keys(steps)[-1] if steps else SOURCE_KEY
+        spectrum = self._spectra.get((key, n_per_seg))
+        if spectrum is not None:
+            return spectrum
+        progress = pipeline.scaled_progress(progress, 0.5, 1.0)
+        parent = self._history.parent(key) if key in self._history else None
+        base = self._spectra.get((parent, n_per_seg))
+        if base is not None and base.ch_names == raw.ch_names:
+            rows = self._history.changed_rows(key, parent)
+            spectrum = base
+            if len(rows):
+                spectrum = base.with_rows(rows, compute_psd(raw, n_per_seg, picks=rows,
+                                                            n_jobs=self.n_jobs, progress=progress))
+        else:
+            spectrum = compute_psd(raw, n_per_seg, n_jobs=self.n_jobs, progress=progress)
+        self._spectra[(key, n_per_seg)] = spectrum
+        return spectrum
+
+    @staticmethod
+    def _fit_key(input_key, n_components, bads, random_state, options):
+        return (input_key, n_components, tuple(bads), random_state,
+                json.dumps(options.to_dict(), sort_keys=True))
+
+    def _ica_key(self, step, input_key):
+        p = step.params
+        return self._fit_key(input_key, p['n_components'], list(p.get('bads', [])),
+                             p.get('random_state', 42),
+                             eeg_ica.IcaFitOptions.from_dict(p.get('fit')))
+
+    def _fit_ica(self, raw, input_key, n_components, bads, random_state, options=None,
+                 progress=None):
+        options = options or eeg_ica.IcaFitOptions()
+        fit_key = self._fit_key(input_key, n_components, bads, random_state, options)
+        fitted = self._icas.get(fit_key)
+        if fitted is None:
+            picks = [i for i, ch in enumerate(raw.ch_names) if ch not in bads]
+            fitted = eeg_ica.fit_ica(raw, n_components, random_state, picks=picks,
+                                     options=options, n_jobs=self.n_jobs, progress=progress)
+            self._icas[fit_key] = fitted
+        return fitted
+
+    def _run_step(self, step, raw, input_key, progress):
+        p = step.params
+        out = raw.copy()
+        out.info['bads'] = list(p.get('bads', []))
+        kind = step.kind
+        if kind == 'bandpass':
+            # 'notch'가 있으면 대역 통과와 노치를 한 커널로 합성해 한 번에 적용
+            pipeline.filter_raw(out, p['l_freq'], p['h_freq'], notch_freq=p.get('notch'),
+                                copy=False, progress=progress,
+                                fir_window=p.get('fir_window', 'hamming'),
+                                phase=p.get('phase', 'zero'), n_jobs=self.n_jobs)
+        elif kind == 'notch':
+            # 여러 주파수도 하나의 대역 저지 커널로 한 번에 적용
+            pipeline.filter_raw(out, None, None, notch_freq=p['freqs'], copy=False,
+                                progress=progress, n_jobs=self.n_jobs)
+        elif kind == 'highpass':
+            pipeline.filter_raw(out, p['l_freq'], None, copy=False, progress=progress,
+                                n_jobs=self.n_jobs)
+        elif kind == 'reference':
+            pipeline.set_reference(out, p['ref'])
+        elif kind == 'ica':
+            ica, _ = self._fit_ica(raw, input_key, p['n_components'], list(p.get('bads', [])),
+                                   p.get('random_state', 42),
+                                   eeg_ica.IcaFitOptions.from_dict(p.get('fit')), progress)
+            ica.exclude = list(p['components'])
+            ica.apply(out)
+        elif kind == 'interpolate':
+            # 보간 행렬은 (전극 위치, 불량 채널, 방법)별로 캐시되어 재실행 시 재사용
+            interpolate_bads(out, p['bads'], p.get('mode', 'spline'), n_jobs=self.n_jobs)
+        out.info['bads'] = []
+        return out
+
+    def _store(self, key, raw, input_key, protect=()):
+        """
+        출력을 입력 버전과 다른 블록만 이력 저장소에 기록합니다.
+
+        출력 버퍼는 읽기 전용으로 바꿔 전체가 바뀐 단계(필터 등)는 복사 없이
+        저장소와 공유하고, 일부 채널만 바뀐 단계는 그 채널 블록만 복사합니다.
+        """
+        parent = input_key if input_key in self._history else SOURCE_KEY
+        raw._data.flags.writeable = False
+        self._history.commit(key, raw._data, parent, copy=False)
+        self._infos[key] = raw.info.copy()
+        self._keep_live(key, raw)
+        protect = set(protect) | set(self.keys())
+        for steps in (self.undo_steps(), self.redo_steps()):
+            if steps:
+                protect |= set(self.keys(steps))
+        self._forget(self._history.evict(self.max_bytes, protect))
+
+    def _forget(self, evicted):
+        """이력에서 지운 출력 키에 딸린 info, 선형 연산, 스펙트럼, ICA 피팅을 지웁니다."""
+        evicted = set(evicted)
+        if not evicted:
+            return
+        for key in evicted:
+            self._infos.pop(key, None)
+        # 지운 출력을 기준으로 한 중간 출력은 더 이상 만들 수 없으므로 그 연산도 지움
+        stale = evicted | {key for key, (base_key, _) in self._derived.items()
+                           if base_key in evicted}
+        for key in stale:
+            self._derived.pop(key, None)
+            self._step_ops.pop(key, None)
+        for spectrum_key in [k for k in self._spectra if k[0] in evicted]:
+            del self._spectra[spectrum_key]
+        for fit_key in [k for k in self._icas if k[0] in evicted]:
+            del self._icas[fit_key]
+
+    def history_keys(self):
+        """이력 저장소에 있는 출력 키 (오래 사용하지 않은 순)."""
+        return [key for key in self._history.keys() if key != SOURCE_KEY]
+
+    def changed_channels(self, steps=None):
+        """steps 최종 출력이 저장된 입력 버전에서 바꾼 채널 이름. 이력에 없으면 None."""
+        steps = self._steps if steps is None else steps
+        if not steps:
+            return []
+        key = self.keys(steps)[-1]
+        if key not in self._history:
+            return None
+        return [self.source.ch_names[row] for row in self._history.changed_rows(key)]
+
+    def clear_cache(self):
+        self._history = VersionStore(self.source._data, base_key=SOURCE_KEY)
+        self._infos.clear()
+        self._live.clear()
+        self._issued.clear()
+        self._icas.clear()
+        self._step_ops.clear()
+        self._derived.clear()
+        self._spectra.clear()
+
+    def cache_bytes(self):
+        """이력 저장소가 원본 밖에 쓰는 메모리 (공유 블록은 한 번만 셈)."""
+        return self._history.nbytes()
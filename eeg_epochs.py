@@ -0,0 +1,351 @@
+# eeg_epochs.py
+#
+# 연속 데이터 버퍼 위의 지연(lazy) 에포크 인덱스.
+#
+# mne.Epochs(preload=True)는 에포크마다 (채널 x 샘플)을 복사하지만, EpochIndex는
+# 이벤트 시작 샘플과 창 범위만 저장하고 에포크를 요청할 때마다 원본 버퍼의
+# 읽기 전용 view를 돌려줍니다. baseline 보정은 에포크를 꺼내거나 평균을 낼 때
+# 적용하며, tmin/tmax/baseline을 바꾸는 것은 인덱스를 새로 만들 뿐 데이터를 읽지 않습니다.
+#
+# 조건별 평균/표준오차는 ConditionAccumulator의 합과 제곱합으로 계산하므로, 한 번
+# 누적한 뒤에는 다시 그릴 때 에포크를 다시 읽지 않고, 에포크를 빼거나 더할 때는
+# 해당 에포크만 반영합니다.
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import mne
+
+
+# 평균 계산 시 한 번에 모으는 에포크 수 (임시 메모리 = 이 값 x 채널 x 창 길이)
+EPOCH_BATCH = 256
+
+
+def _bad_annotation_spans(raw):
+    """'bad'로 시작하는 주석의 [시작, 끝) 샘플 (버퍼 기준)."""
+    annotations = raw.annotations
+    is_bad = np.array([d.lower().startswith('bad') for d in annotations.description], dtype=bool)
+    if not is_bad.any():
+        return np.empty((0, 2), dtype=np.int64)
+    onsets = annotations.onset[is_bad]
+    starts = raw.time_as_index(onsets, origin=annotations.orig_time)
+    stops = raw.time_as_index(onsets + annotations.duration[is_bad], origin=annotations.orig_time)
+    return np.column_stack([starts, stops]).astype(np.int64)
+
+
+class ConditionAccumulator:
+    """
+    조건별 (채널, 샘플) 합, 제곱합, 에포크 수.
+
+    add/remove로 에포크를 더하거나 빼면 평균, 분산, 표준오차를
+    O(채널 x 샘플)로 계산합니다. condition이 None이면 모든 조건을 합친 값입니다.
+    """
+
+    def __init__(self, conditions, n_channels, n_times):
+        self.conditions = list(conditions)
+        self._pos = {name: i for i, name in enumerate(self.conditions)}
+        shape = (len(self.conditions), n_channels, n_times)
+        self._sum = np.zeros(shape)
+        self._sumsq = np.zeros(shape)
+        self._n = np.zeros(len(self.conditions), dtype=np.int64)
+
+    def copy(self):
+        other = ConditionAccumulator.__new__(ConditionAccumulator)
+        other.conditions = list(self.conditions)
+        other._pos = dict(self._pos)
+        other._sum = self._sum.copy()
+        other._sumsq = self._sumsq.copy()
+        other._n = self._n.copy()
+        return other
+
+    def subset(self, conditions):
+        """일부 조건만 가진 누적기 (값은 복사)."""
+        other = ConditionAccumulator.__new__(ConditionAccumulator)
+        idx = [self._pos[name] for name in conditions]
+        other.conditions = list(conditions)
+        other._pos = {name: i for i, name in enumerate(other.conditions)}
+        other._sum = self._sum[idx]
+        other._sumsq = self._sumsq[idx]
+        other._n = self._n[idx]
+        return other
+
+    def extended(self, conditions):
+        """conditions 중 없는 조건을 빈 값으로 뒤에 추가한 누적기 (기존 값은 복사)."""
+        new = [name for name in conditions if name not in self._pos]
+        other = ConditionAccumulator(self.conditions + new, *self._sum.shape[1:])
+        n = len(self.conditions)
+        other._sum[:n] = self._sum
+        other._sumsq[:n] = self._sumsq
+        other._n[:n] = self._n
+        return other
+
+    def _update(self, condition, epochs, sign):
+        epochs = np.asarray(epochs, dtype=np.float64)
+        if epochs.ndim == 2:
+            epochs = epochs[None]
+        i = self._pos[condition]
+        self._sum[i] += sign * epochs.sum(axis=0)
+        self._sumsq[i] += sign * np.einsum('ijk,ijk->jk', epochs, epochs)
+        self._n[i] += sign * len(epochs)
+
+    def add(self, condition, epochs):
+        """(에포크, 채널, 샘플) 또는 (채널, 샘플) 에포크를 condition에 더합니다."""
+        self._update(condition, epochs, 1)
+
+    def remove(self, condition, epochs):
+        """add로 더했던 에포크를 뺍니다 (제외/거부된 에포크)."""
+        self._update(condition, epochs, -1)
+
+    def _select(self, condition):
+        if condition is None:
+            return slice(None)
+        names = [condition] if isinstance(condition, str) else list(condition)
+        return [self._pos[name] for name in names]
+
+    def n(self, condition=None):
+        return int(self._n[self._select(condition)].sum())
+
+    def mean(self, condition=None):
+        """(채널, 샘플) 평균. 에포크가 없으면 None."""
+        sel = self._select(condition)
+        n = self._n[sel].sum()
+        if n == 0:
+            return None
+        return self._sum[sel].sum(axis=0) / n
+
+    def var(self, condition=None):
+        """(채널, 샘플) 표본 분산 (ddof=1). 에포크가 2개 미만이면 None."""
+        sel = self._select(condition)
+        n = self._n[sel].sum()
+        if n < 2:
+            return None
+        total = self._sum[sel].sum(axis=0)
+        var = (self._sumsq[sel].sum(axis=0) - total * total / n) / (n - 1)
+        # 합/제곱합 차이의 반올림 오차로 생기는 작은 음수 제거
+        return np.maximum(var, 0.0)
+
+    def sem(self, condition=None):
+        """(채널, 샘플) 평균의 표준오차. 에포크가 2개 미만이면 None."""
+        var = self.var(condition)
+        if var is None:
+            return None
+        return np.sqrt(var / self.n(condition))
+
+
+class EpochIndex:
+    """
+    이벤트 시작 샘플과 창 범위만 저장하는 에포크 목록.
+
+    메모리는 이벤트 수에 비례하며, 데이터는 원본 Raw 버퍼를 공유합니다
+    (체인의 각 단계 출력은 새 Raw이므로 인덱스가 만들어진 상태의 데이터를 계속 가리킴).
+    mne.Epochs와 같이 창이 데이터 범위를 벗어나거나 'bad' 주석과 겹치는 이벤트는 제외됩니다.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        preload된 연속 데이터
+    events : np.ndarray
+        (이벤트 수, 3) 배열 (샘플, 이전 값, 이벤트 ID)
+    event_id : dict or None
+        {조건 이름: 이벤트 ID}. None이면 모든 이벤트 ID를 문자열 이름으로 사용
+    tmin, tmax : float
+        이벤트 기준 창 범위 (초, tmax 포함)
+    baseline : tuple or None
+        (시작, 끝) 초. None은 각각 창의 처음/끝. baseline=None이면 보정하지 않음
+    """
+
+    def __init__(self, raw, events, event_id=None, tmin=-0.2, tmax=0.5, baseline=(None, 0)):
+        events = np.asarray(events, dtype=np.int64)
+        if event_id is None:
+            event_id = {str(code): int(code) for code in np.unique(events[:, 2])}
+        self.raw = raw
+        self.event_id = dict(event_id)
+        self.sfreq = raw.info['sfreq']
+        self._set_window(tmin, tmax, baseline)
+        keep = np.isin(events[:, 2], list(self.event_id.values()))
+        events = events[keep]
+        # 창을 바꿀 때 범위 검사를 다시 하도록 제외 전 이벤트를 보관
+        self._all_events = events
+        # 이벤트 샘플 번호는 first_samp를 포함한 절대 번호
+        onsets = events[:, 0] - raw.first_samp
+        n_times = raw._data.shape[1]
+        keep = (onsets + self._start >= 0) & (onsets + self._stop <= n_times)
+        for a, b in _bad_annotation_spans(raw):
+            keep &= ~((onsets + self._start < b) & (onsets + self._stop > a))
+        self.events = events[keep]
+        self.onsets = onsets[keep]
+        self._windows = None
+        self._accumulator = None
+
+    def _set_window(self, tmin, tmax, baseline):
+        self.tmin = tmin
+        self.tmax = tmax
+        self.baseline = baseline
+        # mne.Epochs와 같은 창 샘플 범위 (tmax 포함)
+        self._start = int(round(tmin * self.sfreq))
+        self._stop = int(round(tmax * self.sfreq)) + 1
+        self.times = np.arange(self._start, self._stop) / self.sfreq
+        if baseline is None:
+            self._baseline_slice = None
+        else:
+            b0 = self.times[0] if baseline[0] is None else baseline[0]
+            b1 = self.times[-1] if baseline[1] is None else baseline[1]
+            idx = np.flatnonzero((self.times >= b0) & (self.times <= b1))
+            if len(idx) == 0:
+                raise ValueError(f'baseline 구간 {baseline}이 에포크 창 밖에 있습니다.')
+            self._baseline_slice = slice(idx[0], idx[-1] + 1)
+
+    def __len__(self):
+        return len(self.onsets)
+
+    @property
+    def ch_names(self):
+        return self.raw.ch_names
+
+    @property
+    def info(self):
+        return self.raw.info
+
+    @property
+    def n_times(self):
+        return self._stop - self._start
+
+    def rewindow(self, tmin=None, tmax=None, baseline=False):
+        """
+        창/baseline만 바꾼 새 인덱스를 반환합니다 (데이터를 읽지 않음).
+        baseline을 생략(False)하면 현재 값을 유지합니다.
+        """
+        tmin = self.tmin if tmin is None else tmin
+        tmax = self.tmax if tmax is None else tmax
+        baseline = self.baseline if baseline is False else baseline
+        return EpochIndex(self.raw, self._all_events, self.event_id, tmin, tmax, baseline)
+
+    def with_raw(self, raw):
+        """같은 이벤트/창으로 다른 상태의 Raw(예: 재참조 후)를 가리키는 인덱스."""
+        return EpochIndex(raw, self._all_events, self.event_id, self.tmin, self.tmax, self.baseline)
+
+    def _window_view(self):
+        # (채널, 시작 위치, 창 길이) 읽기 전용 strided view: 복사 없음
+        if self._windows is None:
+            self._windows = sliding_window_view(self.raw._data, self.n_times, axis=1)
+        return self._windows
+
+    def _rows(self, condition):
+        if condition is None:
+            return np.arange(len(self))
+        codes = [condition] if not isinstance(condition, (list, tuple)) else condition
+        codes = [self.event_id.get(c, c) for c in codes]
+        return np.flatnonzero(np.isin(self.events[:, 2], codes))
+
+    @property
+    def conditions(self):
+        return list(self.event_id)
+
+    @property
+    def accumulator(self):
+        """조건별 누적기. 처음 사용할 때 모든 에포크를 한 번 읽어 만듭니다."""
+        if self._accumulator is None:
+            acc = ConditionAccumulator(self.event_id, len(self.ch_names), self.n_times)
+            for name in self.event_id:
+                for block in self.iter_batches(name):
+                    acc.add(name, block)
+            self._accumulator = acc
+        return self._accumulator
+
+    def _derived(self, keep, accumulator=None):
+        # 같은 버퍼/창을 공유하고 keep 행의 에포크만 가진 인덱스
+        sub = EpochIndex.__new__(EpochIndex)
+        sub.__dict__.update(self.__dict__)
+        sub.events = self.events[keep]
+        sub.onsets = self.onsets[keep]
+        sub._accumulator = accumulator
+        return sub
+
+    def drop(self, rows):
+        """
+        rows 번째 에포크(예: 거부된 에포크)를 뺀 인덱스를 반환합니다.
+
+        누적기가 이미 있으면 빠진 에포크만 빼서 갱신하므로 나머지는 다시 읽지 않습니다.
+        빠진 이벤트는 창을 바꿔도(rewindow) 다시 포함되지 않습니다.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        keep = np.ones(len(self), dtype=bool)
+        keep[rows] = False
+        acc = None
+        if self._accumulator is not None:
+            acc = self._accumulator.copy()
+            names = {code: name for name, code in self.event_id.items()}
+            for row in rows:
+                acc.remove(names[self.events[row, 2]], self.epoch(row))
+        sub = self._derived(keep, acc)
+        dropped = {tuple(ev) for ev in self.events[rows]}
+        sub._all_events = np.array([ev for ev in self._all_events if tuple(ev) not in dropped],
+                                   dtype=np.int64).reshape(-1, 3)
+        return sub
+
+    def count(self, condition=None):
+        return len(self._rows(condition))
+
+    def epoch(self, i, baseline=True):
+        """
+        i번째 에포크 (채널, 샘플).
+
+        baseline=False이면 원본 버퍼의 읽기 전용 view, True이면 보정된 복사본을 반환합니다.
+        """
+        view = self._window_view()[:, self.onsets[i] + self._start]
+        if not baseline or self._baseline_slice is None:
+            return view
+        return view - view[:, self._baseline_slice].mean(axis=1, keepdims=True)
+
+    def iter_batches(self, condition=None, baseline=True, batch=EPOCH_BATCH):
+        """(에포크, 채널, 샘플) 배치를 차례로 만듭니다. 임시 메모리는 배치 크기로 제한됩니다."""
+        rows = self._rows(condition)
+        windows = self._window_view()
+        for i in range(0, len(rows), batch):
+            starts = self.onsets[rows[i:i + batch]] + self._start
+            block = np.moveaxis(windows[:, starts], 1, 0)
+            if baseline and self._baseline_slice is not None:
+                block = block - block[:, :, self._baseline_slice].mean(axis=2, keepdims=True)
+            yield block
+
+    def channel_data(self, ch, condition=None, baseline=True):
+        """채널 하나의 (에포크, 샘플) 배열 (채널별 계산용, 모든 채널을 복사하지 않음)."""
+        rows = self._rows(condition)
+        data = self._window_view()[ch, self.onsets[rows] + self._start]
+        if baseline and self._baseline_slice is not None:
+            data = data - data[:, self._baseline_slice].mean(axis=1, keepdims=True)
+        return data
+
+    def get_data(self, condition=None, baseline=True):
+        """(에포크, 채널, 샘플) 배열로 모두 복사합니다. 큰 데이터에서는 iter_batches를 사용하세요."""
+        blocks = list(self.iter_batches(condition, baseline))
+        if not blocks:
+            return np.empty((0, len(self.ch_names), self.n_times))
+        return np.concatenate(blocks, axis=0)
+
+    def mean(self, condition=None):
+        """baseline 보정된 조건(이름 또는 이름 목록, None이면 전체) 평균 (채널, 샘플)."""
+        return self.accumulator.mean(condition)
+
+    def sem(self, condition=None):
+        """조건 평균의 표준오차 (채널, 샘플). 에포크가 2개 미만이면 None."""
+        return self.accumulator.sem(condition)
+
+    def average(self, condition=None):
+        """조건(없으면 전체)의 ERP를 mne.EvokedArray로 반환합니다."""
+        n = self.accumulator.n(condition)
+        if n == 0:
+            raise ValueError(f'에포크가 없습니다: {condition}')
+        names = self.conditions if condition is None else condition
+        comment = names if isinstance(names, str) else ' + '.join(names)
+        return mne.EvokedArray(self.mean(condition), self.raw.info.copy(), tmin=self.times[0],
+                               comment=comment, nave=n, baseline=self.baseline, verbose=False)
+
+    def __getitem__(self, condition):
+        """조건 이름으로 해당 이벤트만 가진 인덱스 (mne.Epochs[name]과 같은 용도)."""
+        names = [condition] if isinstance(condition, str) else list(condition)
+        sub = self._derived(self._rows(names))
+        sub.event_id = {name: self.event_id[name] for name in names if name in self.event_id}
+        if self._accumulator is not None:
+            sub._accumulator = self._accumulator.subset(list(sub.event_id))
+        sub._all_events = self._all_events[np.isin(self._all_events[:, 2], list(sub.event_id.values()))]
+        return sub
@@ -0,0 +1,184 @@
+# eeg_filters.py
+#
+# 대역 통과와 노치 필터를 하나의 FIR 커널로 합성해 한 번에 적용합니다.
+#
+# 커널은 MNE와 같은 설계(firwin, 'auto' 길이/전이 대역)를 사용하고
+# (sfreq, 차단 주파수, 창 함수, 위상)별로 캐시합니다. 적용은 MNE와 같은
+# 'reflect_limited' 가장자리 확장 후 FFT overlap-add 컨볼루션으로 하며,
+# 채널 블록 x 시간 청크 단위로 처리하여 추가 메모리가 녹화 길이에 비례하지 않습니다.
+
+from functools import lru_cache
+import numpy as np
+from scipy.signal import oaconvolve
+import mne
+from eeg_parallel import run_blocks, channel_blocks
+
+
+# 한 번에 컨볼루션하는 출력 샘플 수
+FILTER_CHUNK = 2 ** 18
+# 단일 커널로 합성할 수 있는 위상
+FUSED_PHASES = ('zero', 'zero-double')
+# MNE notch_filter 기본값 (노치 폭 = 주파수 / 200, 전이 대역 1 Hz)
+NOTCH_TRANS_BANDWIDTH = 1.0
+
+
+def _readonly(h):
+    h = np.asarray(h, dtype=np.float64)
+    h.setflags(write=False)
+    return h
+
+
+@lru_cache(maxsize=64)
+def design_bandpass(sfreq, l_freq, h_freq, fir_window='hamming', phase='zero'):
+    """대역 통과(고역/저역 통과 포함) FIR 커널. l_freq와 h_freq 중 하나는 None일 수 있습니다."""
+    return _readonly(mne.filter.create_filter(
+        None, sfreq, l_freq, h_freq, method='fir', phase=phase,
+        fir_window=fir_window, fir_design='firwin', verbose=False))
+
+
+@lru_cache(maxsize=64)
+def design_notch(sfreq, freqs, fir_window='hamming', phase='zero'):
+    """freqs(튜플)의 모든 주파수를 한 번에 제거하는 대역 저지 FIR 커널 (MNE notch_filter와 같은 설계)."""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    tb_2 = NOTCH_TRANS_BANDWIDTH / 2.0
+    widths = freqs / 200.0
+    lows = freqs - widths / 2.0 - tb_2
+    highs = freqs + widths / 2.0 + tb_2
+    return _readonly(mne.filter.create_filter(
+        None, sfreq, highs, lows, l_trans_bandwidth=tb_2, h_trans_bandwidth=tb_2,
+        method='fir', phase=phase, fir_window=fir_window, fir_design='firwin',
+        verbose=False))
+
+
+def _notch_tuple(notch_freqs):
+    if notch_freqs is None:
+        return ()
+    return tuple(float(f) for f in np.atleast_1d(notch_freqs))
+
+
+@lru_cache(maxsize=64)
+def _design_fused(sfreq, l_freq, h_freq, notch_freqs, fir_window, phase):
+    kernels = []
+    if l_freq is not None or h_freq is not None:
+        kernels.append(design_bandpass(sfreq, l_freq, h_freq, fir_window, phase))
+    if notch_freqs:
+        kernels.append(design_notch(sfreq, notch_freqs, fir_window, phase))
+    if not kernels:
+        return _readonly([1.0])
+    h = kernels[0]
+    for k in kernels[1:]:
+        # 대칭(영위상) 커널끼리의 컨볼루션도 대칭이므로 지연은 (길이 - 1) / 2
+        h = np.convolve(h, k)
+    return _readonly(h)
+
+
+def design_fir(sfreq, l_freq=None, h_freq=None, notch_freqs=None, fir_window='hamming',
+               phase='zero'):
+    """
+    대역 통과와 모든 노치를 합성한 단일 FIR 커널을 반환합니다 (캐시됨).
+
+    Parameters:
+    -----------
+    sfreq : float
+        샘플링 주파수 (Hz)
+    l_freq, h_freq : float or None
+        대역 통과 차단 주파수. 둘 다 None이면 노치만
+    notch_freqs : float, list or None
+        제거할 주파수
+    fir_window : str
+        FIR 창 함수
+    phase : str
+        'zero' 또는 'zero-double'
+
+    Returns:
+    --------
+    np.ndarray
+        읽기 전용 커널
+    """
+    if phase not in FUSED_PHASES:
+        raise ValueError(f'합성 필터가 지원하지 않는 위상: {phase}')
+    l_freq = None if l_freq is None else float(l_freq)
+    h_freq = None if h_freq is None else float(h_freq)
+    return _design_fused(float(sfreq), l_freq, h_freq, _notch_tuple(notch_freqs),
+                         fir_window, phase)
+
+
+def _padded(x, n_edge):
+    """MNE의 'reflect_limited' 방식으로 가장자리를 확장한 (왼쪽, 오른쪽) 조각."""
+    n_times = x.shape[1]
+    if n_edge == 0:
+        empty = np.empty((x.shape[0], 0), dtype=x.dtype)
+        return empty, empty
+    left = 2 * x[:, :1] - x[:, n_edge:0:-1]
+    right = 2 * x[:, -1:] - x[:, -2:-n_edge - 2:-1]
+    # 신호가 커널보다 짧으면 반사가 모자란 만큼 0으로 채움
+    zeros = np.zeros((x.shape[0], max(n_edge - n_times + 1, 0)), dtype=x.dtype)
+    return np.concatenate([zeros, left], axis=1), np.concatenate([right, zeros], axis=1)
+
+
+def _segment(x, left, right, start, stop):
+    """확장된 신호 [왼쪽, x, 오른쪽]의 [start, stop) 구간. 범위 밖은 0."""
+    n_left = left.shape[1]
+    n_times = x.shape[1]
+    n_total = n_left + n_times + right.shape[1]
+    pieces = []
+    if start < 0:
+        pieces.append(np.zeros((x.shape[0], min(stop, 0) - start), dtype=x.dtype))
+        start = 0
+    if start < n_left:
+        pieces.append(left[:, start:min(stop, n_left)])
+    a = max(start - n_left, 0)
+    b = min(stop - n_left, n_times)
+    if b > a:
+        pieces.append(x[:, a:b])
+    if stop > n_left + n_times and start < n_total:
+        pieces.append(right[:, max(start - n_left - n_times, 0):min(stop, n_total) - n_left - n_times])
+    if stop > n_total:
+        pieces.append(np.zeros((x.shape[0], stop - max(start, n_total)), dtype=x.dtype))
+    return pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=1)
+
+
+def apply_fir(data, h, picks=None, phase='zero', block=16, chunk=FILTER_CHUNK, progress=None,
+              n_jobs=1):
+    """
+    (채널, 샘플) 배열의 picks 행에 영위상 FIR 커널을 제자리에서 적용합니다.
+
+    결과는 MNE의 overlap-add 필터와 같은 정의(가장자리 반사 확장, 지연 보정)를 따릅니다.
+    채널 블록은 n_jobs개의 스레드에서 병렬로 처리되며 각 블록은 자기 행에만 씁니다.
+    """
+    n_channels, n_times = data.shape
+    picks = np.arange(n_channels) if picks is None else np.asarray(picks)
+    h = np.asarray(h, dtype=np.float64)
+    n_edge = max(min(len(h), n_times) - 1, 0)
+    if phase == 'zero-double':
+        h = np.convolve(h, h[::-1])
+    n_h = len(h)
+    if n_h == 1:
+        data[picks] *= h[0]
+        return data
+    shift = (n_h - 1) // 2 + n_edge
+    kernel = h[None, :]
+
+    def filter_block(rows):
+        # 출력을 제자리에 쓰므로 입력은 블록 단위로 복사해 둠
+        x = np.array(data[rows], dtype=np.float64)
+        left, right = _padded(x, n_edge)
+        for t0 in range(0, n_times, chunk):
+            t1 = min(t0 + chunk, n_times)
+            # 'valid' 컨볼루션 출력이 전체 컨볼루션의 [shift + t0, shift + t1) 구간이 되도록 입력 선택
+            seg = _segment(x, left, right, shift + t0 - (n_h - 1), shift + t1)
+            data[rows, t0:t1] = oaconvolve(seg, kernel, mode='valid', axes=1)
+
+    run_blocks(filter_block, channel_blocks(picks, block), n_jobs, progress)
+    return data
+
+
+def update_filter_info(info, l_freq, h_freq):
+    """필터 적용 후 info의 highpass/lowpass를 MNE와 같은 규칙으로 갱신합니다."""
+    with info._unlock():
+        if h_freq is not None and (l_freq is None or l_freq < h_freq) and \
+                (info['lowpass'] is None or h_freq < info['lowpass']):
+            info['lowpass'] = float(h_freq)
+        if l_freq is not None and (h_freq is None or l_freq < h_freq) and \
+                (info['highpass'] is None or l_freq > info['highpass']):
+            info['highpass'] = float(l_freq)
@@ -0,0 +1,281 @@
+# eeg_grand_average.py
+#
+# 여러 피험자의 조건별 총평균(grand average) ERP.
+#
+# 피험자 녹화마다 워커 프로세스가 eeg_pipeline으로 처리하고 에포크를 조건별
+# 누적기(ConditionAccumulator)에 흘려 넣은 뒤, 피험자 ERP/표준오차만 돌려주고
+# 연속 데이터는 버립니다. 따라서 워커 하나가 동시에 가진 데이터는 피험자 하나분이고,
+# 주 프로세스는 피험자 ERP를 받는 대로 디스크에 쓰고 조건별 총평균 누적기에만 더합니다.
+#
+# 사용 예:
+#   python eeg_grand_average.py data/ group/ --l-freq 0.1 --h-freq 30 --jobs 8
+#
+# 결과 (float32, 압축 .npz):
+#   group/subjects/<이름>.npz  피험자 ERP(mean), 에포크 간 표준오차(sem), 에포크 수
+#   group/grand_average.npz    총평균(mean), 피험자 간 표준오차(sem), 조건별 피험자 수,
+#                              피험자별 조건 에포크 수
+#   group/grand_average.json   피험자별 처리 상태와 요약
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import mne
+from eeg_batch import add_pipeline_arguments, config_from_args, find_recordings
+from eeg_epochs import ConditionAccumulator
+from eeg_pipeline import run_pipeline
+
+
+SUBJECT_DIR = 'subjects'
+GROUP_FILE = 'grand_average.npz'
+SUMMARY_FILE = 'grand_average.json'
+# 디스크에 쓰는 ERP 값 형식 (상대 오차 약 1e-7)
+STORE_DTYPE = np.float32
+
+
+def subject_erps(file_name, events_file, config, use_cache=True):
+    """
+    피험자 녹화 하나를 처리해 조건별 ERP와 표준오차를 계산합니다 (워커 프로세스에서 실행).
+
+    에포크는 인덱스의 배치 단위로 누적기에 더해지므로 (채널 x 샘플) 크기의 합/제곱합
+    외에 에포크를 모아 두지 않으며, 반환 전에 연속 데이터에 대한 참조를 모두 놓습니다.
+
+    Returns:
+    --------
+    dict
+        'stem', 'status', 'elapsed_sec' 키와, 성공하면 'conditions', 'ch_names', 'times',
+        'sfreq', 'mean'/'sem' ((조건, 채널, 샘플), 에포크가 부족한 조건은 NaN),
+        'n_epochs' (조건별, 거부 후), 'n_rejected' 키를 가진 결과
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    start = time.time()
+    result = {'stem': stem}
+    try:
+        if events_file is None:
+            raise ValueError('이벤트 파일이 없습니다.')
+        processed = run_pipeline(file_name, config, events_file=events_file, use_cache=use_cache)
+        epochs = processed['epochs']
+        acc = epochs.accumulator
+        conditions = list(acc.conditions)
+        shape = (len(conditions), len(epochs.ch_names), epochs.n_times)
+        mean = np.full(shape, np.nan)
+        sem = np.full(shape, np.nan)
+        for i, name in enumerate(conditions):
+            m = acc.mean(name)
+            if m is not None:
+                mean[i] = m
+            s = acc.sem(name)
+            if s is not None:
+                sem[i] = s
+        result.update(status='ok', conditions=conditions, ch_names=list(epochs.ch_names),
+                      times=epochs.times, sfreq=epochs.sfreq, mean=mean, sem=sem,
+                      n_epochs=np.array([acc.n(name) for name in conditions], dtype=np.int64),
+                      bads=processed['bads'],
+                      n_rejected=processed['rejection'].n_dropped if processed['rejection'] else 0)
+        del processed, epochs, acc
+    except Exception as e:
+        mne.utils.logger.error(traceback.format_exc())
+        result.update(status='error', error=str(e))
+    result['elapsed_sec'] = round(time.time() - start, 3)
+    return result
+
+
+def save_subject(path, result):
+    np.savez_compressed(
+        path, conditions=np.array(result['conditions']), ch_names=np.array(result['ch_names']),
+        times=result['times'], sfreq=result['sfreq'],
+        mean=result['mean'].astype(STORE_DTYPE), sem=result['sem'].astype(STORE_DTYPE),
+        n_epochs=result['n_epochs'])
+
+
+class GrandAverage:
+    """
+    피험자 ERP를 하나씩 받아 조건별 총평균과 피험자 간 표준오차를 누적합니다.
+
+    조건은 피험자마다 다를 수 있으며 (처음 나온 순서대로 추가), 채널과 시간 축은
+    첫 피험자와 같아야 합니다. 피험자마다 같은 가중치로 평균합니다.
+    """
+
+    def __init__(self):
+        self.ch_names = None
+        self.times = None
+        self.sfreq = None
+        self.conditions = []
+        self.subjects = []
+        self._acc = None
+        self._n_epochs = []  # 피험자별 {조건: 에포크 수}
+
+    def _grow(self, conditions):
+        if self._acc is None:
+            self._acc = ConditionAccumulator(conditions, len(self.ch_names), len(self.times))
+        elif any(name not in self.conditions for name in conditions):
+            self._acc = self._acc.extended(conditions)
+        self.conditions = list(self._acc.conditions)
+
+    def check(self, result):
+        """result의 채널과 시간 축이 첫 피험자와 같은지 확인합니다 (다르면 ValueError)."""
+        if self.ch_names is None:
+            return
+        if list(result['ch_names']) != self.ch_names:
+            raise ValueError('채널 구성이 첫 피험자와 다릅니다.')
+        if len(result['times']) != len(self.times) or not np.allclose(result['times'], self.times):
+            raise ValueError('에포크 시간 축이 첫 피험자와 다릅니다.')
+
+    def add(self, result):
+        """subject_erps()의 성공 결과를 더합니다."""
+        self.check(result)
+        if self.ch_names is None:
+            self.ch_names = list(result['ch_names'])
+            self.times = np.asarray(result['times'])
+            self.sfreq = result['sfreq']
+        self._grow(result['conditions'])
+        for i, name in enumerate(result['conditions']):
+            if result['n_epochs'][i] > 0:
+                self._acc.add(name, result['mean'][i])
+        self.subjects.append(result['stem'])
+        self._n_epochs.append(dict(zip(result['conditions'], map(int, result['n_epochs']))))
+
+    def n_subjects(self, condition):
+        return self._acc.n(condition) if self._acc is not None else 0
+
+    def mean(self, condition):
+        return self._acc.mean(condition)
+
+    def sem(self, condition):
+        return self._acc.sem(condition)
+
+    def n_epochs(self):
+        """(피험자, 조건) 에포크 수 배열."""
+        return np.array([[counts.get(name, 0) for name in self.conditions]
+                         for counts in self._n_epochs], dtype=np.int64).reshape(-1, len(self.conditions))
+
+    def save(self, path):
+        shape = (len(self.conditions), len(self.ch_names), len(self.times))
+        mean = np.full(shape, np.nan, dtype=STORE_DTYPE)
+        sem = np.full(shape, np.nan, dtype=STORE_DTYPE)
+        for i, name in enumerate(self.conditions):
+            m, s = self.mean(name), self.sem(name)
+            if m is not None:
+                mean[i] = m
+            if s is not None:
+                sem[i] = s
+        np.savez_compressed(
+            path, conditions=np.array(self.conditions), ch_names=np.array(self.ch_names),
+            times=self.times, sfreq=self.sfreq, mean=mean, sem=sem,
+            n_subjects=np.array([self.n_subjects(name) for name in self.conditions]),
+            subjects=np.array(self.subjects), n_epochs=self.n_epochs())
+
+
+def load_erps(path):
+    """
+    save_subject()/GrandAverage.save()로 저장한 .npz를 읽습니다.
+
+    Returns:
+    --------
+    dict
+        문자열 배열은 list로, 나머지는 np.ndarray로 변환한 값
+    """
+    with np.load(path) as f:
+        out = {key: f[key] for key in f.files}
+    for key in ('conditions', 'ch_names', 'subjects'):
+        if key in out:
+            out[key] = out[key].tolist()
+    out['sfreq'] = float(out['sfreq'])
+    return out
+
+
+def to_evokeds(erps, montage='standard_1020'):
+    """load_erps() 결과를 조건별 mne.EvokedArray 목록으로 만듭니다 (플롯용)."""
+    info = mne.create_info(erps['ch_names'], erps['sfreq'], ch_types='eeg')
+    if montage:
+        info.set_montage(mne.channels.make_standard_montage(montage), match_case=False,
+                         on_missing='ignore')
+    counts = erps.get('n_subjects', erps.get('n_epochs'))
+    evokeds = []
+    for i, name in enumerate(erps['conditions']):
+        if counts[i] == 0:
+            continue
+        evokeds.append(mne.EvokedArray(erps['mean'][i].astype(np.float64), info,
+                                       tmin=float(erps['times'][0]), comment=name,
+                                       nave=int(counts[i]), verbose=False))
+    return evokeds
+
+
+def run_grand_average(recordings, output_dir, config, n_jobs=1, use_cache=True, log=print):
+    """
+    녹화 목록의 총평균을 계산해 output_dir에 저장합니다.
+
+    Parameters:
+    -----------
+    recordings : list of (str, str or None)
+        (녹화 경로, 이벤트 경로) 목록 (eeg_batch.find_recordings)
+    n_jobs : int
+        동시에 처리할 피험자 수 (워커 프로세스 수)
+
+    Returns:
+    --------
+    grand : GrandAverage
+    summary : dict
+        피험자별 상태 (grand_average.json 내용)
+    """
+    subject_dir = os.path.join(output_dir, SUBJECT_DIR)
+    os.makedirs(subject_dir, exist_ok=True)
+    grand = GrandAverage()
+    summary = {'config': config.to_dict(), 'subjects': {}}
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, n_jobs)) as pool:
+        futures = [pool.submit(subject_erps, f, ev, config, use_cache) for f, ev in recordings]
+        for future in as_completed(futures):
+            result = future.result()
+            stem = result['stem']
+            if result['status'] == 'ok':
+                # 피험자 파일을 먼저 쓰고, 저장에 성공한 피험자만 총평균에 더함
+                try:
+                    grand.check(result)
+                    save_subject(os.path.join(subject_dir, stem + '.npz'), result)
+                    grand.add(result)
+                except (ValueError, OSError) as e:
+                    result.update(status='error', error=str(e))
+            entry = {'status': result['status'], 'elapsed_sec': result['elapsed_sec']}
+            if result['status'] == 'ok':
+                entry.update(n_epochs=dict(zip(result['conditions'], map(int, result['n_epochs']))),
+                             n_rejected=result['n_rejected'], bads=result['bads'])
+            else:
+                entry['error'] = result['error']
+            summary['subjects'][stem] = entry
+            log(f"[{result['status']}] {stem} ({result['elapsed_sec']:.1f}초)"
+                + (f": {result['error']}" if result['status'] != 'ok' else ''))
+            # 피험자 결과는 저장했으므로 누적기 외에는 보관하지 않음
+            del result
+    if grand.subjects:
+        grand.save(os.path.join(output_dir, GROUP_FILE))
+        summary['conditions'] = {name: grand.n_subjects(name) for name in grand.conditions}
+    summary['elapsed_sec'] = round(time.time() - start, 3)
+    with open(os.path.join(output_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    return grand, summary
+
+
+def main(argv=None):
+    parser = add_pipeline_arguments(argparse.ArgumentParser(description='여러 피험자의 조건별 총평균 ERP'))
+    args = parser.parse_args(argv)
+    config = config_from_args(args)
+    recordings = find_recordings(args.input_dir, args.pattern, args.events_pattern)
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f'피험자 {len(recordings)}명 (프로세스 {args.jobs}개)')
+    grand, summary = run_grand_average(recordings, args.output_dir, config, args.jobs,
+                                       not args.no_cache)
+    n_failed = sum(entry['status'] != 'ok' for entry in summary['subjects'].values())
+    for name in grand.conditions:
+        print(f'{name}: 피험자 {grand.n_subjects(name)}명')
+    print(f'완료: 성공 {len(recordings) - n_failed}, 실패 {n_failed} '
+          f'({summary["elapsed_sec"]:.1f}초)')
+    return 1 if n_failed or not grand.subjects else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# eeg_history.py
+#
+# 처리 이력의 copy-on-write 버전 저장소.
+#
+# 녹화 데이터를 (채널 행 x 시간 블록) 격자로 나누고, 각 버전은 블록 배열에 대한
+# 참조 표로만 표현합니다. 새 버전은 부모의 참조 표를 복사해 시작하고, 실제로 값이
+# 바뀐 블록만 새 배열로 저장하므로 보간처럼 몇 채널만 바꾸는 단계는 그 채널 행만큼만
+# 메모리가 늘어납니다. 블록은 참조 수로 관리되어 부모 버전을 지워도 자식 버전이
+# 공유하는 블록은 남고, 어느 버전이든 블록을 이어 붙여 다시 만들 수 있습니다.
+
+from collections import OrderedDict
+import numpy as np
+
+
+# 시간 블록 길이 (샘플). 채널 행 하나의 블록은 float64 기준 512 KB
+BLOCK_SAMPLES = 2 ** 16
+# 블록 전체를 비교하기 전에 먼저 비교하는 표본 수 (대부분 값이 바뀌는 단계는 여기서 판정)
+SAMPLE_POINTS = 64
+BASE_VERSION = 'source'
+
+
+class VersionStore:
+    """
+    (채널, 샘플) 배열의 버전 저장소.
+
+    Parameters:
+    -----------
+    base : np.ndarray
+        기준 버전 데이터 (복사하지 않고 블록 view로 참조하며, 변경하지 않음)
+    block_samples : int
+        시간 블록 길이
+    base_key : str
+        기준 버전 키
+    """
+
+    def __init__(self, base, block_samples=BLOCK_SAMPLES, base_key=BASE_VERSION):
+        if base.ndim != 2:
+            raise ValueError('버전 저장소는 (채널, 샘플) 배열만 지원합니다.')
+        self.shape = base.shape
+        self.dtype = base.dtype
+        self.block_samples = int(block_samples)
+        self.base_key = base_key
+        self._edges = np.append(np.arange(0, self.shape[1], self.block_samples), self.shape[1])
+        n_blocks = max(len(self._edges) - 1, 0)
+        table = np.empty((self.shape[0], n_blocks), dtype=object)
+        for row in range(self.shape[0]):
+            for b in range(n_blocks):
+                block = base[row, self._edges[b]:self._edges[b + 1]].view()
+                block.flags.writeable = False
+                table[row, b] = block
+        self._versions = OrderedDict([(base_key, table)])  # 키 -> 블록 참조 표 (LRU 순서)
+        self._parents = {base_key: None}
+        # 기준 버전 밖 블록의 참조 수 (id -> [블록, 참조하는 버전 수])와 고유 블록 총 바이트
+        self._base_ids = {id(block) for block in table.flat}
+        self._refs = {}
+        self._nbytes = 0
+
+    def __contains__(self, key):
+        return key in self._versions
+
+    def __len__(self):
+        return len(self._versions)
+
+    def keys(self):
+        return list(self._versions)
+
+    def parent(self, key):
+        return self._parents.get(key)
+
+    def _table(self, key):
+        table = self._versions.get(key)
+        if table is None:
+            raise KeyError(f'저장소에 없는 버전: {key}')
+        self._versions.move_to_end(key)
+        return table
+
+    def _set_table(self, key, table, parent):
+        """버전 key의 참조 표를 table로 두고 블록 참조 수와 총 바이트를 갱신합니다."""
+        for block in table.flat:
+            if id(block) in self._base_ids:
+                continue
+            ref = self._refs.get(id(block))
+            if ref is None:
+                self._refs[id(block)] = [block, 1]
+                self._nbytes += block.nbytes
+            else:
+                ref[1] += 1
+        # 같은 키를 다시 저장하면 이전 표의 참조는 새 표를 센 뒤에 놓음 (공유 블록 유지)
+        old = self._versions.get(key)
+        if old is not None:
+            self._release(old)
+        self._versions[key] = table
+        self._versions.move_to_end(key)
+        self._parents[key] = parent
+
+    def _release(self, table):
+        for block in table.flat:
+            ref = self._refs.get(id(block))
+            if ref is None:
+                continue
+            ref[1] -= 1
+            if ref[1] == 0:
+                del self._refs[id(block)]
+                self._nbytes -= block.nbytes
+
+    def _block_equal(self, new, old):
+        """두 블록의 값이 같은지 (표본이 다르면 전체를 비교하지 않음)."""
+        step = max(1, len(new) // SAMPLE_POINTS)
+        if not np.array_equal(new[::step], old[::step]):
+            return False
+        return np.array_equal(new, old)
+
+    def commit(self, key, data, parent=None, copy=True):
+        """
+        data를 parent(기본: 기준 버전)에서 파생된 새 버전 key로 저장합니다.
+
+        parent와 값이 같은 블록은 참조만 공유하고, 다른 블록만 복사해 저장합니다
+        (NaN이 있는 블록은 바뀐 것으로 봅니다).
+        copy=False이고 모든 블록이 바뀌었으면 (필터처럼 전체를 바꾸는 단계) 복사하지 않고
+        data의 view를 저장하므로, 호출한 쪽은 이후 data를 바꾸지 않아야 합니다.
+
+        Returns:
+        --------
+        int
+            새로 저장한 블록의 바이트 수
+        """
+        if data.shape != self.shape:
+            raise ValueError(f'데이터 크기가 다릅니다: {data.shape} != {self.shape}')
+        parent = self.base_key if parent is None else parent
+        table = self._table(parent).copy()
+        changed = [(row, b) for b in range(table.shape[1]) for row in range(table.shape[0])
+                   if not self._block_equal(data[row, self._edges[b]:self._edges[b + 1]],
+                                            table[row, b])]
+        share = not copy and len(changed) == table.size and data.dtype == self.dtype
+        added = 0
+        for row, b in changed:
+            block = data[row, self._edges[b]:self._edges[b + 1]]
+            block = block.view() if share else np.array(block, dtype=self.dtype)
+            block.flags.writeable = False
+            table[row, b] = block
+            added += block.nbytes
+        self._set_table(key, table, parent)
+        return added
+
+    def commit_rows(self, key, rows, values, parent=None):
+        """
+        parent에서 rows 채널만 values로 바꾼 새 버전을 저장합니다 (비교 없이 행 단위 쓰기).
+
+        Parameters:
+        -----------
+        rows : list of int
+            바꿀 채널 행
+        values : np.ndarray
+            (len(rows), 샘플) 새 데이터
+        """
+        parent = self.base_key if parent is None else parent
+        table = self._table(parent).copy()
+        values = np.asarray(values, dtype=self.dtype)
+        added = 0
+        for i, row in enumerate(rows):
+            for b in range(table.shape[1]):
+                block = values[i, self._edges[b]:self._edges[b + 1]].copy()
+                block.flags.writeable = False
+                table[row, b] = block
+                added += block.nbytes
+        self._set_table(key, table, parent)
+        return added
+
+    def read(self, key, rows=None, start=0, stop=None):
+        """
+        버전 key의 일부 (rows 채널, start:stop 샘플)를 새 배열로 만듭니다.
+
+        필요한 블록만 복사하므로 몇 채널을 꺼낼 때 전체 버전을 만들지 않습니다.
+        """
+        table = self._table(key)
+        rows = np.arange(self.shape[0]) if rows is None else np.asarray(rows, dtype=int)
+        stop = self.shape[1] if stop is None else min(stop, self.shape[1])
+        start = max(start, 0)
+        out = np.empty((len(rows), max(stop - start, 0)), dtype=self.dtype)
+        if stop <= start:
+            return out
+        first = np.searchsorted(self._edges, start, side='right') - 1
+        last = np.searchsorted(self._edges, stop, side='left')
+        for b in range(first, last):
+            t0, t1 = self._edges[b], self._edges[b + 1]
+            lo, hi = max(t0, start), min(t1, stop)
+            for i, row in enumerate(rows):
+                out[i, lo - start:hi - start] = table[row, b][lo - t0:hi - t0]
+        return out
+
+    def materialize(self, key):
+        """버전 key 전체를 연속 배열로 만듭니다."""
+        return self.read(key)
+
+    def changed_rows(self, key, other=None):
+        """other(기본: 부모 버전)와 블록을 공유하지 않는 채널 행 번호."""
+        other = self._parents.get(key) if other is None else other
+        if other is None:
+            return np.arange(0)
+        a, b = self._table(key), self._table(other)
+        same = np.vectorize(lambda x, y: x is y, otypes=[bool])(a, b)
+        return np.flatnonzero(~same.all(axis=1))
+
+    def drop(self, key):
+        """버전을 지웁니다. 다른 버전이 공유하는 블록은 그 버전에 남습니다."""
+        if key == self.base_key:
+            raise ValueError('기준 버전은 지울 수 없습니다.')
+        table = self._versions.pop(key, None)
+        if table is not None:
+            self._release(table)
+        parent = self._parents.pop(key, None)
+        # 지운 버전의 자식은 지운 버전의 부모에서 파생된 것으로 기록
+        for child, p in self._parents.items():
+            if p == key:
+                self._parents[child] = parent
+
+    def nbytes(self):
+        """기준 버전 밖에 저장된 고유 블록의 총 바이트 수 (공유 블록은 한 번만 셈)."""
+        return self._nbytes
+
+    def evict(self, max_bytes, protect=()):
+        """
+        고유 블록 총량이 max_bytes 이하가 될 때까지 오래 사용하지 않은 버전부터 지웁니다.
+
+        Returns:
+        --------
+        list of str
+            지운 버전 키
+        """
+        protect = set(protect) | {self.base_key}
+        dropped = []
+        for key in list(self._versions):
+            if self._nbytes <= max_bytes:
+                break
+            if key in protect:
+                continue
+            self.drop(key)
+            dropped.append(key)
+        return dropped
@@ -0,0 +1,236 @@
+# eeg_ica.py
+#
+# ICA 피팅 옵션과 빠른 피팅 모드.
+#
+# 빠른 모드는 피팅용 복사본을 따로 만듭니다: 목표 샘플링 주파수로 다상 리샘플링하고
+# 고역 통과한 뒤, 짧은 구간으로 나눠 진폭이 튀는 구간을 버리고 남은 구간 중에서
+# 샘플 예산만큼 고르게 뽑습니다. 피팅된 분리 행렬은 채널 공간의 선형 변환이므로
+# 원래 샘플링 주파수의 데이터에 그대로 적용됩니다.
+
+import time
+from dataclasses import dataclass, asdict
+from fractions import Fraction
+import numpy as np
+from scipy.signal import resample_poly
+import mne
+from eeg_filters import design_fir, apply_fir, update_filter_info
+from eeg_parallel import run_blocks, channel_blocks
+from eeg_profiling import profiled
+
+try:
+    import picard  # noqa: F401
+except ImportError:  # 선택 의존성: 없으면 picard 방법을 제공하지 않음
+    picard = None
+
+
+# 방법 이름 -> (MNE 방법, 기본 fit_params, 허용 오차 파라미터 이름)
+ICA_METHODS = {
+    'fastica': ('fastica', {}, 'tol'),
+    'infomax': ('infomax', {'extended': True}, 'w_change'),
+    'picard': ('picard', {'ortho': False, 'extended': True}, 'tol'),
+}
+# 빠른 모드 기본값
+FAST_L_FREQ = 1.0
+FAST_SFREQ = 100.0
+SEGMENT_SECONDS = 1.0
+# 구간의 진폭 범위(peak-to-peak)가 채널 중앙값의 이 배수를 넘으면 아티팩트 구간으로 봄
+REJECT_PTP_FACTOR = 5.0
+# 샘플 예산을 지정하지 않으면 (컴포넌트 수)^2 x 이 값
+SAMPLES_PER_COMPONENT2 = 30
+FIT_CHANNEL_BLOCK = 16
+
+
+def available_methods():
+    """설치된 라이브러리로 사용할 수 있는 방법 이름."""
+    return [name for name in ICA_METHODS if name != 'picard' or picard is not None]
+
+
+@dataclass
+class IcaFitOptions:
+    """
+    ICA 피팅 옵션. 값이 같으면 같은 피팅이므로 캐시 키로 사용됩니다.
+
+    tol이 None이면 방법의 기본 허용 오차, max_samples가 None이면
+    (컴포넌트 수)^2 x SAMPLES_PER_COMPONENT2 를 샘플 예산으로 사용합니다.
+    """
+    method: str = 'fastica'
+    tol: float = None
+    fast: bool = False
+    max_samples: int = None
+    l_freq: float = FAST_L_FREQ
+    fit_sfreq: float = FAST_SFREQ
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls(**(params or {}))
+
+
+@dataclass
+class IcaFitSummary:
+    """피팅 결과 요약 (GUI/배치 로그 표시용)."""
+    method: str
+    fast: bool
+    n_samples: int
+    sfreq: float
+    n_segments: int = 0
+    n_rejected: int = 0
+    n_iter: int = None
+    prepare_sec: float = 0.0
+    fit_sec: float = 0.0
+
+    @property
+    def total_sec(self):
+        return self.prepare_sec + self.fit_sec
+
+    def to_dict(self):
+        return asdict(self)
+
+    def describe(self):
+        text = (f'{self.method}, 샘플 {self.n_samples}개 ({self.sfreq:g} Hz), '
+                f'피팅 {self.fit_sec:.2f}초')
+        if self.fast:
+            text += (f', 준비 {self.prepare_sec:.2f}초, 구간 {self.n_segments}개 중 '
+                     f'아티팩트 {self.n_rejected}개 제외')
+        if self.n_iter is not None:
+            text += f', 반복 {self.n_iter}회'
+        return text
+
+
+def _make_ica(n_components, random_state, options):
+    if options.method not in ICA_METHODS:
+        raise ValueError(f'알 수 없는 ICA 방법: {options.method}')
+    if options.method not in available_methods():
+        raise ValueError(f'{options.method} ICA를 사용하려면 python-picard를 설치해야 합니다.')
+    method, fit_params, tol_name = ICA_METHODS[options.method]
+    fit_params = dict(fit_params)
+    if options.tol is not None:
+        fit_params[tol_name] = options.tol
+    return mne.preprocessing.ICA(n_components=n_components, random_state=random_state,
+                                 method=method, fit_params=fit_params or None,
+                                 max_iter='auto')
+
+
+def select_segments(data, seg_len, max_segments, reject_factor=REJECT_PTP_FACTOR):
+    """
+    (채널, 샘플) 데이터를 seg_len 구간으로 나눠 피팅에 쓸 구간 번호를 고릅니다.
+
+    Returns:
+    --------
+    selected : np.ndarray
+        고른 구간 번호 (시간 순서)
+    n_segments : int
+        전체 구간 수
+    n_rejected : int
+        아티팩트로 제외한 구간 수
+    """
+    n_segments = data.shape[1] // seg_len
+    if n_segments == 0:
+        return np.arange(0), 0, 0
+    view = data[:, :n_segments * seg_len].reshape(data.shape[0], n_segments, seg_len)
+    ptp = view.max(axis=2) - view.min(axis=2)
+    limit = np.median(ptp, axis=1) * reject_factor
+    clean = np.flatnonzero(np.all(ptp <= limit[:, None], axis=0))
+    if len(clean) == 0:
+        clean = np.arange(n_segments)
+    n_rejected = n_segments - len(clean)
+    if len(clean) > max_segments:
+        # 녹화 전체에 고르게 퍼지도록 간격을 두고 선택
+        clean = clean[np.unique(np.linspace(0, len(clean) - 1, max(max_segments, 1)).round().astype(int))]
+    return clean, n_segments, n_rejected
+
+
+def prepare_fit_raw(raw, picks, n_components, options, n_jobs=1, progress=None):
+    """
+    빠른 모드의 피팅용 Raw(picks 채널만)를 만듭니다.
+
+    Returns:
+    --------
+    fit_raw : mne.io.RawArray
+        리샘플링/고역 통과/구간 선택을 마친 피팅 데이터
+    n_segments, n_rejected : int
+        전체 구간 수와 아티팩트로 제외한 구간 수
+    """
+    picks = np.asarray(picks)
+    sfreq = raw.info['sfreq']
+    data = raw._data
+    if options.fit_sfreq and sfreq > options.fit_sfreq:
+        ratio = Fraction(options.fit_sfreq / sfreq).limit_denominator(100)
+        up, down = ratio.numerator, ratio.denominator
+    else:
+        up, down = 1, 1
+    new_sfreq = sfreq * up / down
+    n_out = -(-data.shape[1] * up // down)
+    fit_data = np.empty((len(picks), n_out))
+    blocks = channel_blocks(np.arange(len(picks)), FIT_CHANNEL_BLOCK)
+
+    def resample_block(rows):
+        x = data[picks[rows]]
+        fit_data[rows] = resample_poly(x, up, down, axis=1) if up != down else x
+
+    run_blocks(resample_block, blocks, n_jobs, progress)
+    if options.l_freq:
+        apply_fir(fit_data, design_fir(new_sfreq, options.l_freq, None), n_jobs=n_jobs)
+
+    max_samples = options.max_samples or SAMPLES_PER_COMPONENT2 * (n_components or len(picks)) ** 2
+    seg_len = max(int(round(SEGMENT_SECONDS * new_sfreq)), 1)
+    selected, n_segments, n_rejected = select_segments(fit_data, seg_len, max_samples // seg_len)
+    if len(selected):
+        fit_data = fit_data[:, :n_segments * seg_len].reshape(
+            len(picks), n_segments, seg_len)[:, selected].reshape(len(picks), -1)
+
+    info = mne.pick_info(raw.info, picks)
+    with info._unlock():
+        info['sfreq'] = new_sfreq
+        info['lowpass'] = min(info['lowpass'] or new_sfreq / 2, new_sfreq / 2)
+    update_filter_info(info, options.l_freq or None, None)
+    return mne.io.RawArray(fit_data, info, verbose=False), n_segments, n_rejected
+
+
+@profiled()
+def fit_ica(raw, n_components, random_state=42, picks=None, options=None, n_jobs=1,
+            progress=None):
+    """
+    ICA를 피팅합니다.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        피팅할 데이터 (빠른 모드에서도 변경하지 않음)
+    n_components : int
+        컴포넌트 수
+    picks : list of int or None
+        피팅에 사용할 채널 (None이면 불량 채널을 뺀 EEG 채널)
+    options : IcaFitOptions or None
+        None이면 전체 데이터, FastICA, 기본 허용 오차
+    n_jobs : int
+        빠른 모드의 리샘플링/필터 스레드 수
+
+    Returns:
+    --------
+    ica : mne.preprocessing.ICA
+    summary : IcaFitSummary
+    """
+    options = options or IcaFitOptions()
+    ica = _make_ica(n_components, random_state, options)
+    if picks is None:
+        picks = mne.pick_types(raw.info, eeg=True, exclude='bads')
+    start = time.perf_counter()
+    if options.fast:
+        fit_raw, n_segments, n_rejected = prepare_fit_raw(raw, picks, n_components, options,
+                                                          n_jobs, progress)
+        fit_picks = None
+    else:
+        fit_raw, n_segments, n_rejected = raw, 0, 0
+        fit_picks = picks
+    prepare_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    ica.fit(fit_raw, picks=fit_picks)
+    fit_sec = time.perf_counter() - start
+    summary = IcaFitSummary(
+        method=options.method, fast=options.fast, n_samples=int(ica.n_samples_),
+        sfreq=fit_raw.info['sfreq'], n_segments=n_segments, n_rejected=n_rejected,
+        n_iter=getattr(ica, 'n_iter_', None), prepare_sec=prepare_sec, fit_sec=fit_sec)
+    return ica, summary
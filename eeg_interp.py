@@ -0,0 +1,153 @@
+# eeg_interp.py
+#
+# 불량 채널 보간 행렬 캐시.
+#
+# 보간은 (불량 채널) = M @ (정상 채널) 형태의 선형 연산이고, M은 전극 위치와
+# 불량 채널 집합, 방법에만 의존합니다. M을 (위치, 불량 집합, 방법)으로 캐시하여
+# 같은 캡 배치의 녹화나 같은 불량 집합의 재실행에서는 행렬을 다시 계산하지 않고,
+# 적용은 시간 청크 단위 행렬 곱으로 불량 채널 행만 씁니다.
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.spatial import Delaunay
+import mne
+from mne.channels.interpolation import _make_interpolation_matrix
+from eeg_parallel import blas_threads
+
+
+INTERP_METHODS = ('spline', 'nearest', 'linear')
+# 캐시할 보간 행렬 수
+MAX_CACHED_MATRICES = 64
+# 한 번에 곱하는 샘플 수
+INTERP_CHUNK = 2 ** 16
+# 위치 비교 정밀도 (m, 0.1 mm 단위로 같으면 같은 배치)
+POSITION_DECIMALS = 4
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def head_origin(info):
+    """MNE interpolate_bads(origin='auto')와 같은 머리 중심 (디지타이즈 점의 구 피팅)."""
+    return np.asarray(mne.bem.fit_sphere_to_headshape(info, units='m', verbose=False)[1])
+
+
+def _unit(pos):
+    return pos / np.linalg.norm(pos, axis=1, keepdims=True)
+
+
+def _project(pos):
+    # 단위 구 위치를 정수리 기준 방위 등거리 도법으로 평면에 투영
+    theta = np.arccos(np.clip(pos[:, 2], -1.0, 1.0))
+    phi = np.arctan2(pos[:, 1], pos[:, 0])
+    return np.column_stack([theta * np.cos(phi), theta * np.sin(phi)])
+
+
+def _nearest_matrix(pos_good, pos_bad):
+    matrix = np.zeros((len(pos_bad), len(pos_good)))
+    nearest = np.argmax(_unit(pos_bad) @ _unit(pos_good).T, axis=1)
+    matrix[np.arange(len(pos_bad)), nearest] = 1.0
+    return matrix
+
+
+def _linear_matrix(pos_good, pos_bad):
+    """평면 투영한 정상 전극의 삼각분할 안에서 무게중심 좌표로 선형 보간 (밖이면 가장 가까운 전극)."""
+    matrix = _nearest_matrix(pos_good, pos_bad)
+    if len(pos_good) < 3:
+        return matrix
+    good_2d = _project(_unit(pos_good))
+    bad_2d = _project(_unit(pos_bad))
+    tri = Delaunay(good_2d)
+    simplex = tri.find_simplex(bad_2d)
+    for i in np.flatnonzero(simplex >= 0):
+        transform = tri.transform[simplex[i]]
+        bary = transform[:2] @ (bad_2d[i] - transform[2])
+        weights = np.append(bary, 1.0 - bary.sum())
+        matrix[i] = 0.0
+        matrix[i, tri.simplices[simplex[i]]] = weights
+    return matrix
+
+
+def interpolation_matrix(info, bads, method='spline'):
+    """
+    불량 채널 보간 행렬을 반환합니다 (캐시됨).
+
+    Parameters:
+    -----------
+    info : mne.Info
+        전극 위치가 설정된 info
+    bads : list of str
+        보간할 채널
+    method : str
+        'spline' (구면 스플라인, MNE와 같은 행렬), 'nearest', 'linear'
+
+    Returns:
+    --------
+    good_idx : np.ndarray
+        입력으로 쓰는 정상 EEG 채널 번호
+    bad_idx : np.ndarray
+        보간할 채널 번호
+    matrix : np.ndarray
+        (불량 채널 수, 정상 채널 수) 읽기 전용 행렬
+    """
+    if method not in INTERP_METHODS:
+        raise ValueError(f'알 수 없는 보간 방법: {method}')
+    picks = mne.pick_types(info, meg=False, eeg=True, exclude=[])
+    names = [info['ch_names'][p] for p in picks]
+    is_bad = np.isin(names, list(bads))
+    good_idx = picks[~is_bad]
+    bad_idx = picks[is_bad]
+    if len(bad_idx) == 0:
+        return good_idx, bad_idx, np.zeros((0, len(good_idx)))
+    if len(good_idx) == 0:
+        raise ValueError('보간에 사용할 정상 채널이 없습니다.')
+    pos = np.array([info['chs'][p]['loc'][:3] for p in picks])
+    missing = [name for name, p in zip(names, pos) if not np.all(np.isfinite(p)) or not p.any()]
+    if missing:
+        raise ValueError(f'전극 위치가 없는 채널: {", ".join(missing)}')
+    origin = head_origin(info)
+    key = (method, np.round(pos, POSITION_DECIMALS).tobytes(),
+           np.round(origin, POSITION_DECIMALS).tobytes(), is_bad.tobytes())
+    with _cache_lock:
+        matrix = _cache.get(key)
+        if matrix is not None:
+            _cache.move_to_end(key)
+            return good_idx, bad_idx, matrix
+    pos_good = pos[~is_bad] - origin
+    pos_bad = pos[is_bad] - origin
+    if method == 'spline':
+        matrix = _make_interpolation_matrix(pos_good, pos_bad)
+    elif method == 'nearest':
+        matrix = _nearest_matrix(pos_good, pos_bad)
+    else:
+        matrix = _linear_matrix(pos_good, pos_bad)
+    matrix.setflags(write=False)
+    with _cache_lock:
+        _cache[key] = matrix
+        while len(_cache) > MAX_CACHED_MATRICES:
+            _cache.popitem(last=False)
+    return good_idx, bad_idx, matrix
+
+
+def interpolate_bads(raw, bads, method='spline', n_jobs=None, chunk=INTERP_CHUNK):
+    """
+    raw의 불량 채널을 제자리에서 보간합니다. info['bads']는 바꾸지 않습니다.
+
+    정상 채널 전체를 복사하지 않도록 시간 청크마다 (불량 x 정상) 행렬 곱을 하며,
+    행렬 곱은 n_jobs개의 BLAS 스레드를 사용합니다.
+    """
+    good_idx, bad_idx, matrix = interpolation_matrix(raw.info, bads, method)
+    if len(bad_idx) == 0:
+        return raw
+    data = raw._data
+    with blas_threads(n_jobs):
+        for t0 in range(0, data.shape[1], chunk):
+            t1 = min(t0 + chunk, data.shape[1])
+            data[bad_idx, t0:t1] = matrix @ data[good_idx, t0:t1]
+    return raw
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
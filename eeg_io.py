@@ -0,0 +1,134 @@
+# eeg_io.py
+
+import atexit
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+# 한 번에 파싱할 청크 크기 (바이트 기준). 채널 수에 맞춰 행 수로 환산된다.
+CHUNK_BYTES = 64 * 1024 * 1024
+# 행 수를 세기 위해 읽는 블록 크기
+_COUNT_BLOCK = 16 * 1024 * 1024
+
+_temp_files = []
+
+
+def _cleanup_temp_files():
+    for path in _temp_files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+atexit.register(_cleanup_temp_files)
+
+
+def read_csv_header(file_name):
+    """CSV 파일의 헤더(채널 이름)만 읽습니다."""
+    return [str(c) for c in pd.read_csv(file_name, nrows=0).columns]
+
+
+def count_csv_rows(file_name):
+    """
+    헤더를 제외한 CSV 데이터 행 수를 셉니다.
+
+    파일을 파싱하지 않고 바이트 블록 단위로 줄바꿈만 세므로
+    전체 파싱보다 훨씬 빠르고 메모리를 거의 쓰지 않습니다.
+    """
+    n_lines = 0
+    last = b'\n'
+    with open(file_name, 'rb') as f:
+        while True:
+            block = f.read(_COUNT_BLOCK)
+            if not block:
+                break
+            n_lines += block.count(b'\n')
+            last = block[-1:]
+    # 마지막 줄에 줄바꿈이 없는 경우
+    if last != b'\n':
+        n_lines += 1
+    return max(n_lines - 1, 0)
+
+
+def _create_memmap(shape, dtype, out_path):
+    if out_path is not None:
+        return np.memmap(out_path, dtype=dtype, mode='w+', shape=shape)
+    fd, path = tempfile.mkstemp(prefix='eeg_', suffix='.dat')
+    os.close(fd)
+    data = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    # POSIX에서는 매핑이 살아있는 동안 파일을 미리 지워도 된다.
+    # Windows처럼 지울 수 없는 경우 종료 시 삭제한다.
+    try:
+        os.remove(path)
+    except OSError:
+        _temp_files.append(path)
+    return data
+
+
+def read_csv_to_memmap(file_name, dtype=np.float64, chunk_rows=None, out_path=None,
+                       progress=None):
+    """
+    CSV EEG 데이터를 청크 단위로 파싱해 채널 우선 memmap 버퍼에 저장합니다.
+
+    Parameters:
+    -----------
+    file_name : str
+        CSV 파일 경로 (첫 줄은 채널 이름)
+    dtype : numpy dtype
+        버퍼 자료형 (MNE Raw는 float64를 사용)
+    chunk_rows : int or None
+        한 번에 파싱할 행 수. None이면 CHUNK_BYTES에 맞춰 자동 결정
+    out_path : str or None
+        버퍼 파일 경로. None이면 임시 파일을 사용
+    progress : callable or None
+        청크마다 progress(비율)로 호출됨. 예외를 발생시키면 로드가 중단됨
+
+    Returns:
+    --------
+    data : np.memmap
+        (채널 수, 샘플 수) 형태의 디스크 기반 버퍼
+    ch_names : list of str
+        채널 이름
+    """
+    ch_names = read_csv_header(file_name)
+    if not ch_names:
+        raise ValueError("CSV 파일에 채널 이름이 없습니다.")
+    n_channels = len(ch_names)
+    n_rows = count_csv_rows(file_name)
+    if n_rows == 0:
+        raise ValueError("CSV 파일에 데이터가 없습니다.")
+    if chunk_rows is None:
+        chunk_rows = max(1000, CHUNK_BYTES // (n_channels * np.dtype(dtype).itemsize))
+
+    data = _create_memmap((n_channels, n_rows), dtype, out_path)
+    pos = 0
+    reader = pd.read_csv(file_name, chunksize=chunk_rows, dtype=dtype)
+    for chunk in reader:
+        values = chunk.to_numpy(dtype=dtype, copy=False)
+        if values.shape[1] != n_channels:
+            raise ValueError(f"채널 수({n_channels})가 데이터 열 수({values.shape[1]})와 일치하지 않습니다.")
+        n = len(values)
+        if pos + n > n_rows:
+            raise ValueError("CSV 행 수를 확인하는 중 오류가 발생했습니다.")
+        data[:, pos:pos + n] = values.T
+        pos += n
+        if progress is not None:
+            progress(pos / n_rows)
+
+    if pos < n_rows:
+        # 빈 줄이 섞여 있어 실제 행 수가 더 적은 경우 앞쪽으로 채워 다시 매핑
+        data = _compact_memmap(data, pos)
+    data.flush()
+    return data, ch_names
+
+
+def _compact_memmap(data, n_samples):
+    n_channels = data.shape[0]
+    flat = data.reshape(-1)
+    # 앞쪽 채널부터 옮기므로 아직 읽지 않은 영역을 덮어쓰지 않는다.
+    for ch in range(1, n_channels):
+        flat[ch * n_samples:(ch + 1) * n_samples] = data[ch, :n_samples]
+    return flat[:n_channels * n_samples].reshape(n_channels, n_samples)
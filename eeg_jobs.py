@@ -0,0 +1,179 @@
+# eeg_jobs.py
+
+import threading
+import traceback
+from collections import deque
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from eeg_profiling import stage
+
+
+class JobCancelled(Exception):
+    """작업이 사용자에 의해 취소되었을 때 발생합니다."""
+
+
+class JobContext:
+    """
+    작업 함수에 전달되는 진행/취소 핸들.
+
+    작업 함수는 청크(채널 블록, CSV 청크 등)를 처리할 때마다 progress()를
+    호출합니다. 취소 요청이 있으면 그 시점에서 JobCancelled가 발생합니다.
+    """
+
+    def __init__(self, job):
+        self._job = job
+        self._cancel = threading.Event()
+        self._last_percent = -1
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, fraction, message=''):
+        self.check_cancelled()
+        percent = int(max(0.0, min(1.0, fraction)) * 100)
+        if percent != self._last_percent or message:
+            self._last_percent = percent
+            self._job.signals.progress.emit(self._job, percent, message)
+
+
+class _JobSignals(QObject):
+    progress = pyqtSignal(object, int, str)
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+    cancelled = pyqtSignal(object)
+
+
+class Job(QRunnable):
+    def __init__(self, name, fn, on_done=None, on_error=None, internal=False):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+        # 내부 작업(표시용 등)은 실패해도 뒤에 대기 중인 처리 단계를 버리지 않음
+        self.internal = internal
+        self.signals = _JobSignals()
+        self.context = JobContext(self)
+
+    def run(self):
+        try:
+            self.context.check_cancelled()
+            with stage(self.name, 'job'):
+                result = self.fn(self.context)
+        except JobCancelled:
+            self.signals.cancelled.emit(self)
+        except Exception as e:
+            self.signals.failed.emit(self, e)
+        else:
+            self.signals.finished.emit(self, result)
+
+
+class JobQueue(QObject):
+    """
+    처리 단계를 GUI 스레드 밖에서 하나씩 순서대로 실행하는 작업 큐.
+
+    작업 함수(fn(ctx))는 워커 스레드에서 실행되고, on_done/on_error 콜백은
+    GUI 스레드에서 호출됩니다. 다음 작업은 이전 작업의 on_done이 끝난 뒤에
+    시작되므로, 대기 중인 단계는 항상 이전 단계의 결과를 보게 됩니다.
+    작업 함수나 on_done이 실패하면 대기 중인 작업은 취소됩니다 (internal 작업 제외).
+    """
+
+    progress = pyqtSignal(str, int, str)   # 작업 이름, 퍼센트, 메시지
+    started = pyqtSignal(str)
+    finished = pyqtSignal(str)
+    cancelled = pyqtSignal(str)
+    idle = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._pending = deque()
+        self._current = None
+
+    def submit(self, name, fn, on_done=None, on_error=None, internal=False):
+        job = Job(name, fn, on_done, on_error, internal)
+        # 큐(GUI 스레드 객체)의 메서드에 연결하여 콜백이 GUI 스레드에서 실행되도록 함
+        job.signals.progress.connect(self._on_progress)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.cancelled.connect(self._on_cancelled)
+        self._pending.append(job)
+        self._start_next()
+        return job
+
+    def is_busy(self):
+        return self._current is not None or bool(self._pending)
+
+    def pending_names(self):
+        return [job.name for job in self._pending]
+
+    def cancel_current(self):
+        if self._current is not None:
+            self._current.context.cancel()
+
+    def cancel_all(self):
+        """대기 중인 작업을 비우고 실행 중인 작업에 취소를 요청합니다."""
+        dropped = [job.name for job in self._pending]
+        self._pending.clear()
+        self.cancel_current()
+        return dropped
+
+    def wait_for_done(self, msecs=-1):
+        return self._pool.waitForDone(msecs)
+
+    def _start_next(self):
+        if self._current is not None:
+            return
+        if not self._pending:
+            self.idle.emit()
+            return
+        self._current = self._pending.popleft()
+        self.started.emit(self._current.name)
+        self._pool.start(self._current)
+
+    def _on_progress(self, job, percent, message):
+        self.progress.emit(job.name, percent, message)
+
+    def _on_finished(self, job, result):
+        try:
+            if job.on_done is not None:
+                job.on_done(result)
+        except Exception as e:
+            # 결과 적용이 중간에 실패하면 작업 함수가 실패한 것과 같이 처리
+            self._on_failed(job, e)
+            return
+        try:
+            self.finished.emit(job.name)
+        finally:
+            self._current = None
+            self._start_next()
+
+    def _on_failed(self, job, error):
+        # 실패한 단계의 결과에 의존하는 대기 작업은 실행하지 않는다.
+        dropped = []
+        if not job.internal:
+            dropped = [j.name for j in self._pending]
+            self._pending.clear()
+        try:
+            if job.on_error is not None:
+                job.on_error(error)
+            else:
+                traceback.print_exception(type(error), error, error.__traceback__)
+        finally:
+            self._current = None
+            for name in dropped:
+                self.cancelled.emit(name)
+            self._start_next()
+
+    def _on_cancelled(self, job):
+        self._current = None
+        self.cancelled.emit(job.name)
+        self._start_next()
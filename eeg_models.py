@@ -0,0 +1,157 @@
+# eeg_models.py
+
+from contextlib import contextmanager
+import numpy as np
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, QAbstractTableModel, QModelIndex
+
+
+class BadChannelModel(QObject):
+    """
+    불량 채널 상태를 한 곳에서 관리하는 모델.
+
+    상태가 바뀌면 바뀐 채널 이름 목록을 changed 시그널로 한 번에 알립니다.
+    batch() 블록 안에서의 변경은 블록이 끝날 때 하나의 알림으로 합쳐집니다.
+    """
+
+    changed = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._ch_names = []
+        self._index = {}
+        self._bads = set()
+        self._batch_depth = 0
+        self._pending = []
+
+    def set_channels(self, ch_names, bads=()):
+        """채널 목록을 바꾸고 불량 상태를 초기화합니다. 모든 채널이 바뀐 것으로 알립니다."""
+        self._ch_names = list(ch_names)
+        self._index = {ch: i for i, ch in enumerate(self._ch_names)}
+        self._bads = {ch for ch in bads if ch in self._index}
+        self._pending = []
+        self.changed.emit(list(self._ch_names))
+
+    def channels(self):
+        return list(self._ch_names)
+
+    def index(self, ch_name):
+        return self._index.get(ch_name, -1)
+
+    def has_channel(self, ch_name):
+        return ch_name in self._index
+
+    def bads(self):
+        """불량 채널 이름 (채널 순서대로)"""
+        return [ch for ch in self._ch_names if ch in self._bads]
+
+    def is_bad(self, ch_name):
+        return ch_name in self._bads
+
+    def set_bad(self, ch_name, bad=True):
+        if ch_name not in self._index or (ch_name in self._bads) == bool(bad):
+            return
+        if bad:
+            self._bads.add(ch_name)
+        else:
+            self._bads.discard(ch_name)
+        self._mark(ch_name)
+
+    def toggle(self, ch_name):
+        self.set_bad(ch_name, not self.is_bad(ch_name))
+
+    def set_bads(self, bads):
+        """불량 채널 집합을 통째로 바꿉니다. 실제로 상태가 바뀐 채널만 알립니다."""
+        bads = set(bads)
+        with self.batch():
+            for ch in self._ch_names:
+                self.set_bad(ch, ch in bads)
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush()
+
+    def _mark(self, ch_name):
+        if ch_name not in self._pending:
+            self._pending.append(ch_name)
+        if self._batch_depth == 0:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            changed, self._pending = self._pending, []
+            self.changed.emit(changed)
+
+
+class ArrayTableModel(QAbstractTableModel):
+    """
+    2차원 NumPy 배열(또는 memmap)을 그대로 보여주는 읽기 전용 테이블 모델.
+
+    셀 항목을 미리 만들지 않고, 뷰가 화면에 보이는 셀을 요청할 때만
+    값을 읽어 문자열로 만듭니다. 따라서 녹화 전체(채널 x 샘플)나
+    수십만 개의 이벤트도 바로 표시하고 스크롤할 수 있습니다.
+
+    Parameters:
+    -----------
+    data : np.ndarray or None
+        (행, 열) 배열
+    row_labels, col_labels : sequence or None
+        행/열 머리글. None이면 0부터 시작하는 번호
+    fmt : callable
+        셀 값을 문자열로 바꾸는 함수
+    """
+
+    def __init__(self, data=None, row_labels=None, col_labels=None, fmt=str, parent=None):
+        super().__init__(parent)
+        self._data = np.empty((0, 0))
+        self._row_labels = None
+        self._col_labels = None
+        self._fmt = fmt
+        if data is not None:
+            self.set_array(data, row_labels, col_labels)
+
+    def set_array(self, data, row_labels=None, col_labels=None, fmt=None):
+        """표시할 배열을 교체합니다. 배열은 복사하지 않습니다."""
+        if data.ndim != 2:
+            raise ValueError('2차원 배열만 표시할 수 있습니다.')
+        self.beginResetModel()
+        self._data = data
+        self._row_labels = list(row_labels) if row_labels is not None else None
+        self._col_labels = list(col_labels) if col_labels is not None else None
+        if fmt is not None:
+            self._fmt = fmt
+        self.endResetModel()
+
+    def clear(self):
+        self.set_array(np.empty((0, 0)))
+
+    def array(self):
+        return self._data
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._data.shape[0]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._data.shape[1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._fmt(self._data[index.row(), index.column()])
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        labels = self._col_labels if orientation == Qt.Horizontal else self._row_labels
+        if labels is not None and section < len(labels):
+            return str(labels[section])
+        return str(section)
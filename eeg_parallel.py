@@ -0,0 +1,76 @@
+# eeg_parallel.py
+#
+# 채널 블록 단위 병렬 실행 도우미.
+#
+# 작업은 스레드 풀에서 실행되며 각 작업은 공유 버퍼(raw._data 등)의 서로 다른 행에
+# 결과를 직접 씁니다. 데이터를 프로세스 사이에서 피클링하지 않으며, FFT/BLAS가
+# GIL을 놓고 계산하므로 스레드 수만큼 코어를 사용합니다.
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # 선택 의존성: 없으면 BLAS 스레드 수를 조절하지 않음
+    threadpool_limits = None
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def resolve_n_jobs(n_jobs):
+    """n_jobs를 실제 스레드 수로 바꿉니다. None/0은 1, 음수는 (코어 수 + 1 + n_jobs)."""
+    if not n_jobs:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count() + 1 + n_jobs)
+    return int(n_jobs)
+
+
+def channel_blocks(picks, block_size):
+    return [picks[i:i + block_size] for i in range(0, len(picks), block_size)]
+
+
+def run_blocks(fn, items, n_jobs=1, progress=None):
+    """
+    items의 각 항목에 fn(항목)을 실행하고 결과를 같은 순서로 반환합니다.
+
+    progress는 호출한 스레드에서 항목이 끝날 때마다 호출되므로, 진행률 콜백이
+    예외(예: 작업 취소)를 발생시키면 아직 시작하지 않은 항목은 취소됩니다.
+    """
+    items = list(items)
+    n_jobs = min(resolve_n_jobs(n_jobs), max(1, len(items)))
+    results = [None] * len(items)
+    if n_jobs == 1:
+        for i, item in enumerate(items):
+            results[i] = fn(item)
+            if progress is not None:
+                progress((i + 1) / len(items))
+        return results
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+        try:
+            for n_done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(n_done / len(items))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+@contextmanager
+def blas_threads(n_jobs):
+    """
+    블록 안의 BLAS 연산(보간 행렬 곱 등)이 사용할 스레드 수를 n_jobs로 제한합니다.
+    n_jobs가 None이면 라이브러리 기본값을 그대로 사용합니다.
+    """
+    if n_jobs is None or threadpool_limits is None:
+        yield
+        return
+    with threadpool_limits(limits=resolve_n_jobs(n_jobs), user_api='blas'):
+        yield
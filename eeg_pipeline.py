@@ -0,0 +1,363 @@
+# eeg_pipeline.py
+#
+# Qt에 의존하지 않는 EEG 처리 파이프라인.
+# GUI(eeg_analyzer_gui.py)와 배치 CLI(eeg_batch.py)가 같은 함수를 사용합니다.
+#
+# 오래 걸리는 함수는 progress 인자를 받습니다. 처리 단위(채널 블록, CSV 청크)마다
+# progress(비율)로 호출되며, 콜백이 예외를 발생시키면 처리가 중단됩니다.
+
+from dataclasses import dataclass, field, asdict
+from fractions import Fraction
+import numpy as np
+from scipy.signal import resample_poly
+import pandas as pd
+import mne
+from eeg_cache import load_csv_cached
+from eeg_io import read_csv_to_memmap
+from eeg_quality import ChannelStats, QUALITY_METHODS
+from eeg_psd import compute_psd, SPECTRAL_METHODS
+from eeg_filters import FUSED_PHASES, design_fir, apply_fir, update_filter_info
+from eeg_parallel import run_blocks, channel_blocks
+import eeg_ica
+from eeg_ica import IcaFitOptions
+from eeg_epochs import EpochIndex
+from eeg_reject import reject_epochs
+from eeg_interp import interpolate_bads
+from eeg_profiling import profiled
+
+
+# 필터를 나눠 적용할 채널 블록 크기 (취소/진행률 보고 단위)
+FILTER_CHANNEL_BLOCK = 16
+BAD_CHANNEL_METHODS = QUALITY_METHODS + SPECTRAL_METHODS
+
+
+@dataclass
+class PipelineConfig:
+    """파이프라인 파라미터. 기본값은 GUI 기본값과 같습니다."""
+    sfreq: float = 256.0
+    montage: str = 'standard_1020'
+    l_freq: float = 1.0
+    h_freq: float = 40.0
+    notch_freq: float = None
+    resample_sfreq: float = None
+    bad_method: str = None
+    bad_threshold: float = None
+    bads: list = field(default_factory=list)
+    interpolate_method: str = 'spline'
+    reference: object = 'average'
+    ica_n_components: int = None
+    ica_exclude: list = field(default_factory=list)
+    ica_method: str = 'fastica'
+    ica_tol: float = None
+    ica_fast: bool = False
+    ica_max_samples: int = None
+    tmin: float = -0.2
+    tmax: float = 0.8
+    baseline: tuple = (-0.2, 0.0)
+    # 에포크 거부: 최대 peak-to-peak (V, 'auto'면 채널별 교차 검증 탐색)와 최소 peak-to-peak (V)
+    reject: object = None
+    flat: float = None
+    # 채널 블록 병렬 처리 스레드 수 (결과에 영향이 없으므로 설정 해시에서 제외)
+    n_jobs: int = 1
+
+    def to_dict(self):
+        return asdict(self)
+
+    def ica_options(self):
+        return IcaFitOptions(method=self.ica_method, tol=self.ica_tol, fast=self.ica_fast,
+                             max_samples=self.ica_max_samples)
+
+
+def scaled_progress(progress, start, stop):
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + (stop - start) * fraction)
+
+
+@profiled()
+def make_raw(data, ch_names, sfreq, montage='standard_1020'):
+    """(채널, 샘플) 버퍼로 RawArray를 만듭니다. float64 버퍼는 복사하지 않습니다."""
+    ch_names = list(ch_names)
+    if not ch_names:
+        raise ValueError("CSV 파일에 채널 이름이 없습니다.")
+    if len(ch_names) != data.shape[0]:
+        raise ValueError(f"채널 수({len(ch_names)})가 데이터 채널 수({data.shape[0]})와 일치하지 않습니다.")
+    info = mne.create_info(ch_names=ch_names, sfreq=sfreq, ch_types='eeg')
+    raw = mne.io.RawArray(data, info)
+    if montage:
+        # 표준 몽타주 적용 (채널명이 표준과 맞는 경우)
+        raw.set_montage(mne.channels.make_standard_montage(montage), match_case=False)
+    return raw
+
+
+@profiled()
+def load_recording(file_name, use_cache=True, progress=None):
+    """CSV 녹화를 (data, ch_names)로 불러옵니다."""
+    if use_cache:
+        return load_csv_cached(file_name, progress=progress)
+    return read_csv_to_memmap(file_name, progress=progress)
+
+
+@profiled()
+def filter_raw(raw, l_freq, h_freq, notch_freq=None, copy=True, progress=None,
+               fir_window='hamming', phase='zero', n_jobs=1):
+    """
+    대역 통과(및 노치) 필터를 채널 블록 단위로 적용합니다.
+
+    copy=True이면 원본을 유지하고 필터링된 복사본을 반환합니다.
+    l_freq와 h_freq가 모두 None이면 대역 통과 없이 노치만 적용하고,
+    notch_freq는 주파수 하나 또는 목록을 받습니다.
+    영위상 필터는 대역 통과와 모든 노치를 하나의 커널로 합성하여
+    데이터를 한 번만 순회합니다 (eeg_filters). 채널 블록은 n_jobs개의 스레드에서
+    raw 버퍼에 직접 쓰며 병렬로 처리됩니다.
+    """
+    if copy:
+        raw = raw.copy()
+    picks = mne.pick_types(raw.info, eeg=True)
+    if phase in FUSED_PHASES:
+        kernel = design_fir(raw.info['sfreq'], l_freq, h_freq, notch_freq, fir_window, phase)
+        apply_fir(raw._data, kernel, picks, phase=phase, block=FILTER_CHANNEL_BLOCK,
+                  progress=progress, n_jobs=n_jobs)
+        update_filter_info(raw.info, l_freq, h_freq)
+        return raw
+
+    blocks = [picks[i:i + FILTER_CHANNEL_BLOCK]
+              for i in range(0, len(picks), FILTER_CHANNEL_BLOCK)]
+    do_band = l_freq is not None or h_freq is not None
+    passes = int(do_band) + int(notch_freq is not None)
+    n_steps = max(1, len(blocks) * passes)
+    step = 0
+    if do_band:
+        for block in blocks:
+            raw.filter(l_freq=l_freq, h_freq=h_freq, picks=block,
+                       fir_window=fir_window, phase=phase, n_jobs=n_jobs)
+            step += 1
+            if progress is not None:
+                progress(step / n_steps)
+    if notch_freq is not None:
+        for block in blocks:
+            raw.notch_filter(freqs=notch_freq, picks=block, fir_window=fir_window, phase=phase,
+                             n_jobs=n_jobs)
+            step += 1
+            if progress is not None:
+                progress(step / n_steps)
+    return raw
+
+
+@profiled()
+def resample_raw(raw, sfreq, n_jobs=1, progress=None):
+    """
+    다상(polyphase) 필터로 새 샘플링 주파수의 Raw를 만듭니다.
+
+    채널 블록을 n_jobs개의 스레드에서 처리하여 미리 할당한 출력 버퍼에 직접 씁니다.
+    """
+    old_sfreq = raw.info['sfreq']
+    ratio = Fraction(float(sfreq) / old_sfreq).limit_denominator(1000)
+    up, down = ratio.numerator, ratio.denominator
+    data = raw._data
+    n_out = -(-data.shape[1] * up // down)
+    out = np.empty((data.shape[0], n_out))
+
+    def resample_block(rows):
+        out[rows] = resample_poly(data[rows], up, down, axis=1)
+
+    blocks = channel_blocks(np.arange(data.shape[0]), FILTER_CHANNEL_BLOCK)
+    run_blocks(resample_block, blocks, n_jobs, progress)
+    info = raw.info.copy()
+    new_sfreq = old_sfreq * up / down
+    with info._unlock():
+        info['sfreq'] = new_sfreq
+        if info['lowpass'] is None or info['lowpass'] > new_sfreq / 2:
+            info['lowpass'] = new_sfreq / 2
+    resampled = mne.io.RawArray(out, info, verbose=False)
+    resampled.set_annotations(raw.annotations)
+    return resampled
+
+
+@profiled()
+def compute_channel_stats(raw, progress=None):
+    """채널 품질 통계를 한 번의 청크 순회로 계산합니다 (eeg_quality.ChannelStats)."""
+    return ChannelStats.from_raw(raw, progress=progress)
+
+
+@profiled()
+def detect_bad_channels(raw, method, threshold=None, stats=None, spectrum=None):
+    """
+    자동 불량 채널 탐지.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+    method : str
+        'mean_square' - 평균 제곱이 평균 + 2 표준편차를 넘는 채널
+        'flat'        - 표준편차가 평균 표준편차의 10% 미만인 채널
+        'outlier'     - 3시그마 밖 샘플 비율이 10%를 넘는 채널
+        'robust'      - 사분위 범위가 다른 채널들과 크게 다른 채널
+        'high_freq'   - 고주파(20-100 Hz) 파워 비율이 다른 채널들보다 큰 채널
+        'line_noise'  - 전원 주파수(50/60 Hz) 파워가 주변 대비 다른 채널들보다 큰 채널
+    threshold : float or None
+        기준별 임계값 (None이면 위의 기본값)
+    stats : ChannelStats or None
+        이미 계산한 통계. 주면 데이터를 다시 읽지 않음
+    spectrum : eeg_psd.Spectrum or None
+        이미 계산한 스펙트럼 (스펙트럼 기준에서 사용)
+
+    Returns:
+    --------
+    list of str
+        불량 채널 이름
+    """
+    if method not in BAD_CHANNEL_METHODS:
+        raise ValueError(f'알 수 없는 탐지 기준: {method}')
+    if method in SPECTRAL_METHODS:
+        if spectrum is None:
+            spectrum = compute_psd(raw)
+        return spectrum.detect(method, threshold)
+    if stats is None:
+        stats = compute_channel_stats(raw)
+    return stats.detect(method, threshold)
+
+
+@profiled()
+def interpolate_bad_channels(raw, bads, mode='spline', n_jobs=None):
+    """
+    불량 채널을 제자리에서 보간합니다.
+
+    보간 행렬은 (전극 위치, 불량 채널, 방법)별로 캐시되며 (eeg_interp),
+    행렬 곱은 n_jobs개의 BLAS 스레드를 사용합니다.
+
+    Returns:
+    --------
+    np.ndarray
+        보간 전 불량 채널 데이터 (bads 순서, 전/후 비교 표시용)
+    """
+    rows = [raw.ch_names.index(ch) for ch in bads]
+    pre_data = raw._data[rows].copy()
+    interpolate_bads(raw, bads, mode, n_jobs=n_jobs)
+    raw.info['bads'] = []
+    return pre_data
+
+
+@profiled()
+def set_reference(raw, reference='average'):
+    """'average' 또는 채널 이름 목록으로 제자리에서 재참조합니다."""
+    if reference != 'average':
+        not_found = [ch for ch in reference if ch not in raw.ch_names]
+        if not_found:
+            raise ValueError(f'존재하지 않는 채널: {", ".join(not_found)}')
+    raw.set_eeg_reference(reference)
+    return raw
+
+
+def fit_ica(raw, n_components, random_state=42, picks=None, options=None, n_jobs=1):
+    """ICA를 피팅합니다. options(IcaFitOptions)로 빠른 모드와 방법을 고릅니다 (eeg_ica)."""
+    ica, _ = eeg_ica.fit_ica(raw, n_components, random_state, picks, options, n_jobs)
+    return ica
+
+
+@profiled()
+def apply_ica(raw, ica, exclude, copy=True):
+    """선택한 컴포넌트를 제거합니다. copy=False이면 raw를 제자리에서 바꿉니다."""
+    ica.exclude = list(exclude)
+    return ica.apply(raw.copy() if copy else raw)
+
+
+@profiled()
+def load_events(file_name):
+    """
+    이벤트 CSV(샘플, 이전 값, 이벤트 ID)를 불러옵니다.
+
+    Returns:
+    --------
+    events : np.ndarray
+        (이벤트 수, 3) 정수 배열
+    event_id : dict
+        {'Event_<id>': id}
+    """
+    events_df = pd.read_csv(file_name)
+    if len(events_df.columns) != 3:
+        raise ValueError("이벤트 파일은 3개의 열(샘플, 이전 값, 이벤트 ID)을 가져야 합니다.")
+    events = events_df.values.astype(int)
+    unique_ids = np.unique(events[:, 2])
+    event_id = {f'Event_{id}': int(id) for id in unique_ids}
+    return events, event_id
+
+
+@profiled()
+def make_epochs(raw, events, event_id, tmin, tmax, baseline):
+    """
+    에포크 인덱스(eeg_epochs.EpochIndex)를 만듭니다.
+
+    이벤트 시작 샘플만 저장하고 데이터는 raw 버퍼를 공유하므로 복사가 없으며,
+    mne.Epochs와 같은 조건 선택(epochs[name])과 평균(average)을 지원합니다.
+    """
+    return EpochIndex(raw, events, event_id, tmin, tmax, baseline)
+
+
+@profiled()
+def compute_erp(epochs):
+    """조건별 ERP(Evoked) 목록을 반환합니다."""
+    return [epochs[name].average() for name in epochs.event_id
+            if len(epochs[name]) > 0]
+
+
+@profiled()
+def run_pipeline(file_name, config, events_file=None, use_cache=True, progress=None):
+    """
+    로드 → 필터 → 불량 채널 탐지/보간 → 재참조 → ICA → 에포킹 → ERP 를 순서대로 실행합니다.
+
+    Returns:
+    --------
+    dict
+        'raw', 'bads', 'ica', 'epochs', 'rejection', 'evokeds' 키를 가진 결과
+    """
+    data, ch_names = load_recording(file_name, use_cache=use_cache,
+                                    progress=scaled_progress(progress, 0.0, 0.3))
+    raw = make_raw(data, ch_names, config.sfreq, config.montage)
+    raw = filter_raw(raw, config.l_freq, config.h_freq, config.notch_freq,
+                     progress=scaled_progress(progress, 0.3, 0.6), n_jobs=config.n_jobs)
+    if config.resample_sfreq:
+        raw = resample_raw(raw, config.resample_sfreq, n_jobs=config.n_jobs)
+
+    bads = list(config.bads)
+    if config.bad_method:
+        bads += [ch for ch in detect_bad_channels(raw, config.bad_method, config.bad_threshold)
+                 if ch not in bads]
+    if bads:
+        interpolate_bad_channels(raw, bads, config.interpolate_method, n_jobs=config.n_jobs)
+    if progress is not None:
+        progress(0.7)
+
+    if config.reference:
+        set_reference(raw, config.reference)
+
+    ica = None
+    ica_summary = None
+    if config.ica_n_components:
+        ica, ica_summary = eeg_ica.fit_ica(raw, config.ica_n_components,
+                                           options=config.ica_options(), n_jobs=config.n_jobs)
+        mne.utils.logger.info(f'ICA 피팅: {ica_summary.describe()}')
+        if config.ica_exclude:
+            # raw는 이미 파이프라인이 만든 복사본이므로 제자리에서 제거
+            apply_ica(raw, ica, config.ica_exclude, copy=False)
+    if progress is not None:
+        progress(0.9)
+
+    epochs = None
+    rejection = None
+    evokeds = []
+    if events_file is not None:
+        events, event_id = load_events(events_file)
+        if raw.info['sfreq'] != config.sfreq:
+            # 이벤트 샘플 번호를 리샘플링된 시간축으로 변환
+            events[:, 0] = np.round(events[:, 0] * raw.info['sfreq'] / config.sfreq).astype(int)
+        epochs = make_epochs(raw, events, event_id, config.tmin, config.tmax, config.baseline)
+        if config.reject is not None or config.flat is not None:
+            epochs, rejection = reject_epochs(epochs, config.reject, config.flat,
+                                              n_jobs=config.n_jobs)
+            mne.utils.logger.info(f'에포크 거부: {rejection.describe()}')
+        evokeds = compute_erp(epochs)
+    if progress is not None:
+        progress(1.0)
+    return {'raw': raw, 'bads': bads, 'ica': ica, 'ica_summary': ica_summary,
+            'epochs': epochs, 'rejection': rejection, 'evokeds': evokeds}
@@ -0,0 +1,324 @@
+# eeg_profiling.py
+#
+# 처리 단계와 화면 갱신의 시간/메모리 계측.
+#
+# 파이프라인 함수, 체인 단계, 작업 큐 작업, GUI 그리기 함수는 @profiled 또는
+# with stage(...)로 표시해 두고, 계측을 켰을 때만 단계마다 다음을 기록합니다.
+#   wall        - 경과 시간 (perf_counter)
+#   cpu         - 프로세스 CPU 시간 (process_time, 모든 스레드 합이므로 병렬이면 wall보다 큼)
+#   rss         - 단계 끝의 상주 메모리와 단계 동안의 변화량
+#   peak_rss    - 단계 끝 시점의 프로세스 최대 상주 메모리 (단계가 최대치를 올렸는지 확인용)
+#   alloc_peak  - 단계 동안 새로 할당된 메모리의 최대치 (tracemalloc, numpy 배열 포함)
+#   alloc_net   - 단계가 끝난 뒤에도 남은 할당 메모리
+# 꺼져 있으면 stage()는 공유 nullcontext를, @profiled는 원래 함수 호출만 하므로
+# 전역 플래그 확인 한 번 외의 비용이 없습니다. tracemalloc은 할당 계측을 켠 동안만
+# 동작합니다 (Python 할당이 몇 배 느려지므로 GUI에서 따로 끌 수 있음).
+#
+# 기록은 JSON(단계 목록과 이름별 요약) 또는 Chrome trace 형식
+# (chrome://tracing, https://ui.perfetto.dev 에서 열기)으로 내보낼 수 있습니다.
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, asdict
+
+try:
+    import psutil
+except ImportError:  # 선택 의존성: 없으면 /proc 또는 resource 모듈 사용
+    psutil = None
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 보관할 최대 기록 수 (오래된 기록부터 버림)
+MAX_RECORDS = 20000
+# 단계 분류 (요약 표와 Chrome trace의 cat)
+CATEGORIES = ('pipeline', 'chain', 'analysis', 'job', 'redraw', 'benchmark')
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def current_rss():
+    """현재 상주 메모리 (바이트). 알 수 없으면 None."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """프로세스 시작 이후 최대 상주 메모리 (바이트). 알 수 없으면 None."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS는 바이트, Linux는 KB 단위
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if psutil is not None:
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    return None
+
+
+@dataclass
+class StageRecord:
+    """계측한 단계 하나 (시간은 초, 메모리는 바이트)."""
+    name: str
+    category: str
+    thread: str
+    thread_id: int
+    depth: int
+    start: float
+    wall: float
+    cpu: float
+    rss: int = None
+    rss_delta: int = None
+    peak_rss: int = None
+    alloc_peak: int = None
+    alloc_net: int = None
+    error: str = None
+    args: dict = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class _Frame:
+    """진행 중인 단계의 시작 값 (스레드별 스택에 쌓임)."""
+    __slots__ = ('name', 'category', 'args', 'start', 'cpu', 'rss', 'alloc', 'alloc_peak')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.alloc = None
+        self.alloc_peak = 0
+
+
+class Profiler:
+    """
+    단계 기록기.
+
+    stage()로 감싼 구간을 스레드별로 중첩해 기록합니다. tracemalloc의 최대치는
+    프로세스 전역이므로 단계에 들어갈 때마다 초기화하고, 바깥 단계의 최대치는
+    안쪽 단계가 끝날 때 이어 받습니다. 여러 스레드에서 동시에 실행되는 단계의
+    할당량은 서로 섞일 수 있습니다 (시간은 정확).
+    """
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self.enabled = False
+        self.trace_allocations = False
+        self.origin = time.perf_counter()
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        # 기록이 추가될 때마다 증가 (GUI가 새 기록이 있는지만 싸게 확인)
+        self.version = 0
+
+    def enable(self, trace_allocations=True):
+        """계측을 켭니다. trace_allocations이면 tracemalloc으로 할당량도 잽니다."""
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif not trace_allocations:
+            self._stop_tracemalloc()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._stop_tracemalloc()
+
+    def _stop_tracemalloc(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self.origin = time.perf_counter()
+            self.version += 1
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name, category='pipeline', **args):
+        """
+        with 문으로 구간을 기록합니다. 꺼져 있으면 아무 일도 하지 않는 공유 객체를 반환합니다.
+
+        Parameters:
+        -----------
+        name : str
+            단계 이름 (요약 표에서 이 이름별로 합산)
+        category : str
+            CATEGORIES 중 하나
+        args : dict
+            기록에 함께 남길 값 (채널 수 등, JSON으로 변환 가능한 값)
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name, category, args or None)
+
+    @contextlib.contextmanager
+    def _measure(self, name, category, args):
+        stack = self._stack()
+        frame = _Frame(name, category, args)
+        tracing = self.trace_allocations and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].alloc_peak = max(stack[-1].alloc_peak, peak)
+            tracemalloc.reset_peak()
+            frame.alloc = current
+        frame.rss = current_rss()
+        stack.append(frame)
+        frame.cpu = time.process_time()
+        frame.start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - frame.start
+            cpu = time.process_time() - frame.cpu
+            stack.pop()
+            record = StageRecord(
+                name=name, category=category, thread=threading.current_thread().name,
+                thread_id=threading.get_ident(), depth=len(stack),
+                start=frame.start - self.origin, wall=wall, cpu=cpu, error=error, args=args)
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame.alloc_peak)
+                record.alloc_peak = max(peak - frame.alloc, 0)
+                record.alloc_net = current - frame.alloc
+                if stack:
+                    stack[-1].alloc_peak = max(stack[-1].alloc_peak, peak)
+            record.rss = current_rss()
+            if record.rss is not None and frame.rss is not None:
+                record.rss_delta = record.rss - frame.rss
+            record.peak_rss = peak_rss()
+            with self._lock:
+                self._records.append(record)
+                self.version += 1
+
+    def summary(self, records=None):
+        """
+        (분류, 이름)별 합계.
+
+        Returns:
+        --------
+        list of dict
+            'category', 'name', 'count', 'wall', 'wall_max', 'cpu', 'alloc_peak',
+            'rss_delta', 'peak_rss' 키를 가진 행 (wall 합계가 큰 순서)
+        """
+        rows = {}
+        for r in self.records() if records is None else records:
+            row = rows.get((r.category, r.name))
+            if row is None:
+                row = rows[(r.category, r.name)] = {
+                    'category': r.category, 'name': r.name, 'count': 0, 'wall': 0.0,
+                    'wall_max': 0.0, 'cpu': 0.0, 'alloc_peak': None, 'rss_delta': None,
+                    'peak_rss': None}
+            row['count'] += 1
+            row['wall'] += r.wall
+            row['wall_max'] = max(row['wall_max'], r.wall)
+            row['cpu'] += r.cpu
+            for key, value in (('alloc_peak', r.alloc_peak), ('peak_rss', r.peak_rss)):
+                if value is not None:
+                    row[key] = value if row[key] is None else max(row[key], value)
+            if r.rss_delta is not None:
+                row['rss_delta'] = (row['rss_delta'] or 0) + r.rss_delta
+        return sorted(rows.values(), key=lambda row: -row['wall'])
+
+    def to_dict(self):
+        records = self.records()
+        return {'pid': os.getpid(), 'trace_allocations': self.trace_allocations,
+                'summary': self.summary(records), 'records': [r.to_dict() for r in records]}
+
+    def to_chrome_trace(self):
+        """Chrome trace event 형식 (완료 이벤트 'X', 시간은 마이크로초)."""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for r in self.records():
+            threads.setdefault(r.thread_id, r.thread)
+            args = {key: value for key, value in (
+                ('cpu_ms', r.cpu * 1e3), ('rss', r.rss), ('rss_delta', r.rss_delta),
+                ('peak_rss', r.peak_rss), ('alloc_peak', r.alloc_peak),
+                ('alloc_net', r.alloc_net), ('error', r.error)) if value is not None}
+            if r.args:
+                args.update(r.args)
+            events.append({'name': r.name, 'cat': r.category, 'ph': 'X',
+                           'ts': r.start * 1e6, 'dur': r.wall * 1e6,
+                           'pid': pid, 'tid': r.thread_id, 'args': args})
+        for tid, name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+
+
+# 프로세스 전역 기록기 (배치 워커 프로세스는 각자 가짐)
+PROFILER = Profiler()
+
+
+def stage(name, category='pipeline', **args):
+    """PROFILER.stage()의 줄임."""
+    return PROFILER.stage(name, category, **args)
+
+
+def profiled(name=None, category='pipeline'):
+    """
+    함수 호출 전체를 단계로 기록하는 데코레이터 (이름 기본값은 함수 이름).
+
+    계측 여부는 호출할 때마다 확인하므로 실행 중에 켜고 끌 수 있습니다.
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            with PROFILER._measure(label, category, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def format_bytes(n):
+    """바이트 수를 읽기 쉬운 문자열로 (None이면 '-')."""
+    if n is None:
+        return '-'
+    sign = '-' if n < 0 else ''
+    n = abs(n)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{sign}{n:.0f} {unit}' if unit == 'B' else f'{sign}{n:.1f} {unit}'
+        n /= 1024
@@ -0,0 +1,111 @@
+# eeg_projection.py
+#
+# 채널 공간의 아핀(선형 + 상수) 연산 합성.
+#
+# 재참조, ICA 컴포넌트 제거, 불량 채널 보간은 모두 각 시점의 채널 벡터 x를
+# M @ x + b로 바꾸는 연산입니다. 각 단계의 (M, b)는 단계 구현을 작은 탐침(probe)
+# 데이터 [0 | I]에 그대로 실행하여 얻으므로 단계별 적용과 같은 결과가 보장되고,
+# 연속된 단계는 행렬 곱으로 하나로 합친 뒤 녹화 전체에 시간 청크 단위로 한 번만 적용합니다.
+
+import numpy as np
+import mne
+from eeg_parallel import run_blocks
+
+
+# 채널 공간 선형 단계 (처리 체인의 단계 종류)
+LINEAR_KINDS = ('reference', 'ica', 'interpolate')
+# 한 번에 곱하는 샘플 수
+PROJECTION_CHUNK = 2 ** 16
+
+
+class AffineOperator:
+    """
+    채널 벡터에 대한 아핀 연산 y = matrix @ x + offset.
+
+    Parameters:
+    -----------
+    matrix : np.ndarray
+        (채널, 채널) 행렬
+    offset : np.ndarray
+        (채널,) 상수항 (ICA의 평균 제거/복원 등)
+    """
+
+    def __init__(self, matrix, offset=None):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        n = self.matrix.shape[0]
+        self.offset = np.zeros(n) if offset is None else np.asarray(offset, dtype=np.float64)
+
+    @classmethod
+    def identity(cls, n_channels):
+        return cls(np.eye(n_channels))
+
+    @classmethod
+    def probe(cls, info, run):
+        """
+        run(raw) -> raw 형태의 단계 구현을 탐침 데이터에 실행하여 연산을 구합니다.
+
+        탐침은 첫 열이 0, 나머지가 단위 행렬인 (채널, 채널 + 1) Raw이므로
+        출력의 첫 열이 상수항, 나머지 열에서 상수항을 뺀 것이 행렬입니다.
+
+        Returns:
+        --------
+        operator : AffineOperator
+        info : mne.Info
+            단계가 바꾼 info (다음 단계 탐침에 사용)
+        """
+        n = len(info['ch_names'])
+        probe_data = np.hstack([np.zeros((n, 1)), np.eye(n)])
+        probe_raw = mne.io.RawArray(probe_data, info.copy(), verbose=False)
+        out = run(probe_raw)
+        data = out.get_data()
+        offset = data[:, 0].copy()
+        return cls(data[:, 1:] - offset[:, None], offset), out.info
+
+    def then(self, other):
+        """self를 적용한 뒤 other를 적용하는 합성 연산."""
+        return AffineOperator(other.matrix @ self.matrix,
+                              other.matrix @ self.offset + other.offset)
+
+    def is_identity(self, atol=1e-12):
+        return (np.allclose(self.matrix, np.eye(len(self.matrix)), rtol=0, atol=atol)
+                and np.allclose(self.offset, 0.0, rtol=0, atol=atol))
+
+    def apply(self, data):
+        """(채널, ...) 배열에 적용한 새 배열 (예: ERP, 에포크 평균)."""
+        data = np.asarray(data, dtype=np.float64)
+        out = np.tensordot(self.matrix, data, axes=(1, 0))
+        return out + self.offset.reshape((-1,) + (1,) * (data.ndim - 1))
+
+    def apply_rows(self, data, rows):
+        """출력의 일부 채널(rows)만 계산합니다 (예: 보간 전/후 비교용 몇 채널)."""
+        out = self.matrix[rows] @ np.asarray(data, dtype=np.float64)
+        return out + self.offset[rows, None]
+
+
+def apply_to_raw(raw, operator, info=None, n_jobs=1, chunk=PROJECTION_CHUNK, progress=None):
+    """
+    연속 데이터 전체에 연산을 한 번의 청크 순회로 적용한 새 Raw를 만듭니다.
+
+    출력 버퍼는 한 번만 할당하고 (입력 복사 없음), 시간 청크를 n_jobs개의
+    스레드에서 나눠 곱합니다.
+
+    Parameters:
+    -----------
+    info : mne.Info or None
+        출력 info (단계가 바꾼 info). None이면 입력 info의 복사본
+    """
+    data = raw._data
+    out = np.empty(data.shape)
+    matrix = operator.matrix
+    offset = operator.offset[:, None]
+
+    def apply_chunk(t0):
+        t1 = min(t0 + chunk, data.shape[1])
+        np.matmul(matrix, data[:, t0:t1], out=out[:, t0:t1])
+        out[:, t0:t1] += offset
+
+    run_blocks(apply_chunk, range(0, data.shape[1], chunk), n_jobs, progress)
+    info = raw.info.copy() if info is None else info.copy()
+    result = mne.io.RawArray(out, info, first_samp=raw.first_samp, verbose=False)
+    result.set_annotations(raw.annotations)
+    return result
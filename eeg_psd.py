@@ -0,0 +1,232 @@
+# eeg_psd.py
+#
+# 채널별 Welch 파워 스펙트럼을 녹화 전체에 대해 한 번의 청크 순회로 계산합니다.
+#
+# 청크 경계에 걸친 세그먼트는 앞 청크의 마지막 (세그먼트 - 이동 간격) 샘플을 이어
+# 붙여 처리하므로 scipy.signal.welch(average='mean')와 같은 세그먼트를 같은 순서로
+# 평균합니다. 원본 크기의 임시 배열 없이 세그먼트 묶음 단위로 FFT하여 |X|^2만 누적합니다.
+#
+# 스펙트럼 대역 비율 (고주파 근전도 잡음, 전원 잡음)은 채널 간 robust z 값으로
+# 불량 채널 탐지 기준에 사용됩니다.
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+from eeg_profiling import profiled
+
+
+# 한 번에 읽는 샘플 수
+PSD_CHUNK = 65536
+# 한 번에 FFT하는 세그먼트 수 (채널 x 세그먼트 x 길이 작업 배열 크기 제한)
+SEGMENT_BATCH = 64
+# 기본 세그먼트 길이 (초, 주파수 해상도 0.5 Hz)와 겹침 비율
+WELCH_SECONDS = 2.0
+WELCH_OVERLAP = 0.5
+# 대역 비율 기준의 대역 (Hz, 나이퀴스트 주파수에서 잘림)
+HIGH_FREQ_BAND = (20.0, 100.0)
+BROAD_BAND = (1.0, 100.0)
+LINE_FREQS = (50.0, 60.0)
+# 전원 주파수 대역 반폭과 비교할 주변 대역 반폭 (Hz)
+LINE_HALF_WIDTH = 1.0
+LINE_FLANK_WIDTH = 5.0
+# 기준별 기본 임계값 (채널 간 log 비율의 robust z 값)
+#   high_freq  - 고주파(20-100 Hz) 파워 비율이 다른 채널보다 큰 채널 (근전도 잡음)
+#   line_noise - 전원 주파수 파워가 주변 주파수 대비 다른 채널보다 큰 채널
+SPECTRAL_THRESHOLDS = {'high_freq': 3.0, 'line_noise': 3.0}
+SPECTRAL_METHODS = tuple(SPECTRAL_THRESHOLDS)
+# robust z의 분모(log10 비율의 채널 간 MAD) 하한. 채널들의 비율이 거의 같을 때
+# 작은 차이가 큰 z 값이 되지 않도록 함 (임계값 3이면 약 1.4배 이상 차이)
+MIN_LOG_SPREAD = 0.05
+
+
+class WelchAccumulator:
+    """
+    채널별 Welch 스펙트럼 스트리밍 누적기.
+
+    update(chunk)로 (채널, 샘플) 청크를 시간 순서대로 넣습니다. 세그먼트마다 평균을
+    빼고 (detrend='constant') 창을 곱한 뒤 단측 파워 밀도를 더합니다.
+
+    Parameters:
+    -----------
+    n_channels : int
+    sfreq : float
+    n_per_seg : int
+        세그먼트 길이 (샘플)
+    n_overlap : int or None
+        세그먼트 겹침 (None이면 절반)
+    window : str
+        scipy.signal.get_window 창 이름
+    """
+
+    def __init__(self, n_channels, sfreq, n_per_seg, n_overlap=None, window='hann',
+                 n_jobs=1):
+        self.sfreq = float(sfreq)
+        self.n_per_seg = int(n_per_seg)
+        self.n_overlap = self.n_per_seg // 2 if n_overlap is None else int(n_overlap)
+        if not 0 <= self.n_overlap < self.n_per_seg:
+            raise ValueError('세그먼트 겹침은 0 이상, 세그먼트 길이 미만이어야 합니다.')
+        self.step = self.n_per_seg - self.n_overlap
+        self.window = get_window(window, self.n_per_seg)
+        self.n_jobs = n_jobs
+        self.freqs = sp_fft.rfftfreq(self.n_per_seg, 1 / self.sfreq)
+        self.n_segments = 0
+        self._sum = np.zeros((n_channels, len(self.freqs)))
+        self._tail = np.empty((n_channels, 0))
+
+    def update(self, chunk):
+        """(채널, 샘플) 청크를 누적합니다. 다음 세그먼트에 필요한 끝부분은 보관합니다."""
+        buf = np.concatenate([self._tail, np.asarray(chunk, dtype=np.float64)], axis=1)
+        n_seg = max((buf.shape[1] - self.n_per_seg) // self.step + 1, 0)
+        if n_seg > 0:
+            # (채널, 세그먼트, 길이) strided view (복사 없음)
+            segments = np.lib.stride_tricks.sliding_window_view(
+                buf, self.n_per_seg, axis=1)[:, ::self.step][:, :n_seg]
+            for s0 in range(0, n_seg, SEGMENT_BATCH):
+                seg = segments[:, s0:s0 + SEGMENT_BATCH]
+                seg = (seg - seg.mean(axis=-1, keepdims=True)) * self.window
+                spec = sp_fft.rfft(seg, axis=-1, workers=self.n_jobs)
+                self._sum += (spec.real ** 2 + spec.imag ** 2).sum(axis=1)
+            self.n_segments += n_seg
+        self._tail = buf[:, n_seg * self.step:].copy()
+
+    def psd(self):
+        """(채널, 주파수) 단측 파워 스펙트럼 밀도 (단위^2/Hz). 세그먼트가 없으면 None."""
+        if self.n_segments == 0:
+            return None
+        scale = 1.0 / (self.sfreq * (self.window ** 2).sum() * self.n_segments)
+        psd = self._sum * scale
+        # 단측 스펙트럼: DC와 (짝수 길이의) 나이퀴스트를 제외하고 두 배
+        last = None if self.n_per_seg % 2 else -1
+        psd[:, 1:last] *= 2
+        return psd
+
+
+class Spectrum:
+    """
+    채널별 파워 스펙트럼과 대역 비율 지표.
+
+    Parameters:
+    -----------
+    ch_names : list of str
+    freqs : np.ndarray
+        (주파수,) Hz
+    psd : np.ndarray
+        (채널, 주파수) 파워 스펙트럼 밀도
+    n_segments : int
+        평균한 세그먼트 수
+    """
+
+    def __init__(self, ch_names, freqs, psd, n_segments):
+        self.ch_names = list(ch_names)
+        self.freqs = np.asarray(freqs)
+        self.psd = np.asarray(psd)
+        self.n_segments = n_segments
+
+    def with_rows(self, rows, other):
+        """rows 채널을 other(같은 주파수 축, len(rows)개 채널)의 값으로 바꾼 새 스펙트럼."""
+        psd = self.psd.copy()
+        psd[rows] = other.psd
+        return Spectrum(self.ch_names, self.freqs, psd, self.n_segments)
+
+    def log_power(self):
+        """(채널, 주파수) 10 log10(PSD) (dB). 0인 값은 NaN."""
+        with np.errstate(divide='ignore'):
+            out = 10 * np.log10(self.psd)
+        out[~np.isfinite(out)] = np.nan
+        return out
+
+    def _band(self, fmin, fmax):
+        return (self.freqs >= fmin) & (self.freqs <= fmax)
+
+    def band_power(self, fmin, fmax):
+        """채널별 [fmin, fmax] 대역 파워 (PSD 적분)."""
+        df = self.freqs[1] - self.freqs[0] if len(self.freqs) > 1 else 1.0
+        return self.psd[:, self._band(fmin, fmax)].sum(axis=1) * df
+
+    def high_freq_ratio(self, band=HIGH_FREQ_BAND, broad=BROAD_BAND):
+        """채널별 고주파 대역 파워 / 전체 대역 파워."""
+        nyquist = self.freqs[-1]
+        high = self.band_power(band[0], min(band[1], nyquist))
+        total = self.band_power(broad[0], min(broad[1], nyquist))
+        return np.divide(high, total, out=np.zeros_like(high), where=total > 0)
+
+    def line_noise_ratio(self, line_freqs=LINE_FREQS):
+        """
+        채널별 전원 주파수 대역의 평균 PSD / 주변 대역 평균 PSD.
+
+        여러 전원 주파수 중 나이퀴스트 아래인 것들의 최대값입니다. 주파수가 없으면 1.
+        """
+        ratio = np.ones(len(self.ch_names))
+        for f in line_freqs:
+            if f + LINE_FLANK_WIDTH > self.freqs[-1]:
+                continue
+            peak = self._band(f - LINE_HALF_WIDTH, f + LINE_HALF_WIDTH)
+            flank = self._band(f - LINE_FLANK_WIDTH, f + LINE_FLANK_WIDTH) & ~peak
+            if not peak.any() or not flank.any():
+                continue
+            num = self.psd[:, peak].mean(axis=1)
+            den = self.psd[:, flank].mean(axis=1)
+            ratio = np.maximum(ratio, np.divide(num, den, out=np.ones_like(num), where=den > 0))
+        return ratio
+
+    def metric(self, method):
+        if method == 'high_freq':
+            return self.high_freq_ratio()
+        if method == 'line_noise':
+            return self.line_noise_ratio()
+        raise ValueError(f'알 수 없는 스펙트럼 기준: {method}')
+
+    def detect(self, method, threshold=None):
+        """
+        대역 비율의 log 값이 다른 채널보다 robust z 값 threshold 이상 큰 채널을 고릅니다.
+
+        Returns:
+        --------
+        list of str
+            불량 채널 이름
+        """
+        if method not in SPECTRAL_THRESHOLDS:
+            raise ValueError(f'알 수 없는 탐지 기준: {method}')
+        if threshold is None:
+            threshold = SPECTRAL_THRESHOLDS[method]
+        values = np.log10(np.maximum(self.metric(method), np.finfo(float).tiny))
+        median = np.median(values)
+        mad = max(np.median(np.abs(values - median)) * 1.4826, MIN_LOG_SPREAD)
+        bad = (values - median) / mad > threshold
+        return [ch for ch, is_bad in zip(self.ch_names, bad) if is_bad]
+
+
+@profiled(category='analysis')
+def compute_psd(raw, n_per_seg=None, n_overlap=None, picks=None, chunk_samples=PSD_CHUNK,
+                n_jobs=1, progress=None):
+    """
+    Raw 전체(또는 picks 채널)의 Welch 스펙트럼을 청크 단위로 한 번 읽어 계산합니다.
+
+    Parameters:
+    -----------
+    n_per_seg : int or None
+        세그먼트 길이 (None이면 WELCH_SECONDS초, 녹화보다 길면 녹화 길이)
+    n_overlap : int or None
+        세그먼트 겹침 (None이면 WELCH_OVERLAP 비율)
+    picks : list of int or None
+        계산할 채널 번호
+
+    Returns:
+    --------
+    Spectrum
+    """
+    sfreq = raw.info['sfreq']
+    n_samples = raw.n_times
+    if n_per_seg is None:
+        n_per_seg = int(round(sfreq * WELCH_SECONDS))
+    n_per_seg = max(1, min(int(n_per_seg), n_samples))
+    if n_overlap is None:
+        n_overlap = int(n_per_seg * WELCH_OVERLAP)
+    picks = list(range(len(raw.ch_names))) if picks is None else list(picks)
+    acc = WelchAccumulator(len(picks), sfreq, n_per_seg, n_overlap, n_jobs=n_jobs)
+    for start in range(0, n_samples, chunk_samples):
+        stop = min(start + chunk_samples, n_samples)
+        acc.update(raw.get_data(picks=picks, start=start, stop=stop))
+        if progress is not None:
+            progress(stop / n_samples)
+    return Spectrum([raw.ch_names[i] for i in picks], acc.freqs, acc.psd(), acc.n_segments)
@@ -0,0 +1,184 @@
+# eeg_pyramid.py
+
+import numpy as np
+from eeg_profiling import profiled
+
+
+# 가장 촘촘한 피라미드 단계의 구간 크기(샘플)와 단계 간 배율
+BASE_BIN = 16
+LEVEL_FACTOR = 4
+# 이 구간 수보다 작아지면 더 이상 단계를 만들지 않음
+MIN_BINS = 256
+# 피라미드를 만들 때 한 번에 읽는 샘플 수 (BASE_BIN의 배수)
+BUILD_CHUNK = BASE_BIN * 65536
+
+
+def minmax_decimate(data, bin_size):
+    """
+    (채널, 샘플) 배열을 bin_size 구간별 최소/최대값으로 줄입니다.
+
+    Returns:
+    --------
+    mins, maxs : np.ndarray
+        (채널, 구간 수) 배열. 마지막 구간은 남은 샘플만으로 계산
+    """
+    n_channels, n_samples = data.shape
+    n_full = n_samples // bin_size
+    n_bins = -(-n_samples // bin_size)
+    mins = np.empty((n_channels, n_bins), dtype=data.dtype)
+    maxs = np.empty((n_channels, n_bins), dtype=data.dtype)
+    if n_full:
+        blocks = data[:, :n_full * bin_size].reshape(n_channels, n_full, bin_size)
+        blocks.min(axis=2, out=mins[:, :n_full])
+        blocks.max(axis=2, out=maxs[:, :n_full])
+    if n_bins > n_full:
+        tail = data[:, n_full * bin_size:]
+        mins[:, -1] = tail.min(axis=1)
+        maxs[:, -1] = tail.max(axis=1)
+    return mins, maxs
+
+
+def interleave_minmax(mins, maxs):
+    """최소/최대값을 번갈아 배치하여 (채널, 2 * 구간 수) 배열로 만듭니다."""
+    out = np.empty((mins.shape[0], mins.shape[1] * 2), dtype=mins.dtype)
+    out[:, 0::2] = mins
+    out[:, 1::2] = maxs
+    return out
+
+
+def decimate_window(data, start, sfreq, max_points):
+    """
+    메모리에 있는 (채널, 샘플) 구간을 채널당 max_points 이하의 최소/최대 점으로 줄입니다.
+
+    피라미드가 아직 없을 때나 보간 전 신호처럼 일부 채널만 따로 그릴 때 사용합니다.
+
+    Returns:
+    --------
+    times : np.ndarray
+        각 점의 시간 (초)
+    data : np.ndarray
+        (채널, 점 수) 배열
+    """
+    n_samples = data.shape[1]
+    if n_samples <= max_points:
+        return (start + np.arange(n_samples)) / sfreq, data
+    bin_size = -(-2 * n_samples // max(2, max_points))
+    mins, maxs = minmax_decimate(data, bin_size)
+    centers = start + np.minimum((np.arange(mins.shape[1]) + 0.5) * bin_size, n_samples - 1)
+    return np.repeat(centers, 2) / sfreq, interleave_minmax(mins, maxs)
+
+
+class MinMaxPyramid:
+    """
+    채널별 최소/최대 다중 해상도 피라미드.
+
+    단계 k는 BASE_BIN * LEVEL_FACTOR**k 샘플 구간마다 최소/최대값을 저장합니다.
+    표시 구간과 화면 폭(픽셀)이 주어지면 점 개수가 폭의 약 2배를 넘지 않는
+    가장 촘촘한 단계를 골라, 녹화 길이와 상관없이 그리는 점 수가 일정합니다.
+    float32로 저장하며 전체 크기는 원본(float64)의 약 1/12입니다.
+    """
+
+    def __init__(self, levels, n_samples, sfreq):
+        self.levels = levels  # [(bin_size, mins, maxs), ...]
+        self.n_samples = n_samples
+        self.sfreq = sfreq
+
+    @classmethod
+    @profiled('pyramid', category='redraw')
+    def from_raw(cls, raw, progress=None):
+        """Raw에서 청크 단위로 읽어 피라미드를 만듭니다."""
+        n_samples = raw.n_times
+        n_channels = len(raw.ch_names)
+        n_bins = -(-n_samples // BASE_BIN)
+        mins = np.empty((n_channels, n_bins), dtype=np.float32)
+        maxs = np.empty((n_channels, n_bins), dtype=np.float32)
+        for start in range(0, n_samples, BUILD_CHUNK):
+            stop = min(start + BUILD_CHUNK, n_samples)
+            chunk_min, chunk_max = minmax_decimate(raw.get_data(start=start, stop=stop), BASE_BIN)
+            b0 = start // BASE_BIN
+            mins[:, b0:b0 + chunk_min.shape[1]] = chunk_min
+            maxs[:, b0:b0 + chunk_max.shape[1]] = chunk_max
+            if progress is not None:
+                progress(stop / n_samples)
+
+        levels = [(BASE_BIN, mins, maxs)]
+        bin_size = BASE_BIN
+        while mins.shape[1] > MIN_BINS:
+            bin_size *= LEVEL_FACTOR
+            mins = minmax_decimate(mins, LEVEL_FACTOR)[0]
+            maxs = minmax_decimate(maxs, LEVEL_FACTOR)[1]
+            levels.append((bin_size, mins, maxs))
+        return cls(levels, n_samples, raw.info['sfreq'])
+
+    def nbytes(self):
+        return sum(mins.nbytes + maxs.nbytes for _, mins, maxs in self.levels)
+
+    def choose_bin(self, n_window, max_points):
+        """
+        구간 길이 n_window를 max_points 이하로 그리기 위한 구간 크기를 고릅니다.
+
+        1이면 원본 샘플, BASE_BIN 미만이면 원본을 그 자리에서 줄이고,
+        그 이상이면 조건을 만족하는 가장 촘촘한 피라미드 단계를 사용합니다.
+        """
+        if n_window <= max_points:
+            return 1
+        needed = -(-2 * n_window // max(2, max_points))
+        if needed < BASE_BIN:
+            return needed
+        for bin_size, _, _ in self.levels:
+            if bin_size >= needed:
+                return bin_size
+        return self.levels[-1][0]
+
+    def window(self, start, stop, max_points, read_raw, picks=None):
+        """
+        [start, stop) 샘플 구간을 채널당 약 max_points개의 점으로 반환합니다.
+
+        Parameters:
+        -----------
+        start, stop : int
+            샘플 구간
+        max_points : int
+            채널당 최대 점 수 (보통 화면 폭 픽셀의 2배)
+        read_raw : callable
+            원본 해상도가 필요할 때 read_raw(start, stop)로 (채널, 샘플) 배열을 읽는 함수.
+            이 경우 구간이 max_points의 BASE_BIN/2배 이하이므로 읽는 양이 작음
+        picks : array-like or None
+            반환할 채널 인덱스
+
+        Returns:
+        --------
+        times : np.ndarray
+            각 점의 시간 (초)
+        data : np.ndarray
+            (채널, 점 수) 배열
+        """
+        start = max(0, int(start))
+        stop = min(self.n_samples, int(stop))
+        bin_size = self.choose_bin(stop - start, max_points)
+        if bin_size < BASE_BIN:
+            data = read_raw(start, stop)
+            if picks is not None:
+                data = data[picks]
+            if bin_size == 1:
+                return np.arange(start, stop) / self.sfreq, data
+            mins, maxs = minmax_decimate(data, bin_size)
+            return self._bin_times(start, mins.shape[1], bin_size), interleave_minmax(mins, maxs)
+
+        for level_bin, mins, maxs in self.levels:
+            if level_bin == bin_size:
+                break
+        b0 = start // level_bin
+        b1 = -(-stop // level_bin)
+        mins = mins[:, b0:b1]
+        maxs = maxs[:, b0:b1]
+        if picks is not None:
+            mins = mins[picks]
+            maxs = maxs[picks]
+        return self._bin_times(b0 * level_bin, b1 - b0, level_bin), interleave_minmax(mins, maxs)
+
+    def _bin_times(self, first_sample, n_bins, bin_size):
+        # 최소/최대 두 점을 구간 중앙에 배치
+        centers = first_sample + (np.arange(n_bins) + 0.5) * bin_size
+        centers = np.minimum(centers, self.n_samples - 1)
+        return np.repeat(centers, 2) / self.sfreq
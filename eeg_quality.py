@@ -0,0 +1,239 @@
+# eeg_quality.py
+#
+# 채널 품질 통계를 녹화 전체에 대해 한 번의 청크 순회로 계산합니다.
+# 평균/분산(Welford 병합), 평균 제곱, 최소/최대와 채널별 히스토그램 스케치를
+# 함께 누적하므로, 탐지 기준이나 임계값을 바꿔도 데이터를 다시 읽지 않습니다.
+
+import numpy as np
+from eeg_profiling import profiled
+
+
+# 한 번에 읽는 샘플 수
+STATS_CHUNK = 65536
+# 채널별 히스토그램 구간 수와 asinh 눈금 범위 (기준 MAD의 약 ±10^6배까지 구분)
+HIST_BINS = 4096
+HIST_RANGE = 14.5
+# 뒤 청크의 MAD가 히스토그램 기준 MAD의 이 배수를 넘으면 그 채널의 눈금을 다시 잡음
+REBIN_RATIO = 100.0
+# '이상치' 기준에서 이상치로 보는 z 값
+OUTLIER_Z = 3.0
+# 기준별 기본 임계값
+#   mean_square - 평균 제곱이 채널 평균 + (임계값) x 표준편차를 넘는 채널
+#   flat        - 표준편차가 평균 표준편차의 (임계값) 배 미만인 채널
+#   outlier     - 3시그마 밖 샘플 비율이 (임계값)을 넘는 채널
+#   robust      - 사분위 범위의 채널 간 robust z 값이 (임계값)을 넘는 채널
+DEFAULT_THRESHOLDS = {'mean_square': 2.0, 'flat': 0.1, 'outlier': 0.1, 'robust': 3.0}
+QUALITY_METHODS = tuple(DEFAULT_THRESHOLDS)
+
+
+class ChannelStats:
+    """
+    채널별 스트리밍 통계 누적기.
+
+    update(chunk)로 (채널, 샘플) 청크를 차례로 넣으면 원본 크기의 임시 배열 없이
+    평균, 분산, 평균 제곱, 최소/최대, 분위수/이상치 비율용 히스토그램을 유지합니다.
+    히스토그램은 청크의 중앙값/MAD를 기준으로 한 asinh 눈금이라 큰 이상값이
+    섞여도 중심부 해상도가 유지되며 (기준 MAD의 약 1%), 분위수와 이상치 비율은
+    이 구간 폭 이내의 근사값입니다. 기준은 첫 청크에서 잡되, 앰프 연결 전처럼
+    변화가 없던 채널은 값이 변하는 청크가 나올 때, 뒤 청크의 MAD가 기준의
+    REBIN_RATIO배를 넘는 채널은 그때 기준을 다시 잡고 지금까지의 히스토그램을
+    새 눈금으로 옮깁니다.
+    """
+
+    def __init__(self, ch_names, n_bins=HIST_BINS):
+        n_channels = len(ch_names)
+        self.ch_names = list(ch_names)
+        self.n_bins = n_bins
+        self.n = 0
+        self.mean = np.zeros(n_channels)
+        self._m2 = np.zeros(n_channels)
+        self.mean_square = np.zeros(n_channels)
+        self.min = np.full(n_channels, np.inf)
+        self.max = np.full(n_channels, -np.inf)
+        self.hist = np.zeros((n_channels, n_bins), dtype=np.int64)
+        self._center = None
+        self._scale = None
+        self._settled = None  # 채널별로 값이 변하는 데이터에서 눈금을 잡았는지
+        self._cum = None
+
+    @classmethod
+    @profiled('channel_stats', category='analysis')
+    def from_raw(cls, raw, chunk_samples=STATS_CHUNK, progress=None):
+        """Raw 전체를 청크 단위로 한 번 읽어 통계를 계산합니다."""
+        stats = cls(raw.ch_names)
+        n_samples = raw.n_times
+        for start in range(0, n_samples, chunk_samples):
+            stop = min(start + chunk_samples, n_samples)
+            stats.update(raw.get_data(start=start, stop=stop))
+            if progress is not None:
+                progress(stop / n_samples)
+        return stats
+
+    @property
+    def var(self):
+        return self._m2 / max(self.n, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def update(self, chunk):
+        """(채널, 샘플) 청크를 누적합니다."""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        m = chunk.shape[1]
+        if m == 0:
+            return
+        # 청크 통계를 기존 통계에 병합 (Chan/Welford)
+        c_mean = chunk.mean(axis=1)
+        centered = chunk - c_mean[:, None]
+        c_m2 = np.einsum('ij,ij->i', centered, centered)
+        c_sq = np.einsum('ij,ij->i', chunk, chunk) / m
+        self._update_scale(chunk, np.sqrt(c_m2 / m))
+        n_a = self.n
+        n = n_a + m
+        delta = c_mean - self.mean
+        self.mean += delta * (m / n)
+        self._m2 += c_m2 + delta ** 2 * (n_a * m / n)
+        self.mean_square += (c_sq - self.mean_square) * (m / n)
+        self.n = n
+        c_min = chunk.min(axis=1)
+        c_max = chunk.max(axis=1)
+        np.minimum(self.min, c_min, out=self.min)
+        np.maximum(self.max, c_max, out=self.max)
+
+        n_channels = len(self.ch_names)
+        idx = self._position(chunk).astype(np.int64)
+        np.clip(idx, 0, self.n_bins - 1, out=idx)
+        idx += (np.arange(n_channels) * self.n_bins)[:, None]
+        self.hist += np.bincount(idx.ravel(), minlength=n_channels * self.n_bins).reshape(
+            n_channels, self.n_bins)
+        self._cum = None
+
+    @staticmethod
+    def _robust_scale(chunk, std):
+        """채널별 중앙값과 MAD (MAD가 0이면 표준편차, 둘 다 0이면 0)."""
+        center = np.median(chunk, axis=1)
+        mad = np.median(np.abs(chunk - center[:, None]), axis=1) * 1.4826
+        return center, np.where(mad > 0, mad, std)
+
+    def _update_scale(self, chunk, std):
+        # 히스토그램 눈금의 기준 (중앙값/MAD, 큰 이상값에 둔감). 누적한 최소/최대는
+        # 아직 이 청크를 포함하지 않아야 함 (_rebin이 사용)
+        if self._center is None:
+            self._center, scale = self._robust_scale(chunk, std)
+            self._settled = scale > 0
+            self._scale = np.where(self._settled, scale, 1.0)
+            return
+        # 표준편차 검사는 싸므로 후보 채널만 중앙값/MAD를 계산
+        candidates = np.flatnonzero((~self._settled & (std > 0))
+                                    | (std > REBIN_RATIO * self._scale))
+        if len(candidates) == 0:
+            return
+        center, scale = self._robust_scale(chunk[candidates], std[candidates])
+        redo = (~self._settled[candidates] & (scale > 0)) | (
+            scale > REBIN_RATIO * self._scale[candidates])
+        if redo.any():
+            rows = candidates[redo]
+            self._rebin(rows, center[redo], scale[redo])
+            self._settled[rows] = True
+
+    def _rebin(self, rows, center, scale):
+        """rows 채널의 히스토그램을 새 기준(center, scale)의 눈금으로 옮깁니다."""
+        u = (np.arange(self.n_bins) + 0.5) * (2 * HIST_RANGE / self.n_bins) - HIST_RANGE
+        # 구간 중심값은 지금까지 본 범위로 자름 (변화가 없던 구간은 정확히 그 값)
+        values = self._center[rows, None] + self._scale[rows, None] * np.sinh(u)
+        values = np.clip(values, self.min[rows, None], self.max[rows, None])
+        self._center[rows] = center
+        self._scale[rows] = scale
+        idx = np.zeros(values.shape, dtype=np.int64)
+        counts = self.hist[rows]
+        filled = counts > 0
+        pos = self._position(values, rows)
+        idx[filled] = np.clip(pos[filled].astype(np.int64), 0, self.n_bins - 1)
+        idx += (np.arange(len(rows)) * self.n_bins)[:, None]
+        self.hist[rows] = np.bincount(idx.ravel(), weights=counts.ravel(),
+                                      minlength=len(rows) * self.n_bins).reshape(
+            len(rows), self.n_bins).round().astype(np.int64)
+
+    def _position(self, x, rows=slice(None)):
+        # asinh 눈금의 구간 위치: 중심 근처는 선형, 먼 값은 상대 오차가 일정한 로그 눈금
+        u = np.arcsinh((x - self._center[rows, None]) / self._scale[rows, None])
+        return (u + HIST_RANGE) * (self.n_bins / (2 * HIST_RANGE))
+
+    def _cumulative(self):
+        if self._cum is None:
+            self._cum = np.zeros((len(self.ch_names), self.n_bins + 1), dtype=np.int64)
+            np.cumsum(self.hist, axis=1, out=self._cum[:, 1:])
+        return self._cum
+
+    def count_below(self, x):
+        """채널별로 x보다 작은 샘플 수 (구간 안에서는 선형 보간)."""
+        cum = self._cumulative()
+        pos = self._position(np.asarray(x, dtype=np.float64)[:, None])[:, 0]
+        k = np.clip(np.floor(pos), 0, self.n_bins - 1).astype(np.int64)
+        frac = np.clip(pos - k, 0.0, 1.0)
+        rows = np.arange(len(self.ch_names))
+        return cum[rows, k] + self.hist[rows, k] * frac
+
+    def quantile(self, q):
+        """채널별 q 분위수 (0 <= q <= 1)."""
+        cum = self._cumulative()
+        target = q * self.n
+        pos = np.empty(len(self.ch_names))
+        for ch in range(len(self.ch_names)):
+            k = int(np.searchsorted(cum[ch], target, side='right')) - 1
+            k = min(max(k, 0), self.n_bins - 1)
+            count = self.hist[ch, k]
+            pos[ch] = k + ((target - cum[ch, k]) / count if count else 0.0)
+        u = pos * (2 * HIST_RANGE / self.n_bins) - HIST_RANGE
+        out = self._center + self._scale * np.sinh(u)
+        return np.clip(out, self.min, self.max)
+
+    def outlier_ratio(self, z=OUTLIER_Z):
+        """채널별 평균에서 z 표준편차 밖에 있는 샘플 비율."""
+        std = self.std
+        below = self.count_below(self.mean - z * std)
+        above = self.n - self.count_below(self.mean + z * std)
+        ratio = (below + above) / max(self.n, 1)
+        # 상수 채널은 원래 계산(z = 0/0)과 같이 이상치가 없는 것으로 봄
+        return np.where(std > 0, ratio, 0.0)
+
+    def iqr(self):
+        return self.quantile(0.75) - self.quantile(0.25)
+
+    def detect(self, method, threshold=None):
+        """
+        누적된 통계로 불량 채널을 고릅니다. 데이터를 다시 읽지 않습니다.
+
+        Parameters:
+        -----------
+        method : str
+            QUALITY_METHODS 중 하나
+        threshold : float or None
+            None이면 DEFAULT_THRESHOLDS의 값
+
+        Returns:
+        --------
+        list of str
+            불량 채널 이름
+        """
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f'알 수 없는 탐지 기준: {method}')
+        if threshold is None:
+            threshold = DEFAULT_THRESHOLDS[method]
+        if method == 'mean_square':
+            ms = self.mean_square
+            bad = ms > ms.mean() + threshold * ms.std()
+        elif method == 'flat':
+            stds = self.std
+            bad = stds < stds.mean() * threshold
+        elif method == 'outlier':
+            bad = self.outlier_ratio() > threshold
+        else:
+            iqr = self.iqr()
+            median = np.median(iqr)
+            mad = np.median(np.abs(iqr - median)) * 1.4826
+            if mad == 0:
+                return []
+            bad = np.abs(iqr - median) / mad > threshold
+        return [ch for ch, is_bad in zip(self.ch_names, bad) if is_bad]
@@ -0,0 +1,232 @@
+# eeg_reject.py
+#
+# 진폭 기준 에포크 거부.
+#
+# 모든 (에포크, 채널)의 peak-to-peak 진폭을 에포크 배치마다 한 번의 max/min 축소로
+# 계산해 두고, 최대(reject)/최소(flat) 기준은 이 (에포크, 채널) 표에 대한 비교만으로
+# 적용합니다. 임계값을 바꿔도 에포크를 다시 읽지 않습니다.
+#
+# 자동 임계값은 채널마다 교차 검증으로 고릅니다 (autoreject의 전역 임계값 방식을
+# 채널별로 적용). 학습 폴드에서 임계값 이하인 에포크의 평균과 검증 폴드 에포크의
+# 중앙값(아티팩트에 둔감한 기준) 사이의 RMSE를 비교하며, 깨끗한 채널에서 폴드 간 잡음
+# 때문에 에포크를 조금씩 버리는 것을 막기 위해 최소 오차에서 표준오차 하나 이내인
+# 후보 중 가장 큰 임계값을 고릅니다 (one-standard-error 규칙). 학습 에포크를 진폭 순으로
+# 정렬한 누적합으로 모든 후보의 평균을 한 번에 구하며, 채널들은 스레드에서 병렬로 처리합니다.
+
+import time
+from dataclasses import dataclass, field, asdict
+import numpy as np
+from eeg_epochs import EPOCH_BATCH
+from eeg_parallel import run_blocks
+from eeg_profiling import profiled
+
+
+# 자동 임계값 후보 수와 후보 범위 (채널 peak-to-peak 분포의 분위수)
+N_CANDIDATES = 30
+CANDIDATE_QUANTILES = (0.5, 1.0)
+CV_FOLDS = 10
+
+
+@dataclass
+class RejectionReport:
+    """에포크 거부 결과 요약 (GUI/배치 로그 표시용)."""
+    n_total: int
+    n_dropped: int
+    # 조건별 [남은 수, 전체 수]
+    conditions: dict = field(default_factory=dict)
+    # 기준을 넘은 에포크 수 (채널별, 0인 채널 제외)
+    channels: dict = field(default_factory=dict)
+    n_flat: int = 0
+    auto: bool = False
+    # 채널별 최대 임계값 (V, 자동 탐색이면 채널마다 다름)
+    reject: dict = None
+    elapsed_sec: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+    def describe(self, max_channels=5):
+        pct = 100.0 * self.n_dropped / self.n_total if self.n_total else 0.0
+        text = f'에포크 {self.n_total}개 중 {self.n_dropped}개 제거 ({pct:.1f}%)'
+        if self.n_flat:
+            text += f', 편평 {self.n_flat}개'
+        text += f', {self.elapsed_sec:.2f}초'
+        if self.conditions:
+            text += '\n  조건별 남은 에포크: ' + ', '.join(
+                f'{name} {kept}/{total}' for name, (kept, total) in self.conditions.items())
+        if self.channels:
+            worst = sorted(self.channels.items(), key=lambda item: -item[1])[:max_channels]
+            text += '\n  기준 초과가 많은 채널: ' + ', '.join(f'{ch} {n}' for ch, n in worst)
+        if self.auto and self.reject:
+            values = np.array(list(self.reject.values())) * 1e6
+            text += (f'\n  자동 임계값: {values.min():.1f}-{values.max():.1f} uV '
+                     f'(중앙값 {np.median(values):.1f} uV)')
+        return text
+
+
+@profiled(category='analysis')
+def epoch_ptp(epochs, batch=EPOCH_BATCH, progress=None):
+    """
+    모든 에포크 x 채널의 peak-to-peak 진폭 (baseline과 무관하므로 보정하지 않음).
+
+    Returns:
+    --------
+    np.ndarray
+        (에포크, 채널) 배열
+    """
+    out = np.empty((len(epochs), len(epochs.ch_names)))
+    done = 0
+    for block in epochs.iter_batches(baseline=False, batch=batch):
+        np.subtract(block.max(axis=2), block.min(axis=2), out=out[done:done + len(block)])
+        done += len(block)
+        if progress is not None:
+            progress(done / len(epochs))
+    return out
+
+
+def cv_threshold(ptp, data, folds, candidates):
+    """
+    채널 하나의 최대 임계값을 교차 검증으로 고릅니다.
+
+    Parameters:
+    -----------
+    ptp : np.ndarray
+        (에포크,) peak-to-peak 진폭
+    data : np.ndarray
+        (에포크, 샘플) baseline 보정된 신호
+    folds : np.ndarray
+        (에포크,) 폴드 번호
+    candidates : np.ndarray
+        오름차순 임계값 후보
+
+    Returns:
+    --------
+    threshold : float
+        평균 검증 오차가 최소값 + 그 표준오차 이하인 가장 큰 후보
+    errors : np.ndarray
+        후보별 평균 검증 RMSE
+    """
+    fold_errors = []
+    for k in np.unique(folds):
+        train = folds != k
+        if not train.any():
+            continue
+        order = np.argsort(ptp[train], kind='stable')
+        sorted_ptp = ptp[train][order]
+        # 진폭 순 누적합: 임계값 이하 에포크의 평균을 모든 후보에 대해 한 번에 계산
+        csum = np.cumsum(data[train][order], axis=0)
+        counts = np.searchsorted(sorted_ptp, candidates, side='right')
+        means = csum[np.maximum(counts - 1, 0)] / np.maximum(counts, 1)[:, None]
+        target = np.median(data[~train], axis=0)
+        err = np.sqrt(((means - target) ** 2).mean(axis=1))
+        err[counts == 0] = np.inf
+        fold_errors.append(err)
+    if not fold_errors:
+        return float(candidates[-1]), np.zeros(len(candidates))
+    fold_errors = np.array(fold_errors)
+    errors = fold_errors.mean(axis=0)
+    best = int(np.argmin(errors))
+    se = fold_errors[:, best].std() / np.sqrt(len(fold_errors))
+    return float(candidates[np.flatnonzero(errors <= errors[best] + se)[-1]]), errors
+
+
+@profiled(category='analysis')
+def search_thresholds(epochs, ptp=None, picks=None, n_candidates=N_CANDIDATES,
+                      n_folds=CV_FOLDS, random_state=42, n_jobs=1, progress=None):
+    """
+    채널별 최대 peak-to-peak 임계값을 교차 검증으로 찾습니다 (채널 단위 병렬).
+
+    Parameters:
+    -----------
+    ptp : np.ndarray or None
+        epoch_ptp() 결과 (None이면 계산)
+    picks : list of int or None
+        탐색할 채널 (None이면 전체). 나머지 채널은 NaN
+    n_folds : int
+        폴드 수 (에포크 수보다 많으면 에포크 수)
+
+    Returns:
+    --------
+    np.ndarray
+        (채널,) 임계값 (V)
+    """
+    if ptp is None:
+        ptp = epoch_ptp(epochs)
+    picks = list(range(len(epochs.ch_names))) if picks is None else list(picks)
+    thresholds = np.full(len(epochs.ch_names), np.nan)
+    n_epochs = len(epochs)
+    if n_epochs < 2 or not picks:
+        return thresholds
+    # 모든 채널이 같은 폴드 분할을 사용
+    rng = np.random.default_rng(random_state)
+    folds = rng.permutation(n_epochs) % min(n_folds, n_epochs)
+    quantiles = np.linspace(CANDIDATE_QUANTILES[0], CANDIDATE_QUANTILES[1], n_candidates)
+
+    def search(ch):
+        candidates = np.unique(np.quantile(ptp[:, ch], quantiles))
+        thresholds[ch] = cv_threshold(ptp[:, ch], epochs.channel_data(ch), folds, candidates)[0]
+
+    run_blocks(search, picks, n_jobs, progress)
+    return thresholds
+
+
+def _per_channel(value, n_channels):
+    if value is None:
+        return None
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n_channels,))
+
+
+@profiled(category='analysis')
+def reject_epochs(epochs, reject=None, flat=None, ignore=None, ptp=None, n_jobs=1,
+                  progress=None):
+    """
+    peak-to-peak 진폭이 reject보다 크거나 flat보다 작은 채널이 있는 에포크를 뺍니다.
+
+    Parameters:
+    -----------
+    epochs : eeg_epochs.EpochIndex
+    reject : float, array-like, 'auto' or None
+        최대 peak-to-peak (V, 채널별 배열 가능). 'auto'면 search_thresholds()로 탐색
+    flat : float, array-like or None
+        최소 peak-to-peak (V)
+    ignore : list of str or None
+        검사하지 않을 채널 (None이면 epochs.info['bads'])
+    ptp : np.ndarray or None
+        이미 계산한 epoch_ptp() 결과
+
+    Returns:
+    --------
+    kept : eeg_epochs.EpochIndex
+        남은 에포크 인덱스 (누적기가 있으면 뺀 에포크만 반영)
+    report : RejectionReport
+    """
+    start = time.time()
+    ch_names = list(epochs.ch_names)
+    ignore = list(epochs.info['bads']) if ignore is None else list(ignore)
+    picks = [i for i, ch in enumerate(ch_names) if ch not in ignore]
+    auto = isinstance(reject, str) and reject == 'auto'
+    if ptp is None:
+        ptp = epoch_ptp(epochs, progress=None if auto else progress)
+    if auto:
+        reject = search_thresholds(epochs, ptp, picks, n_jobs=n_jobs, progress=progress)
+    reject = _per_channel(reject, len(ch_names))
+    flat = _per_channel(flat, len(ch_names))
+    checked = ptp[:, picks]
+    over = np.zeros(checked.shape, dtype=bool)
+    if reject is not None:
+        over |= checked > reject[picks]
+    is_flat = np.zeros(checked.shape, dtype=bool)
+    if flat is not None:
+        is_flat = checked < flat[picks]
+    bad = over | is_flat
+    rows = np.flatnonzero(bad.any(axis=1))
+    kept = epochs.drop(rows) if len(rows) else epochs
+    counts = bad.sum(axis=0)
+    report = RejectionReport(
+        n_total=len(epochs), n_dropped=len(rows),
+        conditions={name: [kept.count(name), epochs.count(name)] for name in epochs.conditions},
+        channels={ch_names[p]: int(n) for p, n in zip(picks, counts) if n},
+        n_flat=int(is_flat.any(axis=1).sum()), auto=auto,
+        reject=None if reject is None else {ch_names[p]: float(reject[p]) for p in picks},
+        elapsed_sec=round(time.time() - start, 3))
+    return kept, report
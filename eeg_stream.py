@@ -0,0 +1,672 @@
+# eeg_stream.py
+#
+# 실시간 스트림 수신.
+#
+# 증폭기(또는 시뮬레이터)가 UDP/TCP로 보내는 패킷이나 계속 늘어나는 CSV 파일을
+# 수신 스레드에서 읽어 인과(causal) 필터를 상태를 유지하며 블록 단위로 적용하고,
+# 고정 크기 링 버퍼에 씁니다. 표시 쪽은 링 버퍼의 최근 구간만 복사해 그리며,
+# 패킷의 보낸 시각부터 화면 갱신까지의 지연을 단계별로 측정합니다.
+#
+# 패킷 형식 (리틀 엔디언):
+#   매직 'EEG1', 채널 수(uint16), 샘플 수(uint16), 첫 샘플 번호(uint64),
+#   보낸 시각(float64, time.time()) + (샘플, 채널) 순서의 float32 값
+#
+# 사용 예 (시뮬레이터와 헤드리스 수신 확인):
+#   python eeg_stream.py send --protocol udp --port 5555 --channels 64 --sfreq 1000
+#   python eeg_stream.py monitor --protocol udp --port 5555 --channels 64 --sfreq 1000
+
+import argparse
+import os
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, asdict
+import numpy as np
+from scipy.fft import next_fast_len, rfft, irfft
+from scipy.signal import butter, iirnotch, tf2sos, sosfilt, sosfilt_zi, sosfreqz, oaconvolve
+from eeg_filters import design_fir
+
+
+PACKET_MAGIC = b'EEG1'
+PACKET_HEADER = struct.Struct('<4sHHQd')
+STREAM_PROTOCOLS = ('udp', 'tcp', 'file')
+STREAM_FILTERS = ('none', 'iir', 'fir')
+# 링 버퍼 길이 (초)
+RING_SECONDS = 60.0
+# 시뮬레이터 패킷당 샘플 수 (1 kHz에서 20 ms)
+SEND_CHUNK = 20
+# UDP 수신 버퍼 크기 (GUI가 잠시 멈춰도 패킷을 잃지 않도록 넉넉하게)
+UDP_RECV_BUFFER = 8 * 1024 ** 2
+# 소켓/파일을 기다리는 최대 시간 (초). 정지 요청은 이 간격 안에 반영됨
+READ_TIMEOUT = 0.2
+FILE_POLL_INTERVAL = 0.01
+# IIR 버터워스 차수와 노치 Q
+IIR_ORDER = 4
+NOTCH_Q = 30.0
+# FIR 스트림 필터에서 패킷마다 직접 계산하는 커널 앞부분 길이 (탭). 나머지 꼬리는
+# 입력이 이 길이만큼 모일 때마다 미리 변환한 커널로 FFT 한 번에 계산해 둠
+FIR_BLOCK = 1024
+# 필터 지연을 보고할 기준 주파수 (Hz, 알파 대역)
+DELAY_REFERENCE_FREQ = 10.0
+# 샘플 번호가 이 시간(초)보다 많이 뒤로 돌아가면 송신 쪽이 다시 시작한 새 스트림으로 봄
+RESTART_SECONDS = 1.0
+# 평균 처리 시간 계산에 쓰는 지수 이동 평균 계수
+EMA_ALPHA = 0.1
+
+
+def encode_packet(first_index, block, send_time=None):
+    """(채널, 샘플) 블록을 패킷 바이트로 만듭니다."""
+    block = np.asarray(block)
+    header = PACKET_HEADER.pack(PACKET_MAGIC, block.shape[0], block.shape[1], int(first_index),
+                                time.time() if send_time is None else send_time)
+    return header + np.ascontiguousarray(block.T, dtype='<f4').tobytes()
+
+
+def decode_header(buf):
+    magic, n_channels, n_samples, first_index, send_time = PACKET_HEADER.unpack_from(buf)
+    if magic != PACKET_MAGIC:
+        raise ValueError('스트림 패킷 형식이 아닙니다.')
+    return n_channels, n_samples, first_index, send_time
+
+
+def decode_packet(buf):
+    """
+    패킷 바이트를 해석합니다.
+
+    Returns:
+    --------
+    first_index : int
+        블록 첫 샘플의 스트림 내 번호
+    send_time : float
+        보낸 시각 (time.time())
+    block : np.ndarray
+        (채널, 샘플) float64 배열
+    """
+    n_channels, n_samples, first_index, send_time = decode_header(buf)
+    payload = np.frombuffer(buf, dtype='<f4', count=n_channels * n_samples,
+                            offset=PACKET_HEADER.size)
+    return first_index, send_time, payload.reshape(n_samples, n_channels).T.astype(np.float64)
+
+
+class RingBuffer:
+    """
+    (채널, capacity) 고정 크기 링 버퍼. 수신 스레드 하나가 쓰고 GUI 스레드가 읽습니다.
+
+    쓴 샘플 총수(total)가 스트림의 샘플 번호와 같도록 유지하므로, 읽은 구간의
+    첫 샘플 번호로 시간 축을 만들 수 있습니다.
+    """
+
+    def __init__(self, n_channels, capacity):
+        self._data = np.full((n_channels, int(capacity)), np.nan)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def n_channels(self):
+        return self._data.shape[0]
+
+    @property
+    def capacity(self):
+        return self._data.shape[1]
+
+    @property
+    def total(self):
+        return self._total
+
+    def write(self, block):
+        """(채널, 샘플) 블록을 씁니다. capacity보다 길면 마지막 capacity 샘플만 남습니다."""
+        n = block.shape[1]
+        capacity = self.capacity
+        skip = max(n - capacity, 0)
+        block = block[:, skip:]
+        with self._lock:
+            pos = (self._total + skip) % capacity
+            first = min(block.shape[1], capacity - pos)
+            self._data[:, pos:pos + first] = block[:, :first]
+            self._data[:, :block.shape[1] - first] = block[:, first:]
+            self._total += n
+
+    def latest(self, n_samples):
+        """
+        최근 n_samples 구간의 복사본.
+
+        Returns:
+        --------
+        data : np.ndarray
+            (채널, 샘플) 배열 (아직 쓰인 샘플이 적으면 더 짧음)
+        start : int
+            첫 샘플 번호
+        """
+        capacity = self.capacity
+        with self._lock:
+            total = self._total
+            n = min(int(n_samples), total, capacity)
+            start = total - n
+            pos = start % capacity
+            if pos + n <= capacity:
+                data = self._data[:, pos:pos + n].copy()
+            else:
+                data = np.concatenate([self._data[:, pos:], self._data[:, :pos + n - capacity]],
+                                      axis=1)
+        return data, start
+
+
+class CausalFilter:
+    """
+    블록 단위로 호출해도 연속 신호에 한 번 적용한 것과 같은 인과 필터.
+
+    'iir'은 버터워스 대역 통과와 IIR 노치를 sos로 이어 붙여 sosfilt 상태(zi)를 유지합니다.
+    'fir'은 합성 FIR 커널(eeg_filters.design_fir)을 앞부분(FIR_BLOCK 탭)과 꼬리로 나눠,
+    앞부분은 패킷마다 직접 계산하고 꼬리는 입력 FIR_BLOCK 샘플마다 FFT 한 번으로
+    앞으로 나올 출력에 미리 더해 둡니다. 꼬리는 FIR_BLOCK 샘플 이전 입력만 쓰므로 추가
+    지연 없이 전체 커널과 같은 결과이며, 패킷당 비용은 커널 길이와 거의 무관합니다.
+
+    FIR은 선형 위상이므로 신호가 (길이 - 1) / 2 샘플만큼 늦습니다 (delay). 고역 차단이
+    낮을수록 커널이 길어져, 1 Hz 고역 통과는 1 kHz에서 약 5초 늦게 보입니다.
+    실시간 확인에는 지연이 수십 ms인 'iir'을 권장합니다.
+
+    Parameters:
+    -----------
+    sfreq : float
+        샘플링 주파수 (Hz)
+    l_freq, h_freq : float or None
+        대역 통과 차단 주파수 (None이면 그쪽을 막지 않음)
+    notch_freq : float, list or None
+        제거할 전원 주파수
+    method : str
+        'iir' 또는 'fir'
+    """
+
+    def __init__(self, sfreq, l_freq=None, h_freq=None, notch_freq=None, method='iir'):
+        if method not in ('iir', 'fir'):
+            raise ValueError(f'알 수 없는 스트림 필터: {method}')
+        self.sfreq = float(sfreq)
+        self.method = method
+        notch = [] if notch_freq is None else np.atleast_1d(notch_freq).tolist()
+        if method == 'iir':
+            self._sos = self._design_iir(self.sfreq, l_freq, h_freq, notch)
+            self._kernel = None
+        else:
+            self._sos = None
+            self._kernel = np.asarray(design_fir(self.sfreq, l_freq, h_freq, notch or None))
+            self._head = self._kernel[:FIR_BLOCK]
+            tail = self._kernel[FIR_BLOCK:]
+            self._tail_fft = None
+            if len(tail):
+                self._fft_len = next_fast_len(FIR_BLOCK + len(tail) - 1)
+                self._tail_fft = rfft(tail, self._fft_len)
+        self._state = None
+
+    @staticmethod
+    def _design_iir(sfreq, l_freq, h_freq, notch):
+        sections = []
+        if l_freq and h_freq:
+            sections.append(butter(IIR_ORDER, [l_freq, h_freq], btype='bandpass', fs=sfreq,
+                                   output='sos'))
+        elif l_freq:
+            sections.append(butter(IIR_ORDER, l_freq, btype='highpass', fs=sfreq, output='sos'))
+        elif h_freq:
+            sections.append(butter(IIR_ORDER, h_freq, btype='lowpass', fs=sfreq, output='sos'))
+        for freq in notch:
+            if freq < sfreq / 2:
+                sections.append(tf2sos(*iirnotch(freq, NOTCH_Q, fs=sfreq)))
+        if not sections:
+            return np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+        return np.vstack(sections)
+
+    @property
+    def delay(self):
+        """필터 지연 (초). FIR은 전 대역 같고, IIR은 DELAY_REFERENCE_FREQ 성분의 군지연."""
+        if self._kernel is not None:
+            return (len(self._kernel) - 1) / 2 / self.sfreq
+        freqs = DELAY_REFERENCE_FREQ + np.array([-0.05, 0.05])
+        _, h = sosfreqz(self._sos, worN=freqs, fs=self.sfreq)
+        phase = np.unwrap(np.angle(h))
+        return float(-(phase[1] - phase[0]) / (2 * np.pi * (freqs[1] - freqs[0])))
+
+    def reset(self):
+        self._state = None
+
+    def process(self, block):
+        """(채널, 샘플) 블록을 필터링한 새 배열. 처음 블록의 첫 샘플로 상태를 초기화합니다."""
+        block = np.asarray(block, dtype=np.float64)
+        if self._kernel is not None:
+            return self._process_fir(block)
+        if self._state is None:
+            self._state = sosfilt_zi(self._sos)[:, None, :] * block[None, :, :1]
+        out, self._state = sosfilt(self._sos, block, axis=1, zi=self._state)
+        return out
+
+    def _start_fir(self, first):
+        # 첫 샘플이 계속 이어진 것처럼 채워 시작 과도 응답을 줄임
+        n_channels = first.shape[0]
+        state = {'history': np.repeat(first, len(self._head) - 1, axis=1), 'fill': 0}
+        if self._tail_fft is not None:
+            # 과거 입력(상수)의 꼬리 기여: 출력 j에 sum(h[max(FIR_BLOCK, j + 1):])
+            rest = np.cumsum(self._kernel[::-1])[::-1]
+            j = np.arange(len(self._kernel) - 1)
+            state['tail'] = first * rest[np.maximum(FIR_BLOCK, j + 1)][None, :]
+            state['pending'] = np.empty((n_channels, FIR_BLOCK))
+        return state
+
+    def _process_fir(self, block):
+        if self._state is None:
+            self._state = self._start_fir(block[:, :1])
+        state = self._state
+        out = np.empty_like(block)
+        n_head = len(self._head)
+        pos = 0
+        while pos < block.shape[1]:
+            # 꼬리가 있으면 FIR_BLOCK 경계에서 나눠 처리
+            take = block.shape[1] - pos
+            if self._tail_fft is not None:
+                take = min(take, FIR_BLOCK - state['fill'])
+            segment = block[:, pos:pos + take]
+            extended = np.concatenate([state['history'], segment], axis=1)
+            state['history'] = extended[:, extended.shape[1] - (n_head - 1):]
+            out[:, pos:pos + take] = oaconvolve(extended, self._head[None, :], mode='valid', axes=1)
+            pos += take
+            if self._tail_fft is None:
+                continue
+            fill = state['fill']
+            out[:, pos - take:pos] += state['tail'][:, fill:fill + take]
+            state['pending'][:, fill:fill + take] = segment
+            state['fill'] = fill + take
+            if state['fill'] == FIR_BLOCK:
+                # 모인 입력 블록의 꼬리 기여를 다음 블록부터의 출력에 더함
+                n_out = len(self._kernel) - 1
+                contribution = irfft(rfft(state['pending'], self._fft_len, axis=1) * self._tail_fft,
+                                     self._fft_len, axis=1)[:, :n_out]
+                tail = np.zeros_like(state['tail'])
+                tail[:, :n_out - FIR_BLOCK] = state['tail'][:, FIR_BLOCK:]
+                state['tail'] = tail + contribution
+                state['fill'] = 0
+        return out
+
+
+class UdpSource:
+    """지정 포트로 들어오는 UDP 패킷을 받습니다 (패킷 하나에 블록 하나)."""
+
+    def __init__(self, host='0.0.0.0', port=5555):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECV_BUFFER)
+        self.sock.bind((host, port))
+        self.sock.settimeout(READ_TIMEOUT)
+
+    def read(self):
+        try:
+            buf, _ = self.sock.recvfrom(65536)
+        except socket.timeout:
+            return None
+        return decode_packet(buf)
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpSource:
+    """송신 쪽(증폭기/시뮬레이터)의 TCP 서버에 연결해 연속된 패킷을 받습니다."""
+
+    def __init__(self, host='127.0.0.1', port=5555):
+        self.sock = socket.create_connection((host, port), timeout=5.0)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(READ_TIMEOUT)
+        self._buf = bytearray()
+
+    def _fill(self, n):
+        while len(self._buf) < n:
+            try:
+                chunk = self.sock.recv(max(n - len(self._buf), 65536))
+            except socket.timeout:
+                return False
+            if not chunk:
+                raise ConnectionError('송신 쪽이 연결을 끊었습니다.')
+            self._buf += chunk
+        return True
+
+    def read(self):
+        if not self._fill(PACKET_HEADER.size):
+            return None
+        n_channels, n_samples, _, _ = decode_header(self._buf)
+        size = PACKET_HEADER.size + 4 * n_channels * n_samples
+        if not self._fill(size):
+            return None
+        packet = decode_packet(bytes(self._buf[:size]))
+        del self._buf[:size]
+        return packet
+
+    def close(self):
+        self.sock.close()
+
+
+class FileTailSource:
+    """
+    계속 늘어나는 CSV 파일(줄마다 채널 값)의 끝을 따라 읽는 대용 입력.
+
+    파일에는 보낸 시각이 없으므로 읽은 시각을 보낸 시각으로 사용합니다
+    (전송 지연은 폴링 간격 이내로 보임). 숫자가 아닌 줄(헤더)은 건너뜁니다.
+    """
+
+    def __init__(self, path, n_channels, from_start=False):
+        self.n_channels = n_channels
+        self.file = open(path, 'r', encoding='utf-8', errors='replace')
+        if not from_start:
+            self.file.seek(0, os.SEEK_END)
+        self._partial = ''
+        self._index = 0
+
+    def read(self):
+        deadline = time.perf_counter() + READ_TIMEOUT
+        while True:
+            text = self.file.read()
+            if text:
+                break
+            if time.perf_counter() >= deadline:
+                return None
+            time.sleep(FILE_POLL_INTERVAL)
+        text = self._partial + text
+        lines = text.split('\n')
+        self._partial = lines.pop()
+        rows = [line for line in lines if line.strip() and _is_numeric(line)]
+        if not rows:
+            return None
+        values = np.array([row.split(',')[:self.n_channels] for row in rows], dtype=np.float64)
+        first = self._index
+        self._index += len(values)
+        return first, time.time(), values.T
+
+    def close(self):
+        self.file.close()
+
+
+def _is_numeric(line):
+    head = line.split(',', 1)[0].strip()
+    try:
+        float(head)
+    except ValueError:
+        return False
+    return True
+
+
+def open_source(protocol, host='127.0.0.1', port=5555, path=None, n_channels=None):
+    if protocol == 'udp':
+        return UdpSource('0.0.0.0' if host in ('127.0.0.1', 'localhost') else host, port)
+    if protocol == 'tcp':
+        return TcpSource(host, port)
+    if protocol == 'file':
+        if not path:
+            raise ValueError('추적할 파일 경로가 필요합니다.')
+        return FileTailSource(path, n_channels)
+    raise ValueError(f'알 수 없는 스트림 입력: {protocol}')
+
+
+@dataclass
+class StreamStats:
+    """수신 상태와 최근 패킷의 시각 (모두 time.time() 기준, 초)."""
+    received: int = 0
+    dropped: int = 0
+    restarts: int = 0
+    packets: int = 0
+    rate: float = 0.0
+    last_index: int = 0
+    send_time: float = 0.0
+    recv_time: float = 0.0
+    ready_time: float = 0.0
+    filter_ms: float = 0.0
+    error: str = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class LatencyBudget:
+    """
+    최근 샘플이 화면에 보일 때까지의 지연 (ms).
+
+    전송은 보낸 시각과 받은 시각의 차이이므로 송신 쪽과 시계가 같은 (같은 컴퓨터)
+    경우에만 정확합니다. 필터 지연은 신호 자체가 늦어지는 양이라 합계에 더해 따로 보입니다.
+    """
+    transport_ms: float
+    filter_ms: float
+    wait_ms: float
+    render_ms: float
+    filter_delay_ms: float
+
+    @property
+    def total_ms(self):
+        return self.transport_ms + self.filter_ms + self.wait_ms + self.render_ms
+
+    def describe(self):
+        return (f'전체 {self.total_ms:.1f} ms (전송 {self.transport_ms:.1f}, '
+                f'필터 처리 {self.filter_ms:.2f}, 대기 {self.wait_ms:.1f}, '
+                f'그리기 {self.render_ms:.1f}) + 필터 지연 {self.filter_delay_ms:.0f} ms')
+
+
+class StreamReceiver:
+    """
+    입력을 수신 스레드에서 읽어 필터링한 뒤 링 버퍼에 씁니다.
+
+    샘플 번호가 건너뛰면 빠진 샘플 수를 dropped에 더하고 링 버퍼에는 NaN을 씁니다
+    (필터 상태는 이어서 사용, NaN은 링 버퍼 길이까지만). 이미 받은 번호의 패킷(중복/순서
+    뒤바뀜)은 버리되, 번호가 RESTART_SECONDS보다 많이 뒤로 돌아가면 송신 쪽이 다시
+    시작한 것으로 보고 필터 상태를 초기화해 그 번호부터 이어 받습니다 (restarts).
+
+    Parameters:
+    -----------
+    source : UdpSource, TcpSource or FileTailSource
+        read() -> (첫 샘플 번호, 보낸 시각, (채널, 샘플) 블록) 또는 None
+    n_channels : int
+        채널 수 (패킷과 다르면 오류로 멈춤)
+    sfreq : float
+        샘플링 주파수 (Hz)
+    stream_filter : CausalFilter or None
+    ring_seconds : float
+        링 버퍼 길이 (초)
+    """
+
+    def __init__(self, source, n_channels, sfreq, stream_filter=None, ring_seconds=RING_SECONDS):
+        self.source = source
+        self.sfreq = float(sfreq)
+        self.filter = stream_filter
+        self.ring = RingBuffer(n_channels, int(ring_seconds * sfreq))
+        self._stats = StreamStats()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._first_recv = None
+        self._expected = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='eeg-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.source.close()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = StreamStats(**self._stats.to_dict())
+        # 첫 패킷의 샘플은 받은 시각 이전에 측정된 것이므로 그만큼 구간에 포함
+        if self._first_recv is not None and stats.packets:
+            elapsed = stats.recv_time - self._first_recv[0] + self._first_recv[1] / self.sfreq
+            stats.rate = stats.received / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def latency(self, draw_start, draw_end, stats=None):
+        """GUI가 최근 구간을 그린 시각(draw_start~draw_end)으로 지연을 계산합니다 (받은 패킷이 없으면 None)."""
+        stats = stats or self.stats()
+        if not stats.packets:
+            return None
+        return LatencyBudget(
+            transport_ms=max(stats.recv_time - stats.send_time, 0.0) * 1e3,
+            filter_ms=max(stats.ready_time - stats.recv_time, 0.0) * 1e3,
+            wait_ms=max(draw_start - stats.ready_time, 0.0) * 1e3,
+            render_ms=(draw_end - draw_start) * 1e3,
+            filter_delay_ms=(self.filter.delay if self.filter is not None else 0.0) * 1e3)
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                packet = self.source.read()
+                if packet is not None:
+                    self._handle(*packet, recv_time=time.time())
+        except Exception as e:  # 수신 스레드 오류는 상태로 알리고 멈춤
+            with self._stats_lock:
+                self._stats.error = str(e)
+
+    def _handle(self, first_index, send_time, block, recv_time):
+        if block.shape[0] != self.ring.n_channels:
+            raise ValueError(f'채널 수가 다릅니다: 패킷 {block.shape[0]}, 설정 {self.ring.n_channels}')
+        if self._expected is None:
+            self._expected = first_index
+            self._first_recv = (recv_time, block.shape[1])
+        restarted = False
+        if first_index < self._expected:
+            if self._expected - first_index <= RESTART_SECONDS * self.sfreq:
+                return
+            # 송신 쪽 재시작 (샘플 번호 초기화): 새 스트림으로 이어 받음
+            self._expected = first_index
+            if self.filter is not None:
+                self.filter.reset()
+            restarted = True
+        gap = first_index - self._expected
+        if gap:
+            # 잘못된 번호로 큰 배열을 만들지 않도록 링 버퍼 길이까지만 채움
+            self.ring.write(np.full((self.ring.n_channels, min(gap, self.ring.capacity)), np.nan))
+        start = time.perf_counter()
+        if self.filter is not None:
+            block = self.filter.process(block)
+        self.ring.write(block)
+        filter_sec = time.perf_counter() - start
+        self._expected = first_index + block.shape[1]
+        with self._stats_lock:
+            stats = self._stats
+            stats.received += block.shape[1]
+            stats.dropped += gap
+            stats.restarts += restarted
+            stats.packets += 1
+            stats.last_index = self._expected
+            stats.send_time = send_time
+            stats.recv_time = recv_time
+            stats.ready_time = recv_time + filter_sec
+            stats.filter_ms += EMA_ALPHA * (filter_sec * 1e3 - stats.filter_ms)
+
+
+def synthetic_block(first_index, n_samples, n_channels, sfreq, rng):
+    """시뮬레이터 신호 (µV): 채널마다 위상이 다른 10 Hz 알파 + 50 Hz 전원 잡음 + 백색 잡음."""
+    t = (first_index + np.arange(n_samples)) / sfreq
+    phase = np.linspace(0, np.pi, n_channels)[:, None]
+    alpha = 20.0 * np.sin(2 * np.pi * 10.0 * t + phase)
+    line = 5.0 * np.sin(2 * np.pi * 50.0 * t)
+    return alpha + line + rng.standard_normal((n_channels, n_samples)) * 5.0
+
+
+def send_stream(protocol, host, port, n_channels, sfreq, duration=None, chunk=SEND_CHUNK,
+                path=None):
+    """
+    시뮬레이터: 합성 신호를 실제 시간에 맞춰 보냅니다.
+
+    udp는 host:port로 보내고, tcp는 port에서 수신 쪽 연결을 하나 기다린 뒤 보내며,
+    file은 path에 CSV 줄을 덧붙입니다. duration이 None이면 중단할 때까지 보냅니다.
+    """
+    rng = np.random.default_rng(0)
+    conn = server = out = None
+    if protocol == 'udp':
+        conn = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda data: conn.sendto(data, (host, port))  # noqa: E731
+    elif protocol == 'tcp':
+        server = socket.create_server(('0.0.0.0', port))
+        print(f'수신 쪽 연결 대기: 포트 {port}')
+        conn, _ = server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send = conn.sendall
+    elif protocol == 'file':
+        out = open(path, 'a', encoding='utf-8')
+    else:
+        raise ValueError(f'알 수 없는 스트림 입력: {protocol}')
+    total = None if duration is None else int(duration * sfreq)
+    start = time.perf_counter()
+    index = 0
+    try:
+        while total is None or index < total:
+            n = chunk if total is None else min(chunk, total - index)
+            # 블록의 마지막 샘플이 측정될 시각까지 기다렸다가 보냄
+            wait = start + (index + n) / sfreq - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            block = synthetic_block(index, n, n_channels, sfreq, rng)
+            if out is not None:
+                out.write('\n'.join(','.join(f'{v:.3f}' for v in row) for row in block.T) + '\n')
+                out.flush()
+            else:
+                send(encode_packet(index, block))
+            index += n
+    finally:
+        for handle in (conn, server, out):
+            if handle is not None:
+                handle.close()
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EEG 실시간 스트림 시뮬레이터/수신 확인')
+    parser.add_argument('mode', choices=['send', 'monitor'])
+    parser.add_argument('--protocol', choices=STREAM_PROTOCOLS, default='udp')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--path', default=None, help='file 입력의 CSV 경로')
+    parser.add_argument('--channels', type=int, default=64)
+    parser.add_argument('--sfreq', type=float, default=1000.0)
+    parser.add_argument('--duration', type=float, default=None, help='보내거나 받을 시간 (초)')
+    parser.add_argument('--chunk', type=int, default=SEND_CHUNK, help='패킷당 샘플 수')
+    parser.add_argument('--filter', choices=STREAM_FILTERS, default='iir',
+                        help='fir은 선형 위상이라 커널 길이의 절반만큼 늦음 (1 Hz 고역 통과는 약 5초)')
+    parser.add_argument('--l-freq', type=float, default=1.0)
+    parser.add_argument('--h-freq', type=float, default=40.0)
+    parser.add_argument('--notch', type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    if args.mode == 'send':
+        sent = send_stream(args.protocol, args.host, args.port, args.channels, args.sfreq,
+                           args.duration, args.chunk, args.path)
+        print(f'보낸 샘플: {sent}')
+        return
+
+    stream_filter = None
+    if args.filter != 'none':
+        stream_filter = CausalFilter(args.sfreq, args.l_freq or None, args.h_freq or None,
+                                     args.notch or None, args.filter)
+    source = open_source(args.protocol, args.host, args.port, args.path, args.channels)
+    receiver = StreamReceiver(source, args.channels, args.sfreq, stream_filter)
+    receiver.start()
+    start = time.time()
+    try:
+        while args.duration is None or time.time() - start < args.duration:
+            time.sleep(1.0)
+            draw_start = time.time()
+            receiver.ring.latest(int(args.sfreq * 5))
+            stats = receiver.stats()
+            latency = receiver.latency(draw_start, time.time(), stats)
+            print(f'수신 {stats.received} 샘플, 누락 {stats.dropped}, 재시작 {stats.restarts}, '
+                  f'{stats.rate:.0f} 샘플/초'
+                  + (f', {latency.describe()}' if latency is not None else ''))
+            if stats.error:
+                print(f'오류: {stats.error}')
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+
+
+if __name__ == '__main__':
+    main()
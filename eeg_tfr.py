@@ -0,0 +1,282 @@
+# eeg_tfr.py
+#
+# 에포크의 시간-주파수 분석 (Morlet 웨이블릿 / 멀티테이퍼).
+#
+# 웨이블릿(테이퍼) 커널과 그 FFT는 (sfreq, 주파수, 주기 수, 방법, 에포크 길이)별로
+# 캐시합니다. 에포크는 EpochIndex에서 메모리 예산만큼의 배치로 꺼내 FFT를 한 번만
+# 하고, 모든 (에포크, 채널)을 주파수 커널 묶음과 한꺼번에 곱한 뒤 역FFT합니다.
+# 조건별로 파워 합과 위상 단위 벡터 합만 누적하므로 메모리는 에포크 수와 상관없습니다.
+#
+# 유도(induced) 파워는 에포크에서 조건 ERP를 뺀 신호의 파워입니다. 컨볼루션은
+# 선형이므로 ERP의 변환을 조건마다 한 번 계산해 빼며, 에포크를 두 번 변환하지 않습니다.
+
+from functools import lru_cache
+import numpy as np
+from scipy import fft as sp_fft
+from mne.time_frequency import morlet
+from mne.time_frequency.tfr import _make_dpss
+from eeg_profiling import profiled
+
+
+TFR_METHODS = ('morlet', 'multitaper')
+# 'total': 에포크 파워 평균, 'induced': ERP를 뺀 파워 평균, 'itc': 시행 간 위상 일치도
+TFR_MEASURES = ('total', 'induced', 'itc')
+BASELINE_MODES = ('logratio', 'percent', 'zscore', 'ratio')
+DEFAULT_TIME_BANDWIDTH = 4.0
+# 배치 하나의 복소수 작업 메모리 상한 (바이트)
+TFR_BLOCK_BYTES = 256 * 1024 ** 2
+
+
+def _as_tuple(values, n=None):
+    values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if n is not None and len(values) == 1:
+        values = np.repeat(values, n)
+    return tuple(float(v) for v in values)
+
+
+@lru_cache(maxsize=32)
+def design_kernels(sfreq, freqs, n_cycles, method='morlet', time_bandwidth=DEFAULT_TIME_BANDWIDTH):
+    """
+    주파수별 복소 커널 목록을 반환합니다 (캐시됨, MNE tfr_array_*와 같은 커널).
+
+    Parameters:
+    -----------
+    freqs, n_cycles : tuple of float
+        주파수 (Hz)와 주파수별 주기 수
+    method : str
+        'morlet' (주파수당 커널 1개) 또는 'multitaper' (주파수당 DPSS 테이퍼 여러 개)
+
+    Returns:
+    --------
+    kernels : list of list of np.ndarray
+        [주파수][테이퍼] 읽기 전용 커널
+    weights : list of list of float
+        [주파수][테이퍼] 파워 가중치 (Morlet은 1, 멀티테이퍼는 MNE와 같은 집중도 가중치)
+    """
+    if method not in TFR_METHODS:
+        raise ValueError(f'알 수 없는 시간-주파수 방법: {method}')
+    freqs_arr = np.asarray(freqs)
+    cycles_arr = np.asarray(n_cycles)
+    if method == 'morlet':
+        kernels = [[w] for w in morlet(sfreq, freqs_arr, cycles_arr, zero_mean=True)]
+        weights = [[1.0] for _ in kernels]
+    else:
+        tapers, conc = _make_dpss(sfreq, freqs_arr, cycles_arr, time_bandwidth,
+                                  zero_mean=True, return_weights=True)
+        kernels = [[tapers[k][f] for k in range(len(tapers))] for f in range(len(freqs))]
+        # MNE와 같이 테이퍼 파워에 집중도^2를 곱하고 2 / 합(집중도^2)로 정규화
+        weights = []
+        for f in range(len(freqs)):
+            c2 = np.array([conc[k][f] ** 2 for k in range(len(tapers))])
+            weights.append(list(2 * c2 / c2.sum()))
+    for row in kernels:
+        for w in row:
+            w.setflags(write=False)
+    return kernels, weights
+
+
+@lru_cache(maxsize=32)
+def kernel_spectra(sfreq, freqs, n_cycles, method, time_bandwidth, n_times):
+    """
+    에포크 길이 n_times에 맞춘 커널 FFT (캐시됨).
+
+    Returns:
+    --------
+    spectra : np.ndarray
+        (주파수 x 테이퍼, n_fft) 읽기 전용 복소 배열 (주파수 순서로 테이퍼가 이어짐)
+    starts : np.ndarray
+        (주파수 x 테이퍼,) 'same' 컨볼루션 결과가 시작하는 위치
+    weights : np.ndarray
+        (주파수 x 테이퍼,) 파워 가중치
+    n_tapers : int
+    n_fft : int
+    """
+    kernels, weights = design_kernels(sfreq, freqs, n_cycles, method, time_bandwidth)
+    lengths = np.array([len(w) for row in kernels for w in row])
+    if lengths.max() > n_times:
+        raise ValueError('웨이블릿이 에포크보다 깁니다. 최저 주파수를 높이거나 주기 수를 줄이세요.')
+    n_fft = sp_fft.next_fast_len(int(n_times + lengths.max() - 1))
+    spectra = np.array([sp_fft.fft(w, n_fft) for row in kernels for w in row])
+    spectra.setflags(write=False)
+    starts = (lengths - 1) // 2
+    weights = np.array([w for row in weights for w in row])
+    weights.setflags(write=False)
+    return spectra, starts, weights, len(kernels[0]), n_fft
+
+
+class TimeFrequency:
+    """
+    조건별 시간-주파수 결과 (파워 합, 유도 파워 합, 테이퍼별 위상 단위 벡터 합, 에포크 수).
+
+    condition이 None이면 모든 조건을 합친 값입니다. 유도 파워는 조건마다 그 조건의
+    ERP를 뺀 값이므로 전체는 조건별 유도 파워의 에포크 가중 평균입니다. 멀티테이퍼 ITC는
+    MNE와 같이 테이퍼마다 구한 ITC의 평균입니다.
+    """
+
+    def __init__(self, conditions, ch_names, freqs, times, method, n_tapers=1):
+        self.conditions = list(conditions)
+        self.ch_names = list(ch_names)
+        self.freqs = np.asarray(freqs)
+        self.times = np.asarray(times)
+        self.method = method
+        self.n_tapers = n_tapers
+        self.baseline = None  # 에포크 baseline 구간 (파워 정규화 기본값)
+        shape = (len(self.conditions), len(self.ch_names), len(self.freqs), len(self.times))
+        self._total = np.zeros(shape)
+        self._induced = np.zeros(shape)
+        self._phase = np.zeros(shape[:2] + (len(self.freqs) * n_tapers,) + shape[3:],
+                               dtype=np.complex128)
+        self._n = np.zeros(len(self.conditions), dtype=np.int64)
+
+    def _select(self, condition):
+        if condition is None:
+            return slice(None)
+        names = [condition] if isinstance(condition, str) else list(condition)
+        return [self.conditions.index(name) for name in names]
+
+    def n(self, condition=None):
+        return int(self._n[self._select(condition)].sum())
+
+    def data(self, measure='induced', condition=None):
+        """(채널, 주파수, 시간) 평균 파워 또는 ITC. 에포크가 없으면 None."""
+        if measure not in TFR_MEASURES:
+            raise ValueError(f'알 수 없는 시간-주파수 값: {measure}')
+        sel = self._select(condition)
+        n = self._n[sel].sum()
+        if n == 0:
+            return None
+        if measure == 'itc':
+            itc = np.abs(self._phase[sel].sum(axis=0)) / n
+            return itc.reshape(itc.shape[0], -1, self.n_tapers, itc.shape[-1]).mean(axis=2)
+        source = self._total if measure == 'total' else self._induced
+        return source[sel].sum(axis=0) / n
+
+
+def apply_baseline(power, times, baseline, mode='logratio'):
+    """
+    (..., 시간) 파워를 baseline 구간 평균으로 정규화한 새 배열 (mne.baseline.rescale과 같은 식).
+
+    mode: 'logratio' (log10(P / 평균)), 'percent' ((P - 평균) / 평균), 'ratio' (P / 평균),
+    'zscore' ((P - 평균) / 표준편차)
+    """
+    if mode not in BASELINE_MODES:
+        raise ValueError(f'알 수 없는 baseline 방식: {mode}')
+    b0 = times[0] if baseline[0] is None else baseline[0]
+    b1 = times[-1] if baseline[1] is None else baseline[1]
+    mask = (times >= b0) & (times <= b1)
+    if not mask.any():
+        raise ValueError(f'baseline 구간 {baseline}이 시간 범위 밖에 있습니다.')
+    ref = power[..., mask]
+    mean = ref.mean(axis=-1, keepdims=True)
+    if mode == 'logratio':
+        return np.log10(power / mean)
+    if mode == 'percent':
+        return (power - mean) / mean
+    if mode == 'ratio':
+        return power / mean
+    return (power - mean) / ref.std(axis=-1, keepdims=True)
+
+
+@profiled(category='analysis')
+def compute_tfr(epochs, freqs, n_cycles=7.0, method='morlet',
+                time_bandwidth=DEFAULT_TIME_BANDWIDTH, decim=1, conditions=None,
+                block_bytes=TFR_BLOCK_BYTES, n_jobs=1, progress=None):
+    """
+    에포크 인덱스의 조건별 파워와 ITC를 계산합니다.
+
+    Parameters:
+    -----------
+    epochs : eeg_epochs.EpochIndex
+        baseline 보정된 에포크를 배치로 읽음
+    freqs : array-like
+        주파수 (Hz)
+    n_cycles : float or array-like
+        주파수별 주기 수 (하나면 모든 주파수에 같은 값)
+    method : str
+        'morlet' 또는 'multitaper'
+    decim : int
+        결과 시간 축 간격 (샘플)
+    conditions : list of str or None
+        계산할 조건 (None이면 전체)
+    block_bytes : int
+        배치 하나의 작업 메모리 상한
+    n_jobs : int
+        FFT 스레드 수
+
+    Returns:
+    --------
+    TimeFrequency
+    """
+    conditions = epochs.conditions if conditions is None else list(conditions)
+    freqs = _as_tuple(freqs)
+    n_cycles = _as_tuple(n_cycles, len(freqs))
+    if len(n_cycles) != len(freqs):
+        raise ValueError('주기 수는 하나이거나 주파수 수와 같아야 합니다.')
+    sfreq = float(epochs.sfreq)
+    n_times = epochs.n_times
+    spectra, starts, weights, n_tapers, n_fft = kernel_spectra(sfreq, freqs, n_cycles, method,
+                                                      float(time_bandwidth), n_times)
+    n_rows = len(spectra)
+    n_channels = len(epochs.ch_names)
+    time_idx = np.arange(0, n_times, max(int(decim), 1))
+    # 'same' 컨볼루션에서 커널(행)마다 가져올 출력 위치: (행, 시간)
+    take = starts[:, None] + time_idx[None, :]
+    result = TimeFrequency(conditions, epochs.ch_names, freqs, epochs.times[time_idx], method,
+                           n_tapers)
+    result.baseline = epochs.baseline
+
+    # 에포크 배치 x 커널 묶음의 복소 곱/역FFT가 예산 안에 들도록 크기를 정함
+    epoch_bytes = n_channels * n_fft * 16
+    batch = int(max(1, min(len(epochs) or 1, block_bytes // (4 * epoch_bytes))))
+    rows_per_chunk = int(max(1, min(n_rows, block_bytes // (2 * batch * epoch_bytes))))
+    total = sum(epochs.count(name) for name in conditions) or 1
+    done = 0
+
+    def transform(x_fft, rows):
+        # (..., n_fft) 스펙트럼과 커널 rows의 곱을 역FFT하여 'same' 구간만 남김: (..., 행, 시간)
+        out = sp_fft.ifft(x_fft[..., None, :] * spectra[rows], axis=-1, workers=n_jobs)
+        idx = np.broadcast_to(take[rows], out.shape[:-1] + (len(time_idx),))
+        return np.take_along_axis(out, idx, axis=-1)
+
+    for ci, name in enumerate(conditions):
+        count = epochs.count(name)
+        if count == 0:
+            continue
+        erp_fft = sp_fft.fft(epochs.mean(name), n_fft, axis=-1, workers=n_jobs)
+        for block in epochs.iter_batches(name, batch=batch):
+            x_fft = sp_fft.fft(block, n_fft, axis=-1, workers=n_jobs)
+            for r0 in range(0, n_rows, rows_per_chunk):
+                rows = np.arange(r0, min(r0 + rows_per_chunk, n_rows))
+                tf = transform(x_fft, rows)  # (배치, 채널, 행, 시간)
+                erp_tf = transform(erp_fft, rows)  # (채널, 행, 시간)
+                freq_idx = rows // n_tapers
+                w = weights[rows][:, None]
+                power = (tf.real ** 2 + tf.imag ** 2).sum(axis=0) * w
+                induced = tf - erp_tf
+                induced = (induced.real ** 2 + induced.imag ** 2).sum(axis=0) * w
+                magnitude = np.abs(tf)
+                result._phase[ci][:, rows] += np.divide(
+                    tf, magnitude, out=np.zeros_like(tf), where=magnitude > 0).sum(axis=0)
+                # 멀티테이퍼는 테이퍼 가중 합
+                np.add.at(result._total[ci], (slice(None), freq_idx), power)
+                np.add.at(result._induced[ci], (slice(None), freq_idx), induced)
+            result._n[ci] += len(block)
+            done += len(block)
+            if progress is not None:
+                progress(done / total)
+    if progress is not None:
+        progress(1.0)
+    return result
+
+
+def default_freqs(fmin=4.0, fmax=40.0, step=2.0):
+    return np.arange(fmin, fmax + step / 2, step)
+
+
+def tfr_epochs(epochs, fmin=4.0, fmax=40.0, step=2.0, cycles_per_hz=0.5, method='morlet',
+               decim=1, n_jobs=1, progress=None):
+    """GUI 기본 설정: 주기 수를 주파수에 비례(주파수 x cycles_per_hz, 최소 1)하게 둔 compute_tfr."""
+    freqs = default_freqs(fmin, fmax, step)
+    n_cycles = np.maximum(freqs * cycles_per_hz, 1.0)
+    return compute_tfr(epochs, freqs, n_cycles, method, decim=decim, n_jobs=n_jobs,
+                       progress=progress)
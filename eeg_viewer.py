@@ -0,0 +1,185 @@
+# eeg_viewer.py
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import Qt, QRectF, pyqtSignal
+from eeg_profiling import stage
+
+
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+# 채널 한 줄의 높이(픽셀)와 줄 안에서 신호가 차지하는 비율
+ROW_HEIGHT = 60
+ROW_FILL = 0.9
+
+
+def channel_pen(idx, alpha=255, width=1, style=Qt.SolidLine):
+    color = pg.mkColor(COLORS[idx % len(COLORS)])
+    color.setAlpha(alpha)
+    return pg.mkPen(color=color, width=width, style=style)
+
+
+class StackedTraceCanvas(pg.PlotWidget):
+    """
+    모든 채널을 하나의 PlotItem에 채널별 오프셋으로 쌓아 그리는 캔버스.
+
+    채널마다 PlotCurveItem을 한 번만 만들고, 이후에는 setData/setPen으로
+    데이터와 스타일만 바꿉니다. 채널 i는 y = -i 위치에 그려지며, 각 채널은
+    표시 구간의 최소/최대값 기준으로 줄 높이에 맞게 정규화됩니다.
+    """
+
+    channelClicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setBackground(None)
+        self.setMouseEnabled(x=True, y=False)
+        self.plotItem.hideButtons()
+        self.plotItem.setMenuEnabled(False)
+        self.getAxis('left').setPen(None)
+        self.getAxis('bottom').setPen(None)
+        self.curves = []
+        self.overlays = {}
+        self.bands = {}
+        self.images = {}
+        self.ch_names = []
+        # 채널별 정규화 (중심값, 배율). 겹쳐 그리는 신호도 같은 기준을 사용
+        self._norm = []
+
+    def set_channels(self, ch_names):
+        """채널 목록을 설정합니다. 필요한 만큼만 곡선을 새로 만들고 나머지는 재사용합니다."""
+        self.ch_names = list(ch_names)
+        n = len(self.ch_names)
+        while len(self.curves) < n:
+            idx = len(self.curves)
+            curve = pg.PlotCurveItem(pen=channel_pen(idx), skipFiniteCheck=True)
+            curve.setClickable(True, width=6)
+            curve.sigClicked.connect(lambda c, ev=None, i=idx: self.channelClicked.emit(i))
+            self.addItem(curve)
+            self.curves.append(curve)
+        for i, curve in enumerate(self.curves):
+            curve.setVisible(i < n)
+        self._norm = [(0.0, 1.0)] * n
+        self.clear_overlays()
+        self.getAxis('left').setTicks([[(-i, name) for i, name in enumerate(self.ch_names)], []])
+        self.setYRange(-n + 0.5, 0.5, padding=0)
+        self.setMinimumHeight(max(200, n * ROW_HEIGHT))
+
+    def _normalize(self, idx, y, update=True):
+        if update:
+            y_min = float(np.nanmin(y)) if len(y) else 0.0
+            y_max = float(np.nanmax(y)) if len(y) else 0.0
+            half = (y_max - y_min) / 2 or 1.0
+            self._norm[idx] = ((y_max + y_min) / 2, ROW_FILL / 2 / half)
+        center, scale = self._norm[idx]
+        return (np.asarray(y, dtype=np.float64) - center) * scale - idx
+
+    def set_trace(self, idx, x, y, norm_y=None):
+        """norm_y를 주면 그 값의 범위로 줄 높이를 맞춥니다 (예: 신뢰 구간 띠 전체)."""
+        if norm_y is not None:
+            self._normalize(idx, norm_y)
+        self.curves[idx].setData(x, self._normalize(idx, y, update=norm_y is None))
+
+    def set_traces(self, x, data):
+        """모든 채널의 데이터를 교체합니다 (data: (채널, 점 수))."""
+        for idx in range(len(self.ch_names)):
+            self.set_trace(idx, x, data[idx])
+
+    def set_overlaid(self, x, data):
+        """
+        모든 채널을 정규화/오프셋 없이 같은 y 축에 겹쳐 그립니다 (예: 파워 스펙트럼).
+
+        set_channels() 뒤에 호출하며, 다음 set_channels()에서 채널별 줄 표시로 돌아갑니다.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        for idx in range(len(self.ch_names)):
+            self.curves[idx].setData(x, data[idx])
+        self.getAxis('left').setTicks(None)
+        finite = data[np.isfinite(data)]
+        if finite.size:
+            self.setYRange(float(finite.min()), float(finite.max()), padding=0.05)
+        self.setMinimumHeight(200)
+
+    def set_style(self, idx, pen):
+        self.curves[idx].setPen(pen)
+
+    def set_overlay(self, idx, x, y, pen):
+        """채널 idx 위에 보조 신호(예: 보간 전 신호)를 같은 정규화 기준으로 겹쳐 그립니다."""
+        curve = self.overlays.get(idx)
+        if curve is None:
+            curve = pg.PlotCurveItem(skipFiniteCheck=True)
+            curve.setClickable(True, width=6)
+            curve.sigClicked.connect(lambda c, ev=None, i=idx: self.channelClicked.emit(i))
+            self.addItem(curve)
+            self.overlays[idx] = curve
+        curve.setPen(pen)
+        curve.setData(x, self._normalize(idx, y, update=False))
+        curve.setVisible(True)
+
+    def clear_overlays(self):
+        for curve in self.overlays.values():
+            curve.setData([], [])
+            curve.setVisible(False)
+        for lower, upper, fill in self.bands.values():
+            lower.setData([], [])
+            upper.setData([], [])
+            fill.setVisible(False)
+
+    def set_band(self, idx, x, lower, upper, brush):
+        """채널 idx에 [lower, upper] 음영 띠(예: 신뢰 구간)를 같은 정규화 기준으로 그립니다."""
+        band = self.bands.get(idx)
+        if band is None:
+            band = (pg.PlotCurveItem(skipFiniteCheck=True), pg.PlotCurveItem(skipFiniteCheck=True))
+            fill = pg.FillBetweenItem(band[0], band[1])
+            # 곡선보다 뒤에 그림
+            fill.setZValue(-1)
+            self.addItem(fill)
+            band = self.bands[idx] = band + (fill,)
+        low_curve, high_curve, fill = band
+        low_curve.setData(x, self._normalize(idx, lower, update=False))
+        high_curve.setData(x, self._normalize(idx, upper, update=False))
+        fill.setBrush(brush)
+        fill.setVisible(True)
+
+    def set_image(self, idx, image, x_min, x_max, levels, lut):
+        """
+        채널 idx 줄에 (행, 열=x) 이미지를 그립니다 (예: 시간-주파수 파워, 첫 행이 줄 아래쪽).
+
+        Parameters:
+        -----------
+        levels : (float, float)
+            색 범위
+        lut : np.ndarray
+            (256, 3|4) 색 표
+        """
+        item = self.images.get(idx)
+        if item is None:
+            item = pg.ImageItem(axisOrder='row-major')
+            # 곡선보다 뒤에 그림
+            item.setZValue(-2)
+            self.addItem(item)
+            self.images[idx] = item
+        item.setImage(np.asarray(image, dtype=np.float32), levels=levels, lut=lut, autoLevels=False)
+        item.setRect(QRectF(x_min, -idx - ROW_FILL / 2, x_max - x_min, ROW_FILL))
+        item.setVisible(True)
+
+    def clear_images(self):
+        for item in self.images.values():
+            item.clear()
+            item.setVisible(False)
+
+    def set_x_range(self, x_min, x_max):
+        self.setLimits(xMin=x_min, xMax=x_max)
+        self.setXRange(x_min, x_max, padding=0)
+
+    def clear_traces(self):
+        """곡선 객체는 유지하고 데이터만 비웁니다."""
+        for curve in self.curves:
+            curve.setData([], [])
+        self.clear_overlays()
+        self.clear_images()
+
+    def paintEvent(self, event):
+        # 실제 화면 그리기 시간 (set_* 호출은 데이터만 바꾸고 그리기는 여기서 일어남)
+        with stage('paint', 'redraw'):
+            super().paintEvent(event)
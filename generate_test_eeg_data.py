@@ -1,11 +1,73 @@
 # generate_test_eeg_data.py
+#
+# 테스트용 EEG/이벤트 CSV를 생성합니다.
+#
+# 짧은 녹화는 DataFrame으로 만들고, 긴 녹화(수 시간, 수백 채널)는 write_eeg_csv()로
+# 구간 단위로 생성해 바로 파일에 이어 쓰므로 녹화 전체를 메모리에 올리지 않습니다.
+#
+# 사용 예:
+#   python generate_test_eeg_data.py
+#   python generate_test_eeg_data.py --duration 3600 --channels 64 --sfreq 1000 --output long.csv
 
+import argparse
 import numpy as np
 import pandas as pd
 import mne
 from datetime import datetime
 
-def generate_sample_eeg_data(duration=10, sfreq=256, n_channels=4):
+
+# 앞쪽 채널 순서 (기존 4채널 파일과 같은 이름으로 시작)
+BASE_CHANNELS = ['F3', 'F4', 'C3', 'C4', 'Fp1', 'Fp2', 'F7', 'Fz', 'F8', 'T7', 'Cz', 'T8',
+                 'P7', 'P3', 'Pz', 'P4', 'P8', 'O1', 'Oz', 'O2']
+# 한 번에 생성해 파일에 쓰는 길이 (초)
+WRITE_CHUNK_SECONDS = 60.0
+
+# 표준 몽타주의 전극 이름 (몽타주 생성이 느리므로 한 번만 읽음)
+NAMES_1020 = mne.channels.make_standard_montage('standard_1020').ch_names
+NAMES_1005 = mne.channels.make_standard_montage('standard_1005').ch_names
+# 생성할 수 있는 채널 이름 순서: BASE_CHANNELS, 나머지 10-20, 나머지 10-05.
+# 10-05 몽타주에 위치가 있는 이름만 사용합니다 (10-20의 O9/O10은 10-05에 없음).
+CHANNEL_NAMES = list(BASE_CHANNELS)
+for _names in (NAMES_1020, NAMES_1005):
+    CHANNEL_NAMES += [ch for ch in _names if ch in NAMES_1005 and ch not in CHANNEL_NAMES]
+
+
+def channel_names(n_channels):
+    """n_channels개의 표준 전극 이름 (보간에 필요한 위치가 있는 이름, CHANNEL_NAMES 순서)."""
+    if n_channels > len(CHANNEL_NAMES):
+        raise ValueError(f'채널은 최대 {len(CHANNEL_NAMES)}개까지 생성할 수 있습니다.')
+    return CHANNEL_NAMES[:n_channels]
+
+
+def montage_for(ch_names):
+    """채널 이름이 모두 들어 있는 표준 몽타주 이름 (10-20에 없으면 10-05)."""
+    names = set(NAMES_1020)
+    return 'standard_1020' if all(ch in names for ch in ch_names) else 'standard_1005'
+
+
+def synthesize(t, n_channels, rng, bad_channels=(), phase_spread=False):
+    """
+    시간 t에 대한 (채널, 샘플) 신호 (알파/베타/세타 파동 + 노이즈).
+
+    모든 채널이 같은 파형에 노이즈를 더하고, 우측(홀수) 채널에는 오프셋 2를 더합니다.
+    phase_spread이면 채널마다 위상을 달리합니다 (채널이 많은 벤치마크 녹화에서
+    ICA가 같은 파형만 보지 않도록). bad_channels 번호의 채널은 노이즈를 10배로 키웁니다.
+    """
+    phase = np.zeros((n_channels, 1))
+    if phase_spread:
+        phase[:, 0] = np.linspace(0, np.pi, n_channels, endpoint=False)
+    # 알파 파동 (10 Hz), 베타 파동 (20 Hz), 세타 파동 (5 Hz)
+    data = (5 * np.sin(2 * np.pi * 10 * t + phase)
+            + 2 * np.sin(2 * np.pi * 20 * t + 2 * phase)
+            + 3 * np.sin(2 * np.pi * 5 * t + 0.5 * phase))
+    noise = rng.standard_normal((n_channels, len(t)))
+    noise[list(bad_channels)] *= 10
+    data += noise
+    data[1::2] += 2
+    return data
+
+
+def generate_sample_eeg_data(duration=10, sfreq=256, n_channels=4, filename=None, seed=None):
     """
     샘플 EEG 데이터를 생성합니다.
     
@@ -17,6 +79,10 @@ def generate_sample_eeg_data(duration=10, sfreq=256, n_channels=4):
         샘플링 주파수 (Hz)
     n_channels : int
         채널 수
+    filename : str or None
+        저장할 파일 (None이면 생성 시각으로 이름을 지음)
+    seed : int or None
+        난수 시드
     
     Returns:
     --------
@@ -25,40 +91,56 @@ def generate_sample_eeg_data(duration=10, sfreq=256, n_channels=4):
     """
     # 시간 벡터 생성
     t = np.arange(0, duration, 1/sfreq)
-    n_samples = len(t)
     
     # 채널 이름 설정
-    ch_names = ['F3', 'F4', 'C3', 'C4']
+    ch_names = channel_names(n_channels)
     
     # 기본 신호 생성 (알파 파동 + 노이즈)
-    data = np.zeros((n_channels, n_samples))
-    for i in range(n_channels):
-        # 알파 파동 (10 Hz)
-        alpha = 5 * np.sin(2 * np.pi * 10 * t)
-        # 베타 파동 (20 Hz)
-        beta = 2 * np.sin(2 * np.pi * 20 * t)
-        # 세타 파동 (5 Hz)
-        theta = 3 * np.sin(2 * np.pi * 5 * t)
-        # 노이즈
-        noise = np.random.normal(0, 1, n_samples)
-        
-        # 채널별 특성 부여
-        if i % 2 == 0:  # 좌측 채널
-            data[i] = alpha + beta + theta + noise
-        else:  # 우측 채널
-            data[i] = alpha + beta + theta + noise + 2
+    data = synthesize(t, n_channels, np.random.default_rng(seed))
     
     # 데이터프레임 생성
     df = pd.DataFrame(data.T, columns=ch_names)
     
     # 파일 저장
-    filename = f'test_eeg_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    if filename is None:
+        filename = f'test_eeg_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
     df.to_csv(filename, index=False)
     print(f'생성된 데이터가 {filename}에 저장되었습니다.')
     
     return df
 
-def generate_sample_events(n_events=5, sfreq=256, duration=10):
+def write_eeg_csv(filename, duration, sfreq, n_channels, bad_channels=(), seed=0,
+                  chunk_seconds=WRITE_CHUNK_SECONDS, float_format='%.4f', phase_spread=False):
+    """
+    긴 EEG 녹화를 구간 단위로 생성해 CSV에 이어 씁니다 (메모리는 구간 하나분만 사용).
+
+    Parameters:
+    -----------
+    bad_channels : sequence of int
+        노이즈를 키운 불량 채널 번호
+    chunk_seconds : float
+        한 번에 생성하는 길이 (초)
+    phase_spread : bool
+        채널마다 위상을 달리할지 여부 (synthesize 참고)
+
+    Returns:
+    --------
+    ch_names : list of str
+    n_samples : int
+    """
+    ch_names = channel_names(n_channels)
+    n_samples = int(round(duration * sfreq))
+    chunk = max(1, int(chunk_seconds * sfreq))
+    rng = np.random.default_rng(seed)
+    with open(filename, 'w', newline='') as f:
+        f.write(','.join(ch_names) + '\n')
+        for start in range(0, n_samples, chunk):
+            t = np.arange(start, min(start + chunk, n_samples)) / sfreq
+            data = synthesize(t, n_channels, rng, bad_channels, phase_spread)
+            pd.DataFrame(data.T).to_csv(f, header=False, index=False, float_format=float_format)
+    return ch_names, n_samples
+
+def generate_sample_events(n_events=5, sfreq=256, duration=10, filename=None, seed=None):
     """
     샘플 이벤트 데이터를 생성합니다.
     
@@ -70,6 +152,10 @@ def generate_sample_events(n_events=5, sfreq=256, duration=10):
         샘플링 주파수 (Hz)
     duration : float
         데이터 길이 (초)
+    filename : str or None
+        저장할 파일 (None이면 생성 시각으로 이름을 지음)
+    seed : int or None
+        난수 시드
     
     Returns:
     --------
@@ -84,24 +170,42 @@ def generate_sample_events(n_events=5, sfreq=256, duration=10):
     events = np.zeros((n_events, 3), dtype=int)
     events[:, 0] = event_samples  # 샘플
     events[:, 1] = 0  # 이전 값
-    events[:, 2] = np.random.randint(1, 3, n_events)  # 이벤트 ID (1 또는 2)
+    events[:, 2] = np.random.default_rng(seed).integers(1, 3, n_events)  # 이벤트 ID (1 또는 2)
     
     # 데이터프레임 생성
     df = pd.DataFrame(events, columns=['sample', 'previous', 'event_id'])
     
     # 파일 저장
-    filename = f'test_events_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    if filename is None:
+        filename = f'test_events_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
     df.to_csv(filename, index=False)
     print(f'생성된 이벤트가 {filename}에 저장되었습니다.')
     
     return df
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='테스트용 EEG/이벤트 CSV 생성')
+    parser.add_argument('--duration', type=float, default=10.0, help='녹화 길이 (초)')
+    parser.add_argument('--sfreq', type=float, default=256.0, help='샘플링 주파수 (Hz)')
+    parser.add_argument('--channels', type=int, default=4, help='채널 수')
+    parser.add_argument('--events', type=int, default=None,
+                        help='이벤트 수 (기본: 녹화 길이 10초마다 5개)')
+    parser.add_argument('--output', default=None, help='EEG CSV 경로 (기본: 생성 시각으로 이름)')
+    parser.add_argument('--events-output', default=None, help='이벤트 CSV 경로')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    n_events = args.events or max(1, int(args.duration // 2))
+    if args.output is None:
+        test_data = generate_sample_eeg_data(args.duration, args.sfreq, args.channels,
+                                             seed=args.seed)
+        test_data.to_csv('test_eeg_data.csv', index=False)  # 헤더 포함 저장
+    else:
+        write_eeg_csv(args.output, args.duration, args.sfreq, args.channels, seed=args.seed)
+        print(f'생성된 데이터가 {args.output}에 저장되었습니다.')
+    generate_sample_events(n_events, args.sfreq, args.duration, args.events_output,
+                           seed=args.seed)
+
+
 if __name__ == '__main__':
-    # 샘플 데이터 생성
-    eeg_data = generate_sample_eeg_data(duration=10, sfreq=256, n_channels=4)
-    events = generate_sample_events(n_events=5, sfreq=256, duration=10)
-
-    # 테스트 데이터 생성 및 저장
-    test_data = generate_sample_eeg_data()
-    test_data.to_csv('test_eeg_data.csv', index=False)  # 헤더 포함 저장
-    print("테스트 데이터가 생성되었습니다.")
\ No newline at end of file
+    main()
@@ -0,0 +1,26 @@
+# test_eeg_quality.py
+
+import numpy as np
+from eeg_quality import ChannelStats, STATS_CHUNK
+
+
+def accumulate(data, chunk_samples=STATS_CHUNK):
+    stats = ChannelStats([f'ch{i}' for i in range(data.shape[0])])
+    for start in range(0, data.shape[1], chunk_samples):
+        stats.update(data[:, start:start + chunk_samples])
+    return stats
+
+
+def test_flat_lead_in():
+    # 앰프 연결 전처럼 첫 청크 전체가 0인 녹화 (20 µV 노이즈 앞에 0이 70000 샘플)
+    rng = np.random.default_rng(0)
+    data = np.concatenate([np.zeros((4, 70000)), rng.standard_normal((4, 200000)) * 20e-6], axis=1)
+    stats = accumulate(data)
+    q25, q75, q99 = np.quantile(data, [0.25, 0.75, 0.99], axis=1)
+    np.testing.assert_allclose(stats.iqr(), q75 - q25, rtol=0.01)
+    np.testing.assert_allclose(stats.quantile(0.99), q99, rtol=0.01)
+    centered = np.abs(data - data.mean(axis=1, keepdims=True))
+    exact = (centered > 3 * data.std(axis=1, keepdims=True)).mean(axis=1)
+    np.testing.assert_allclose(stats.outlier_ratio(), exact, atol=5e-4)
+    assert stats.detect('outlier') == []
+    assert (stats.hist.sum(axis=1) == data.shape[1]).all()
@@ -0,0 +1,41 @@
+# test_eeg_tfr.py
+
+import numpy as np
+import mne
+import pytest
+from mne.time_frequency import tfr_array_morlet, tfr_array_multitaper
+from eeg_epochs import EpochIndex
+from eeg_tfr import compute_tfr
+
+
+@pytest.fixture
+def epochs():
+    # 느린 드리프트 위에 10 Hz 유발 반응이 있는 녹화 (드리프트가 저주파 파워로 새지 않아야 함)
+    rng = np.random.default_rng(0)
+    sfreq = 256.0
+    t = np.arange(int(120 * sfreq)) / sfreq
+    data = rng.standard_normal((4, len(t))) * 1e-5 + 5e-5 * np.sin(2 * np.pi * 0.05 * t)
+    onsets = np.arange(int(2 * sfreq), len(t) - int(2 * sfreq), int(1.3 * sfreq))
+    for s in onsets:
+        data[:, s:s + 64] += np.sin(2 * np.pi * 10 * np.arange(64) / sfreq) * 2e-5
+    raw = mne.io.RawArray(data, mne.create_info(4, sfreq, 'eeg'), verbose=False)
+    events = np.c_[onsets, np.zeros_like(onsets), 1 + np.arange(len(onsets)) % 2]
+    return EpochIndex(raw, events, {'A': 1, 'B': 2}, -0.2, 0.8, (None, 0))
+
+
+@pytest.mark.parametrize('method, reference', [('morlet', tfr_array_morlet),
+                                               ('multitaper', tfr_array_multitaper)])
+def test_matches_mne(epochs, method, reference):
+    # tfr_epochs 기본값과 같이 주기 수를 주파수 x 0.5 (최소 1)로 두어 짧은 저주파 웨이블릿 포함
+    freqs = np.arange(4.0, 41.0, 2.0)
+    n_cycles = np.maximum(freqs * 0.5, 1.0)
+    result = compute_tfr(epochs, freqs, n_cycles, method)
+    x = epochs.get_data('A')
+    expected = reference(x, epochs.sfreq, freqs, n_cycles, output='avg_power_itc', verbose=False)
+    np.testing.assert_allclose(result.data('total', 'A'), expected.real,
+                               rtol=1e-6, atol=1e-9 * expected.real.max())
+    np.testing.assert_allclose(result.data('itc', 'A'), expected.imag, atol=1e-6)
+    induced = reference(x - x.mean(axis=0), epochs.sfreq, freqs, n_cycles, output='avg_power',
+                        verbose=False)
+    np.testing.assert_allclose(result.data('induced', 'A'), induced,
+                               rtol=1e-6, atol=1e-9 * induced.max())